@@ -0,0 +1,41 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.database import get_async_db
+from app.models.execution_job import ExecutionJob
+from app.models.user import User
+from app.schemas.execution_schemas import ExecutionJobResponse
+from app.api.auth import get_current_user
+
+router = APIRouter(prefix="/executions", tags=["Executions"])
+
+@router.get("/{job_id}", response_model=ExecutionJobResponse)
+async def get_execution(
+    job_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get the status and results of a queued execution"""
+    job = await db.scalar(select(ExecutionJob).where(
+        ExecutionJob.id == job_id,
+        ExecutionJob.user_id == str(current_user.id)
+    ))
+    
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Execution not found"
+        )
+    
+    return ExecutionJobResponse(
+        job_id=job.id,
+        workflow_id=job.workflow_id,
+        status=job.status,
+        results=job.results,
+        logs=job.logs,
+        error=job.error,
+        attempts=job.attempts,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at
+    )
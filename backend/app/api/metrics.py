@@ -0,0 +1,46 @@
+import sys
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, Depends
+
+from app.api.auth import get_current_user
+from app.core.agent_cache import agent_cache
+from app.core.plan_cache import plan_cache
+from app.models.user import User
+from app.services.tool_service import tool_service
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+
+def _llm_stats() -> Optional[Dict[str, Any]]:
+    """LLM service counters, or None until the service has been built by a first run."""
+    # Looked up rather than imported: importing llm_service loads langchain, which a
+    # metrics scrape should not trigger on an otherwise idle process
+    llm_module = sys.modules.get("app.services.llm_service")
+    if llm_module is None or not llm_module.get_llm_service.cache_info().currsize:
+        return None
+    service = llm_module.get_llm_service()
+    optional = {
+        "response_cache": service.response_cache,
+        "singleflight": service.singleflight,
+        "semantic_cache": service.semantic_cache,
+    }
+    stats = {
+        "client_pool": service.client_pool.stats(),
+        "rate_limiter": service.rate_limiter.stats(),
+        "hedging": service.hedger.stats(),
+    }
+    stats.update({name: part.stats() if part is not None else None for name, part in optional.items()})
+    return stats
+
+
+@router.get("/")
+def get_metrics(current_user: User = Depends(get_current_user)):
+    """Counters from the plan, agent, tool and LLM caches and limiters in this process (signed-in users only)."""
+    return {
+        "plan_cache": plan_cache.stats(),
+        "agent_cache": agent_cache.stats(),
+        "tools": tool_service.tool_metrics(),
+        "tool_cache": tool_service.result_cache.stats() if tool_service.result_cache is not None else None,
+        "llm": _llm_stats(),
+    }
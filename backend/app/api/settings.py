@@ -1,23 +1,25 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
-from app.db.database import get_db
+from app.db.database import get_async_db
 from app.models.user import User
 from app.models.credential import UserCredential
 from app.api.auth import get_current_user
 from app.schemas.settings_schemas import CredentialCreate, CredentialResponse, CredentialVerifyRequest
 from app.services.encryption import get_encryption_service
-from app.services.llm_service import get_llm_service
 
 router = APIRouter(prefix="/settings", tags=["Settings"])
 
 @router.get("/credentials", response_model=List[CredentialResponse])
-def list_credentials(
+async def list_credentials(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """List all configured API keys for the user (masked)."""
-    credentials = db.query(UserCredential).filter(UserCredential.user_id == str(current_user.id)).all()
+    credentials = (await db.scalars(
+        select(UserCredential).where(UserCredential.user_id == str(current_user.id))
+    )).all()
     
     response = []
     encryption_service = get_encryption_service()
@@ -37,27 +39,27 @@ def list_credentials(
     return response
 
 @router.post("/credentials", response_model=CredentialResponse)
-def add_credential(
+async def add_credential(
     cred_in: CredentialCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Add or update an API key."""
     encryption_service = get_encryption_service()
     
     # Check if exists
-    existing = db.query(UserCredential).filter(
+    existing = await db.scalar(select(UserCredential).where(
         UserCredential.user_id == str(current_user.id),
         UserCredential.provider == cred_in.provider
-    ).first()
+    ))
     
     encrypted_key = encryption_service.encrypt(cred_in.api_key)
     
     if existing:
         existing.api_key_encrypted = encrypted_key
         existing.updated_at = existing.updated_at # force update timestamp
-        db.commit()
-        db.refresh(existing)
+        await db.commit()
+        await db.refresh(existing)
         db_obj = existing
     else:
         db_obj = UserCredential(
@@ -66,8 +68,8 @@ def add_credential(
             api_key_encrypted=encrypted_key
         )
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        await db.commit()
+        await db.refresh(db_obj)
     
     masked = f"{cred_in.api_key[:3]}...{cred_in.api_key[-4:]}" if len(cred_in.api_key) > 7 else "***"
     
@@ -80,22 +82,22 @@ def add_credential(
     )
 
 @router.delete("/credentials/{provider}")
-def delete_credential(
+async def delete_credential(
     provider: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Remove a credential."""
-    cred = db.query(UserCredential).filter(
+    cred = await db.scalar(select(UserCredential).where(
         UserCredential.user_id == str(current_user.id),
         UserCredential.provider == provider
-    ).first()
+    ))
     
     if not cred:
         raise HTTPException(status_code=404, detail="Credential not found")
         
-    db.delete(cred)
-    db.commit()
+    await db.delete(cred)
+    await db.commit()
     return {"status": "success", "message": f"{provider} key removed"}
 
 @router.post("/credentials/verify")
@@ -104,6 +106,8 @@ async def verify_credential(
     current_user: User = Depends(get_current_user)
 ):
     """Test if an API key works."""
+    # Imported on use so CRUD-only processes never load LangChain
+    from app.services.llm_service import get_llm_service
     llm_service = get_llm_service()
     result = await llm_service.verify_key(request.provider, request.api_key)
     if not result:
@@ -1,11 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
-from app.db.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Dict, List, Tuple
+import json
+from app.db.database import get_async_db, get_async_read_db
 from app.models.workflow import Workflow
 from app.models.user import User
 from app.schemas.workflow_schemas import WorkflowCreate, WorkflowUpdate, WorkflowResponse, WorkflowExecutionRequest, WorkflowExecutionResponse
+from app.schemas.execution_schemas import ExecutionJobAccepted
 from app.api.auth import get_current_user
+from app.core.plan import CompiledWorkflow
+from app.core.plan_cache import plan_cache
+from app.services.credential_service import aget_user_api_keys
+from app.services.job_queue import job_queue
 from app.services.tool_service import tool_service
 
 router = APIRouter(prefix="/workflows", tags=["Workflows"])
@@ -15,11 +23,16 @@ def list_tools():
     """List all available tools."""
     return tool_service.get_available_tools()
 
+@router.get("/tools/metrics")
+def tool_metrics():
+    """Per-tool source, load state and startup time in milliseconds."""
+    return tool_service.tool_metrics()
+
 @router.post("/", response_model=WorkflowResponse, status_code=status.HTTP_201_CREATED)
 async def create_workflow(
     workflow_data: WorkflowCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new workflow"""
     new_workflow = Workflow(
@@ -30,31 +43,31 @@ async def create_workflow(
     )
     
     db.add(new_workflow)
-    db.commit()
-    db.refresh(new_workflow)
+    await db.commit()
+    await db.refresh(new_workflow)
     
     return new_workflow
 
 @router.get("/", response_model=List[WorkflowResponse])
 async def get_workflows(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """Get all workflows for current user"""
-    workflows = db.query(Workflow).filter(Workflow.user_id == str(current_user.id)).all()
+    workflows = (await db.scalars(select(Workflow).where(Workflow.user_id == str(current_user.id)))).all()
     return workflows
 
 @router.get("/{workflow_id}", response_model=WorkflowResponse)
 async def get_workflow(
     workflow_id: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """Get a specific workflow"""
-    workflow = db.query(Workflow).filter(
+    workflow = await db.scalar(select(Workflow).where(
         Workflow.id == workflow_id,
         Workflow.user_id == str(current_user.id)
-    ).first()
+    ))
     
     if not workflow:
         raise HTTPException(
@@ -69,13 +82,13 @@ async def update_workflow(
     workflow_id: str,
     workflow_data: WorkflowUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update a workflow"""
-    workflow = db.query(Workflow).filter(
+    workflow = await db.scalar(select(Workflow).where(
         Workflow.id == workflow_id,
         Workflow.user_id == str(current_user.id)
-    ).first()
+    ))
     
     if not workflow:
         raise HTTPException(
@@ -93,8 +106,9 @@ async def update_workflow(
     if workflow_data.status is not None:
         workflow.status = workflow_data.status
     
-    db.commit()
-    db.refresh(workflow)
+    await db.commit()
+    await db.refresh(workflow)
+    plan_cache.invalidate(workflow_id)
     
     return workflow
 
@@ -102,13 +116,13 @@ async def update_workflow(
 async def delete_workflow(
     workflow_id: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete a workflow"""
-    workflow = db.query(Workflow).filter(
+    workflow = await db.scalar(select(Workflow).where(
         Workflow.id == workflow_id,
         Workflow.user_id == str(current_user.id)
-    ).first()
+    ))
     
     if not workflow:
         raise HTTPException(
@@ -116,23 +130,23 @@ async def delete_workflow(
             detail="Workflow not found"
         )
     
-    db.delete(workflow)
-    db.commit()
+    await db.delete(workflow)
+    await db.commit()
+    plan_cache.invalidate(workflow_id)
     
     return None
 
-@router.post("/{workflow_id}/execute", response_model=WorkflowExecutionResponse)
-async def execute_workflow(
+async def _load_canvas(
     workflow_id: str,
     execution_request: WorkflowExecutionRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """Execute a workflow"""
-    from app.core.executor import GraphExecutor
-    
+    current_user: User,
+    db: AsyncSession
+) -> Tuple[List[Dict], List[Dict], CompiledWorkflow]:
+    """Resolve the nodes/edges to run and compile (or fetch the cached) plan."""
     nodes = []
     edges = []
+    stateful = False
+    version = None
 
     # 1. Stateless Execution: Use nodes/edges from request if provided
     if execution_request.nodes:
@@ -141,10 +155,10 @@ async def execute_workflow(
     
     # 2. Stateful Execution: Fetch from DB if not provided
     else:
-        workflow = db.query(Workflow).filter(
+        workflow = await db.scalar(select(Workflow).where(
             Workflow.id == workflow_id,
             Workflow.user_id == str(current_user.id)
-        ).first()
+        ))
         
         if not workflow:
             raise HTTPException(
@@ -155,37 +169,83 @@ async def execute_workflow(
         canvas_state = workflow.canvas_state or {}
         nodes = canvas_state.get('nodes', [])
         edges = canvas_state.get('edges', [])
+        stateful = True
+        version = workflow.updated_at
     
     if not nodes:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Workflow has no nodes to execute"
         )
-        
-    # Fetch and decrypt User Credentials
-    from app.models.credential import UserCredential
-    from app.services.encryption import get_encryption_service
-    
-    user_creds = db.query(UserCredential).filter(UserCredential.user_id == str(current_user.id)).all()
-    encryption_service = get_encryption_service()
-    
-    user_api_keys = {}
-    for cred in user_creds:
-        if cred.is_active:
-            try:
-                decrypted = encryption_service.decrypt(cred.api_key_encrypted)
-                if decrypted:
-                    user_api_keys[cred.provider] = decrypted
-            except Exception:
-                pass
 
-    executor = GraphExecutor()
     try:
-        execution_result = await executor.execute(
+        # Saved workflows reuse the compiled plan until they are edited
+        if stateful:
+            plan = plan_cache.get_or_compile(nodes, edges, workflow_id=workflow_id, version=version)
+        else:
+            plan = CompiledWorkflow.from_canvas(nodes, edges)
+    except ValueError as e:
+        # Invalid graph (e.g. cycle detected)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+    return nodes, edges, plan
+
+async def _prepare_execution(
+    workflow_id: str,
+    execution_request: WorkflowExecutionRequest,
+    current_user: User,
+    db: AsyncSession
+) -> Tuple[CompiledWorkflow, Dict[str, str]]:
+    """Resolve the plan to run and the user's decrypted provider keys."""
+    _, _, plan = await _load_canvas(workflow_id, execution_request, current_user, db)
+    return plan, await aget_user_api_keys(db, current_user.id)
+
+@router.post(
+    "/{workflow_id}/execute",
+    response_model=WorkflowExecutionResponse,
+    responses={status.HTTP_202_ACCEPTED: {"model": ExecutionJobAccepted}}
+)
+async def execute_workflow(
+    workflow_id: str,
+    execution_request: WorkflowExecutionRequest,
+    mode: str = Query("sync", pattern="^(sync|async)$"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Execute a workflow. With mode=async the run is queued and a job id returned."""
+    from app.core.executor import GraphExecutor
+
+    if mode == "async":
+        nodes, edges, _ = await _load_canvas(workflow_id, execution_request, current_user, db)
+        job = await job_queue.aenqueue(
+            db,
+            workflow_id=workflow_id,
+            user_id=current_user.id,
             nodes=nodes,
             edges=edges,
             initial_inputs=execution_request.initial_inputs,
-            user_api_keys=user_api_keys
+            max_concurrency=execution_request.max_concurrency,
+            timeout_seconds=execution_request.timeout_seconds
+        )
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content={"job_id": job.id, "workflow_id": workflow_id, "status": job.status}
+        )
+
+    plan, user_api_keys = await _prepare_execution(workflow_id, execution_request, current_user, db)
+
+    executor = GraphExecutor()
+    try:
+        execution_result = await executor.execute(
+            plan=plan,
+            initial_inputs=execution_request.initial_inputs,
+            user_api_keys=user_api_keys,
+            max_concurrency=execution_request.max_concurrency,
+            timeout_seconds=execution_request.timeout_seconds,
+            workflow_id=workflow_id
         )
         
         return {
@@ -195,8 +255,46 @@ async def execute_workflow(
             "logs": execution_result.get("logs", [])
         }
     except Exception as e:
-        # In case of overall execution failure (e.g. cycle detected)
+        # In case of overall execution failure
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=str(e)
         )
+
+def _format_sse(event: Dict[str, Any]) -> str:
+    """Serialize an executor event as a Server-Sent Events message."""
+    payload = json.dumps(event, default=str)
+    return f"event: {event['event']}\ndata: {payload}\n\n"
+
+@router.post("/{workflow_id}/execute/stream")
+async def execute_workflow_stream(
+    workflow_id: str,
+    execution_request: WorkflowExecutionRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Execute a workflow, streaming node events as Server-Sent Events"""
+    from app.core.executor import GraphExecutor
+
+    plan, user_api_keys = await _prepare_execution(workflow_id, execution_request, current_user, db)
+
+    executor = GraphExecutor()
+
+    async def event_stream():
+        async for event in executor.stream(
+            plan=plan,
+            initial_inputs=execution_request.initial_inputs,
+            user_api_keys=user_api_keys,
+            max_concurrency=execution_request.max_concurrency,
+            timeout_seconds=execution_request.timeout_seconds,
+            workflow_id=workflow_id
+        ):
+            if event["event"] in ("execution_completed", "execution_failed"):
+                event["workflow_id"] = workflow_id
+            yield _format_sse(event)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,79 @@
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import AsyncCallbackHandler
+
+# What AgentExecutor answers (early_stopping_method="force") when a budget runs out
+STOPPED_OUTPUT_PREFIX = "Agent stopped due to"
+
+
+class AgentStepTimer(AsyncCallbackHandler):
+    """Callback handler that splits an agent run's time into LLM calls and tool calls."""
+
+    def __init__(self):
+        self._started: Dict[UUID, float] = {}
+        self.steps: List[Dict[str, Any]] = []
+
+    async def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs):
+        self._started[run_id] = time.perf_counter()
+
+    async def on_llm_start(self, serialized, prompts, *, run_id: UUID, **kwargs):
+        self._started[run_id] = time.perf_counter()
+
+    async def on_llm_end(self, response, *, run_id: UUID, **kwargs):
+        self._finish(run_id, "llm")
+
+    async def on_llm_error(self, error, *, run_id: UUID, **kwargs):
+        self._finish(run_id, "llm", error=True)
+
+    async def on_tool_start(self, serialized, input_str, *, run_id: UUID, **kwargs):
+        self._started[run_id] = time.perf_counter()
+
+    async def on_tool_end(self, output, *, run_id: UUID, name: Optional[str] = None, **kwargs):
+        self._finish(run_id, "tool", name=name)
+
+    async def on_tool_error(self, error, *, run_id: UUID, name: Optional[str] = None, **kwargs):
+        self._finish(run_id, "tool", name=name, error=True)
+
+    def _finish(self, run_id: UUID, kind: str, name: Optional[str] = None, error: bool = False):
+        started = self._started.pop(run_id, None)
+        if started is None:
+            return
+        step: Dict[str, Any] = {"type": kind, "duration_ms": round((time.perf_counter() - started) * 1000, 2)}
+        if name:
+            step["name"] = name
+        if error:
+            step["error"] = True
+        self.steps.append(step)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "iterations": sum(1 for step in self.steps if step["type"] == "llm"),
+            "llm_ms": round(sum(s["duration_ms"] for s in self.steps if s["type"] == "llm"), 2),
+            "tool_ms": round(sum(s["duration_ms"] for s in self.steps if s["type"] == "tool"), 2),
+            "steps": self.steps
+        }
+
+
+def best_partial_answer(intermediate_steps: List[Tuple[Any, Any]]) -> Optional[str]:
+    """Most useful text from an unfinished run: the last real tool observation, else the last thought."""
+    for action, observation in reversed(intermediate_steps or []):
+        # handle_parsing_errors records format errors as an "_Exception" pseudo-tool
+        if getattr(action, "tool", None) != "_Exception" and str(observation).strip():
+            return str(observation).strip()
+    for action, _ in reversed(intermediate_steps or []):
+        thought = (getattr(action, "log", "") or "").split("Action:")[0].strip()
+        if thought:
+            return thought
+    return None
+
+
+def agent_output(result: Any) -> Tuple[str, bool]:
+    """Final text of an agent run and whether it was cut short by a budget."""
+    if not isinstance(result, dict):
+        return str(result), False
+    output = result.get('output', str(result))
+    if isinstance(output, str) and output.startswith(STOPPED_OUTPUT_PREFIX):
+        return best_partial_answer(result.get('intermediate_steps', [])) or output, True
+    return output, False
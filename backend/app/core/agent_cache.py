@@ -0,0 +1,74 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+
+class AgentCache:
+    """
+    Process-wide LRU cache of constructed agent executors.
+    Agents are keyed by model, provider, tool set, system prompt and API-key scope, so
+    repeated runs of the same agent node skip prompt, LLM and agent setup.
+    """
+
+    def __init__(self, max_size: int = 128):
+        self.max_size = max_size
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(
+        model_name: str, tools: List[Any], system_prompt: str, key_scope: str, provider: Optional[str] = None
+    ) -> Tuple:
+        # Tool identity is part of the key so re-registering a tool builds a fresh agent
+        tool_key = tuple((tool.name, id(tool)) for tool in tools)
+        system_hash = hashlib.sha256((system_prompt or "").encode()).hexdigest()
+        # key_scope fingerprints the key of the provider actually used (after fallbacks)
+        return (model_name, provider, tool_key, system_hash, key_scope)
+
+    def get_or_build(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """Return the cached agent for `key`, building and storing it on a miss."""
+        with self._lock:
+            agent = self._entries.get(key)
+            if agent is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return agent
+            self.misses += 1
+
+        # Build outside the lock; failures raise and are never cached
+        agent = factory()
+
+        with self._lock:
+            self._entries[key] = agent
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return agent
+
+    def clear(self):
+        """Remove all agents and reset counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+
+# Singleton instance
+agent_cache = AgentCache(max_size=int(os.getenv("AGENT_CACHE_MAX_SIZE", "128")))
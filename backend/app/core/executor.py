@@ -1,24 +1,41 @@
-from typing import List, Dict, Any, Set, Optional
+from typing import List, Dict, Any, AsyncIterator, Awaitable, Callable, Iterable, Set, Optional, Tuple
 from collections import deque
+import asyncio
+import json
 import logging
-from app.services.llm_service import get_llm_service
+import os
+import time
+from contextvars import ContextVar
+from app.core.agent_budget import AgentStepTimer, agent_output
+from app.core.agent_cache import agent_cache
+from app.core.llm_batcher import LLMBatcher
+from app.core.plan import CompiledWorkflow
+from app.services.llm_client_pool import key_fingerprint
+from app.services.llm_service import chunk_text, get_llm_service
+from app.services.providers import load_chat_model_class
+from app.services.model_router import model_router
 from app.services.tool_service import tool_service
 from langchain.agents import create_react_agent, AgentExecutor
 from langchain_core.prompts import PromptTemplate
-from langchain_google_genai import ChatGoogleGenerativeAI
 
 logger = logging.getLogger(__name__)
 
-# Lazy imports placeholders or handle inside methods if strict lazy loading needed, 
-# but for now we put imports at top for cleanliness, wrapping optional ones.
-try:
-    from langchain_openai import ChatOpenAI
-except ImportError:
-    ChatOpenAI = None
-try:
-    from langchain_anthropic import ChatAnthropic
-except ImportError:
-    ChatAnthropic = None
+# Provider SDKs are imported when an agent first needs one; a class assigned
+# here (e.g. patched in tests) takes precedence
+ChatGoogleGenerativeAI = None
+ChatOpenAI = None
+ChatAnthropic = None
+
+
+def _chat_model_class(class_name: str) -> Optional[type]:
+    """The provider chat model class, or None when its SDK is not installed."""
+    cls = globals().get(class_name)
+    if cls is not None:
+        return cls
+    try:
+        return load_chat_model_class(class_name)
+    except ImportError:
+        return None
 
 REACT_PROMPT_TEMPLATE = """Answer the following questions as best you can. You have access to the following tools:
 
@@ -41,41 +58,80 @@ System: {system_message}
 Question: {input}
 Thought:{agent_scratchpad}"""
 
+# Parsed once; agents bind their system message with .partial()
+REACT_PROMPT = PromptTemplate.from_template(REACT_PROMPT_TEMPLATE)
+
+EventCallback = Callable[[Dict[str, Any]], Awaitable[None]]
+
+# Process-wide cap on nodes running at once, shared by every execution.
+MAX_CONCURRENT_NODES = int(os.getenv("EXECUTOR_MAX_CONCURRENCY", "16"))
+# Whether ready LLM nodes sharing a model are batched by default (nodes can set data.batch).
+BATCH_LLM_NODES = (os.getenv("EXECUTOR_BATCH_LLM_NODES") or "false").lower() in ("1", "true", "yes")
+# Default agent budgets; nodes override them with data.max_iterations / data.max_execution_time.
+AGENT_MAX_ITERATIONS = int(os.getenv("AGENT_MAX_ITERATIONS", "15"))
+AGENT_MAX_EXECUTION_TIME = float(os.getenv("AGENT_MAX_EXECUTION_TIME") or 0) or None
+
+# Set per node task when the caller wants streaming events; None otherwise.
+_node_event_emitter: ContextVar[Optional[EventCallback]] = ContextVar("node_event_emitter", default=None)
+# Response-cache namespace of the running execution (usually the workflow id).
+_cache_namespace: ContextVar[Optional[str]] = ContextVar("cache_namespace", default=None)
+# Per-execution LLM call grouper; None when batching is off for the execution.
+_llm_batcher: ContextVar[Optional[LLMBatcher]] = ContextVar("llm_batcher", default=None)
+# time.monotonic() by which the whole execution must finish, if the caller set one.
+_execution_deadline: ContextVar[Optional[float]] = ContextVar("execution_deadline", default=None)
+# Extra fields a node processor wants in its execution log entry (e.g. agent step timing).
+_node_log: ContextVar[Optional[Dict[str, Any]]] = ContextVar("node_log", default=None)
+
+_global_limiter: Optional[asyncio.Semaphore] = None
+_global_limiter_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _get_global_limiter() -> asyncio.Semaphore:
+    """Return the process-wide node semaphore for the running event loop."""
+    global _global_limiter, _global_limiter_loop
+    loop = asyncio.get_running_loop()
+    if _global_limiter is None or _global_limiter_loop is not loop:
+        _global_limiter = asyncio.Semaphore(MAX_CONCURRENT_NODES)
+        _global_limiter_loop = loop
+    return _global_limiter
+
+
 class GraphExecutor:
     def __init__(self):
         self.llm_service = get_llm_service()
 
-    async def execute(self, nodes: List[Dict], edges: List[Dict], initial_inputs: Dict[str, Any] = None, user_api_keys: Dict[str, str] = None) -> Dict[str, Any]:
+    async def execute(
+        self,
+        nodes: Optional[List[Dict]] = None,
+        edges: Optional[List[Dict]] = None,
+        initial_inputs: Dict[str, Any] = None,
+        user_api_keys: Dict[str, str] = None,
+        max_concurrency: Optional[int] = None,
+        plan: Optional[CompiledWorkflow] = None,
+        on_event: Optional[EventCallback] = None,
+        workflow_id: Optional[str] = None,
+        batch_llm: Optional[bool] = None,
+        timeout_seconds: Optional[float] = None
+    ) -> Dict[str, Any]:
         """
-        Execute a workflow graph.
+        Execute a workflow graph, given either raw nodes/edges or a precompiled plan.
+        Each node is dispatched as soon as all of its parents have finished, so
+        independent branches run concurrently. At most `max_concurrency` nodes of
+        this execution (and EXECUTOR_MAX_CONCURRENCY across the process) run at once.
+        If `on_event` is given it is awaited with node_started, node_completed and
+        node_failed events as execution progresses. `workflow_id` namespaces the
+        semantic response cache for LLM nodes. With `batch_llm` (default
+        EXECUTOR_BATCH_LLM_NODES), LLM nodes that become ready together and share a
+        model are sent as one batched request; nodes override it with data.batch.
+        `timeout_seconds` is a deadline for the whole run: nodes that would start
+        after it fail, and agent nodes shrink their time budget to fit it.
         Returns the final state/outputs of all nodes.
         """
-        adjacency_list = {node['id']: [] for node in nodes}
-        in_degree = {node['id']: 0 for node in nodes}
-        node_map = {node['id']: node for node in nodes}
-        
-        # Build graph
-        for edge in edges:
-            source = edge['source']
-            target = edge['target']
-            adjacency_list[source].append(target)
-            in_degree[target] += 1
-
-        # Kahn's Algorithm for Topological Sort
-        queue = deque([node_id for node_id, degree in in_degree.items() if degree == 0])
-        sorted_nodes = []
-        
-        while queue:
-            node_id = queue.popleft()
-            sorted_nodes.append(node_id)
-            
-            for neighbor in adjacency_list[node_id]:
-                in_degree[neighbor] -= 1
-                if in_degree[neighbor] == 0:
-                    queue.append(neighbor)
+        if max_concurrency is not None and max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
 
-        if len(sorted_nodes) != len(nodes):
-            raise ValueError("Workflow contains a cycle and cannot be executed.")
+        if plan is None:
+            plan = CompiledWorkflow.from_canvas(nodes or [], edges or [])
 
         # Execution Phase
         execution_context = {}  # Stores outputs of each node: {node_id: output_data}
@@ -84,46 +140,155 @@ class GraphExecutor:
 
         execution_logs = []
 
-        for node_id in sorted_nodes:
-            node = node_map[node_id]
+        local_limiter = asyncio.Semaphore(max_concurrency or MAX_CONCURRENT_NODES)
+        global_limiter = _get_global_limiter()
+
+        durations: Dict[str, float] = {}
+        batcher = LLMBatcher(self.llm_service)
+        deadline = time.monotonic() + timeout_seconds if timeout_seconds else None
+        node_logs: Dict[str, Dict[str, Any]] = {}
+        batch_default = BATCH_LLM_NODES if batch_llm is None else batch_llm
+
+        async def emit(event: Dict[str, Any]):
+            if on_event:
+                await on_event(event)
+
+        async def run_node(node_id: str) -> Any:
+            node = plan.nodes[node_id]
             node_type = node.get('type', 'default')
             node_data = node.get('data', {})
-            
-            try:
-                # Gather inputs from incoming edges
-                inputs = self._gather_inputs(node_id, edges, execution_context)
-                
-                # Execute Node Logic
-                output = await self._process_node(node_type, node_data, inputs, execution_context, user_api_keys)
-                
-                execution_context[node_id] = output
-                execution_logs.append({
-                    "node_id": node_id,
-                    "status": "success",
-                    "output": output
-                })
-                
-            except Exception as e:
-                execution_logs.append({
-                    "node_id": node_id,
-                    "status": "error",
-                    "error": str(e)
-                })
-                # For now, stop on error
-                break
+            _cache_namespace.set(workflow_id)
+            _execution_deadline.set(deadline)
+            _node_log.set(node_logs.setdefault(node_id, {}))
+            if node_data.get('batch', batch_default):
+                _llm_batcher.set(batcher)
+            if on_event:
+                # Lets node processors stream partial output (tokens, agent steps)
+                async def emit_node_event(event: Dict[str, Any]):
+                    await emit({**event, "node_id": node_id})
+                _node_event_emitter.set(emit_node_event)
+            async with local_limiter, global_limiter:
+                await emit({"event": "node_started", "node_id": node_id, "node_type": node_type})
+                started = time.perf_counter()
+                try:
+                    if deadline is not None and time.monotonic() >= deadline:
+                        raise TimeoutError("Execution deadline exceeded before node started")
+
+                    # Gather inputs from incoming edges
+                    inputs = self._gather_inputs(plan.parents[node_id], execution_context)
+                    
+                    # Execute Node Logic
+                    return await self._process_node(node_type, node_data, inputs, execution_context, user_api_keys)
+                finally:
+                    durations[node_id] = round((time.perf_counter() - started) * 1000, 2)
+
+        remaining_parents = {node_id: len(parents) for node_id, parents in plan.parents.items()}
+        ready = deque(plan.roots)
+        running: Dict[asyncio.Task, str] = {}
+        failed = False
+
+        try:
+            while ready or running:
+                while ready and not failed:
+                    node_id = ready.popleft()
+                    running[asyncio.create_task(run_node(node_id))] = node_id
+
+                if not running:
+                    break
+
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+
+                # Handle completions in dispatch order to keep logs deterministic
+                for task in [t for t in running if t in done]:
+                    node_id = running.pop(task)
+                    try:
+                        output = task.result()
+                    except Exception as e:
+                        execution_logs.append({
+                            "node_id": node_id,
+                            "status": "error",
+                            "error": str(e),
+                            "duration_ms": durations.get(node_id),
+                            **node_logs.get(node_id, {})
+                        })
+                        await emit({
+                            "event": "node_failed",
+                            "node_id": node_id,
+                            "error": str(e),
+                            "duration_ms": durations.get(node_id)
+                        })
+                        # For now, stop on error: in-flight nodes finish, nothing new starts
+                        failed = True
+                        continue
+
+                    execution_context[node_id] = output
+                    execution_logs.append({
+                        "node_id": node_id,
+                        "status": "success",
+                        "output": output,
+                        "duration_ms": durations.get(node_id),
+                        **node_logs.get(node_id, {})
+                    })
+                    await emit({
+                        "event": "node_completed",
+                        "node_id": node_id,
+                        "output": output,
+                        "duration_ms": durations.get(node_id)
+                    })
+
+                    for child in plan.children[node_id]:
+                        remaining_parents[child] -= 1
+                        if remaining_parents[child] == 0:
+                            ready.append(child)
+        finally:
+            for task in running:
+                task.cancel()
+            batcher.close()
 
         return {
             "results": execution_context,
             "logs": execution_logs
         }
 
-    def _gather_inputs(self, node_id: str, edges: List[Dict], context: Dict) -> Dict:
+    async def stream(self, **execute_kwargs) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Run `execute` and yield its events as they happen, followed by a final
+        execution_completed (or execution_failed) summary event.
+        Accepts the same keyword arguments as `execute`, except `on_event`.
+        """
+        events: asyncio.Queue = asyncio.Queue()
+        started = time.perf_counter()
+
+        async def run():
+            try:
+                result = await self.execute(on_event=events.put, **execute_kwargs)
+                failed = any(log["status"] == "error" for log in result["logs"])
+                await events.put({
+                    "event": "execution_completed",
+                    "status": "error" if failed else "success",
+                    "results": result["results"],
+                    "logs": result["logs"],
+                    "duration_ms": round((time.perf_counter() - started) * 1000, 2)
+                })
+            except Exception as e:
+                await events.put({"event": "execution_failed", "error": str(e)})
+
+        task = asyncio.create_task(run())
+        try:
+            while True:
+                event = await events.get()
+                yield event
+                if event["event"] in ("execution_completed", "execution_failed"):
+                    break
+        finally:
+            # Consumer went away (e.g. client disconnected): stop the execution
+            task.cancel()
+
+    def _gather_inputs(self, parent_ids: Iterable[str], context: Dict) -> Dict:
         """Collect outputs from parent nodes to serve as inputs for the current node."""
         inputs = {}
-        incoming_edges = [e for e in edges if e['target'] == node_id]
         
-        for edge in incoming_edges:
-            source_id = edge['source']
+        for source_id in parent_ids:
             source_output = context.get(source_id)
             if source_output:
                 # Simple merging of outputs.
@@ -152,7 +317,7 @@ class GraphExecutor:
             return await self._process_agent_node(data, inputs, user_api_keys)
 
         elif node_type == 'tool':
-            return self._process_tool_node(data, inputs)
+            return await self._process_tool_node(data, inputs)
             
         elif node_type == 'end':
             # End node - semantically same as output, just stops the branch
@@ -169,23 +334,66 @@ class GraphExecutor:
         
         model = data.get('model', 'gemini-pro')
         temperature = float(data.get('temperature', 0.7))
+        # Per-node response cache opt-in (true) / opt-out (false); default caches temperature 0 only
+        cache = data.get('cache')
+        # Near-duplicate matching is riskier, so nodes must opt in explicitly
+        semantic_cache = bool(data.get('semantic_cache', False))
+        cache_namespace = data.get('cache_namespace') or _cache_namespace.get()
         
+        # Opt-in failover/hedging to equivalent models when the primary is failing or slow
+        hedge = bool(data.get('hedge', False))
+        fallback_models = data.get('fallback_models')
+
         # Determine key
-        api_key = None
-        if user_api_keys:
-            if "gpt" in model:
-                api_key = user_api_keys.get('openai')
-            elif "gemini" in model:
-                api_key = user_api_keys.get('google')
-            elif "claude" in model:
-                api_key = user_api_keys.get('anthropic')
+        provider = model_router.provider_for(model)
+        api_key = (user_api_keys or {}).get(provider) if provider else None
+
+        batcher = _llm_batcher.get()
+        if batcher and not (hedge or fallback_models or semantic_cache):
+            # Batched nodes report their output on completion instead of streaming tokens
+            response = await batcher.submit(
+                prompt=user_prompt,
+                system_prompt=system_prompt,
+                model_name=model,
+                temperature=temperature,
+                api_key=api_key,
+                provider=provider,
+                cache=cache
+            )
+            return {"generated_text": response}
+
+        emit = _node_event_emitter.get()
+        if emit:
+            # Forward tokens to the caller as they arrive
+            chunks = []
+            async for delta in self.llm_service.stream_text(
+                prompt=user_prompt,
+                system_prompt=system_prompt,
+                model_name=model,
+                temperature=temperature,
+                api_key=api_key,
+                cache=cache,
+                semantic_cache=semantic_cache,
+                cache_namespace=cache_namespace,
+                fallback_models=fallback_models,
+                api_keys=user_api_keys
+            ):
+                chunks.append(delta)
+                await emit({"event": "node_token", "delta": delta})
+            return {"generated_text": "".join(chunks)}
 
         response = await self.llm_service.generate_text(
             prompt=user_prompt,
             system_prompt=system_prompt,
             model_name=model,
             temperature=temperature,
-            api_key=api_key
+            api_key=api_key,
+            cache=cache,
+            semantic_cache=semantic_cache,
+            cache_namespace=cache_namespace,
+            hedge=hedge,
+            fallback_models=fallback_models,
+            api_keys=user_api_keys
         )
         return {"generated_text": response}
 
@@ -199,35 +407,110 @@ class GraphExecutor:
         # 2. Prepare Tools
         tools = []
         for name in selected_tool_names:
-            tool = tool_service.get_tool(name)
+            tool = tool_service.get_agent_tool(name)
             if tool:
                 tools.append(tool)
         
-        # 3. Initialize LLM
-        llm = self._initialize_llm(model_name, user_api_keys)
+        # Budgets: node settings, capped by whatever is left of the execution deadline
+        max_iterations = int(data.get('max_iterations') or AGENT_MAX_ITERATIONS)
+        max_execution_time = float(data.get('max_execution_time') or 0) or AGENT_MAX_EXECUTION_TIME
+        deadline = _execution_deadline.get()
+        if deadline is not None:
+            remaining = max(deadline - time.monotonic(), 0.001)
+            max_execution_time = min(max_execution_time, remaining) if max_execution_time else remaining
+
+        # 3. Reuse the agent built for this model/tools/prompt/backend/key, building it on first use
+        provider, _, api_key = self._resolve_llm_backend(model_name, user_api_keys)
+        cache_key = agent_cache.make_key(model_name, tools, system_prompt, key_fingerprint(api_key), provider)
 
-        # 4. Construct Prompt
-        prompt = PromptTemplate.from_template(REACT_PROMPT_TEMPLATE)
-        
-        # 5. Create Agent
         try:
-            agent = create_react_agent(llm, tools, prompt)
-            agent_executor = AgentExecutor(agent=agent, tools=tools, verbose=True, handle_parsing_errors=True)
+            agent_executor = agent_cache.get_or_build(
+                cache_key, lambda: self._build_agent_executor(model_name, tools, system_prompt, user_api_keys)
+            )
             
-            # 6. Execute
-            input_text = inputs.get('input') or inputs.get('query') or inputs.get('value') or " "
-            
-            result = await agent_executor.ainvoke({
-                "input": input_text,
-                "system_message": system_prompt
+            # 4. Apply this run's budgets to a shallow copy of the shared executor
+            agent_executor = agent_executor.model_copy(update={
+                "max_iterations": max_iterations,
+                "max_execution_time": max_execution_time,
+                "return_intermediate_steps": True
             })
-            output_text = result.get('output', str(result))
+
+            # 5. Execute
+            input_text = inputs.get('input') or inputs.get('query') or inputs.get('value') or " "
+            agent_input = {"input": input_text}
+            timer = AgentStepTimer()
+            config = {"callbacks": [timer]}
+
+            try:
+                emit = _node_event_emitter.get()
+                if emit:
+                    result = await self._stream_agent(agent_executor, agent_input, emit, config)
+                else:
+                    result = await agent_executor.ainvoke(agent_input, config=config)
+            finally:
+                self._record_node_log(agent=timer.summary())
+
+            output_text, budget_exhausted = agent_output(result)
+            if budget_exhausted:
+                logger.warning(f"Agent stopped by its budget after {timer.summary()['iterations']} LLM calls")
+                self._record_node_log(agent={**timer.summary(), "budget_exhausted": True})
+                return {"output": output_text, "generated_text": output_text, "partial": True}
             return {"output": output_text, "generated_text": output_text}
         except Exception as e:
             logger.error(f"Agent execution failed: {e}")
             return {"output": f"Agent Error: {str(e)}", "error": str(e)}
 
-    def _process_tool_node(self, data: Dict, inputs: Dict) -> Dict:
+    def _build_agent_executor(
+        self, model_name: str, tools: List[Any], system_prompt: str, user_api_keys: Dict[str, str] = None
+    ) -> AgentExecutor:
+        """Construct a ReAct AgentExecutor with the system prompt bound into the template."""
+        llm = self._initialize_llm(model_name, user_api_keys)
+        prompt = REACT_PROMPT.partial(system_message=system_prompt)
+        agent = create_react_agent(llm, tools, prompt)
+        # Verbose chain output only when debugging; it costs a callback per step otherwise
+        return AgentExecutor(
+            agent=agent,
+            tools=tools,
+            verbose=logger.isEnabledFor(logging.DEBUG),
+            handle_parsing_errors=True
+        )
+
+    @staticmethod
+    def _record_node_log(**fields: Any):
+        """Attach fields to the running node's execution log entry."""
+        node_log = _node_log.get()
+        if node_log is not None:
+            node_log.update(fields)
+
+    async def _stream_agent(
+        self, agent_executor: AgentExecutor, agent_input: Dict, emit: EventCallback, config: Optional[Dict] = None
+    ) -> Any:
+        """Run an agent via astream_events, forwarding token deltas and tool steps. Returns the final result."""
+        result: Any = {}
+        async for event in agent_executor.astream_events(agent_input, version="v2", config=config):
+            kind = event["event"]
+            if kind == "on_chat_model_stream":
+                delta = chunk_text(event["data"]["chunk"].content)
+                if delta:
+                    await emit({"event": "node_token", "delta": delta})
+            elif kind == "on_tool_start":
+                await emit({
+                    "event": "agent_action",
+                    "tool": event["name"],
+                    "tool_input": event["data"].get("input")
+                })
+            elif kind == "on_tool_end":
+                await emit({
+                    "event": "agent_step",
+                    "tool": event["name"],
+                    "observation": str(event["data"].get("output"))
+                })
+            elif kind == "on_chain_end" and not event.get("parent_ids"):
+                # Root run finished: this is the AgentExecutor's final result
+                result = event["data"].get("output") or {}
+        return result
+
+    async def _process_tool_node(self, data: Dict, inputs: Dict) -> Dict:
         """Handle Tool Node execution."""
         tool_name = data.get('tool')
         input_data = inputs.get('input') or inputs.get('query') or inputs.get('expression') or inputs.get('value') or " "
@@ -235,29 +518,43 @@ class GraphExecutor:
         if not tool_name:
             raise ValueError("Tool node missing 'tool' name configuration")
             
-        output = tool_service.execute_tool(tool_name, str(input_data))
+        # Structured input (e.g. a Calculator batch of variable rows) is passed as JSON
+        if isinstance(input_data, (dict, list)):
+            input_data = json.dumps(input_data, default=str)
+        output = await tool_service.aexecute_tool(tool_name, str(input_data))
         return {"output": output}
 
-    def _initialize_llm(self, model_name: str, user_api_keys: Dict[str, str] = None):
-        """Helper to initialize the correct LLM backend based on model name."""
-        api_key = None
-        
-        if "gpt" in model_name:
-            if user_api_keys: api_key = user_api_keys.get('openai')
-            if ChatOpenAI:
-                 return ChatOpenAI(model=model_name, temperature=0, api_key=api_key) # If api_key is None, it falls back to env if configured
+    def _resolve_llm_backend(
+        self, model_name: str, user_api_keys: Dict[str, str] = None
+    ) -> Tuple[str, str, Optional[str]]:
+        """(provider, model, API key) that _initialize_llm will use, after SDK fallbacks."""
+        provider = model_router.provider_for(model_name)
+        keys = user_api_keys or {}
+        if provider == "openai":
+            if _chat_model_class("ChatOpenAI"):
+                return "openai", model_name, keys.get("openai")
             logger.warning("langchain_openai not installed or failed to import, fallback to Gemini")
-
-        if "claude" in model_name:
-             if user_api_keys: api_key = user_api_keys.get('anthropic')
-             if ChatAnthropic:
-                return ChatAnthropic(model=model_name, temperature=0, api_key=api_key)
-        
+        elif provider == "anthropic" and _chat_model_class("ChatAnthropic"):
+            return "anthropic", model_name, keys.get("anthropic")
         # Default to Gemini
-        api_model_name = "gemini-1.5-pro"
-        if "gemini" in model_name: 
-            api_model_name = "gemini-1.5-pro"
-            if user_api_keys: api_key = user_api_keys.get('google')
-        
-        return ChatGoogleGenerativeAI(model=api_model_name, temperature=0, google_api_key=api_key)
+        return "google", "gemini-1.5-pro", keys.get("google")
+
+    def _initialize_llm(self, model_name: str, user_api_keys: Dict[str, str] = None):
+        """Helper to get the correct (pooled) LLM backend based on model name."""
+        pool = self.llm_service.client_pool
+        provider, api_model_name, api_key = self._resolve_llm_backend(model_name, user_api_keys)
+
+        if provider == "openai":
+            chat_openai = _chat_model_class("ChatOpenAI")
+            # If api_key is None, it falls back to env if configured
+            return pool.get("openai", api_model_name, api_key, 0,
+                            factory=lambda: chat_openai(model=api_model_name, temperature=0, api_key=api_key))
+
+        if provider == "anthropic":
+            chat_anthropic = _chat_model_class("ChatAnthropic")
+            return pool.get("anthropic", api_model_name, api_key, 0,
+                            factory=lambda: chat_anthropic(model=api_model_name, temperature=0, api_key=api_key))
 
+        chat_google = ChatGoogleGenerativeAI or load_chat_model_class("ChatGoogleGenerativeAI")
+        return pool.get("google", api_model_name, api_key, 0,
+                        factory=lambda: chat_google(model=api_model_name, temperature=0, google_api_key=api_key))
@@ -0,0 +1,86 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+GroupKey = Tuple[str, float, Optional[str], Optional[str], Optional[bool]]
+
+
+class LLMBatcher:
+    """
+    Groups LLM node calls submitted in the same scheduling tick.
+    Calls that share model, temperature, key and cache setting are sent as one
+    `generate_text_batch` dispatch; each caller gets its own result or error.
+    """
+
+    def __init__(self, llm_service, max_concurrency: Optional[int] = None):
+        self.llm_service = llm_service
+        self.max_concurrency = max_concurrency
+        self._pending: Dict[GroupKey, List[Tuple[str, Optional[str], asyncio.Future]]] = {}
+        self._flush_scheduled = False
+        self._dispatches: Set[asyncio.Task] = set()
+        self.batches = 0
+        self.batched_calls = 0
+
+    async def submit(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        model_name: str,
+        temperature: float,
+        api_key: Optional[str] = None,
+        provider: Optional[str] = None,
+        cache: Optional[bool] = None
+    ) -> str:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        key = (model_name, float(temperature), api_key, provider, cache)
+        self._pending.setdefault(key, []).append((prompt, system_prompt, future))
+        if not self._flush_scheduled:
+            # Runs after every node task started in this dispatch round has submitted
+            self._flush_scheduled = True
+            loop.call_soon(self._flush)
+        return await future
+
+    def close(self):
+        """Cancel dispatches still in flight (the execution is over)."""
+        for task in self._dispatches:
+            task.cancel()
+
+    def _flush(self):
+        self._flush_scheduled = False
+        groups, self._pending = self._pending, {}
+        for key, items in groups.items():
+            task = asyncio.ensure_future(self._dispatch(key, items))
+            self._dispatches.add(task)
+            task.add_done_callback(self._dispatches.discard)
+
+    async def _dispatch(self, key: GroupKey, items: List[Tuple[str, Optional[str], asyncio.Future]]):
+        model_name, temperature, api_key, provider, cache = key
+        self.batches += 1
+        self.batched_calls += len(items)
+        if len(items) > 1:
+            logger.info(f"Batching {len(items)} LLM calls to {model_name}")
+        try:
+            results: List[Any] = await self.llm_service.generate_text_batch(
+                prompts=[prompt for prompt, _, _ in items],
+                system_prompt=[system_prompt for _, system_prompt, _ in items],
+                model_name=model_name,
+                temperature=temperature,
+                api_key=api_key,
+                provider=provider,
+                cache=cache,
+                max_concurrency=self.max_concurrency,
+                return_exceptions=True
+            )
+        except Exception as e:
+            results = [e] * len(items)
+
+        for (_, _, future), result in zip(items, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
@@ -0,0 +1,91 @@
+from collections import deque
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Tuple
+
+
+def _copy_json(value: Any) -> Any:
+    """Copy of JSON-shaped data (dicts, lists, scalars); cheaper than copy.deepcopy."""
+    if isinstance(value, dict):
+        return {key: _copy_json(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_copy_json(item) for item in value]
+    return value
+
+
+def _freeze_node(node: Mapping[str, Any]) -> Mapping[str, Any]:
+    """Read-only copy of a canvas node; its `data` mapping is read-only too."""
+    frozen = _copy_json(dict(node))
+    if isinstance(frozen.get('data'), dict):
+        frozen['data'] = MappingProxyType(frozen['data'])
+    return MappingProxyType(frozen)
+
+
+@dataclass(frozen=True)
+class CompiledWorkflow:
+    """
+    Validated, immutable execution plan for a workflow graph.
+    Built once from canvas nodes/edges so executions don't redo graph bookkeeping.
+    """
+    nodes: Mapping[str, Mapping[str, Any]]       # node_id -> read-only node definition
+    order: Tuple[str, ...]                       # topological order
+    parents: Mapping[str, Tuple[str, ...]]       # node_id -> source ids, in edge order
+    children: Mapping[str, Tuple[str, ...]]      # node_id -> dispatch targets
+
+    @property
+    def roots(self) -> Tuple[str, ...]:
+        """Nodes with no incoming edges, in topological order."""
+        return tuple(node_id for node_id in self.order if not self.parents[node_id])
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    @classmethod
+    def from_canvas(cls, nodes: List[Dict], edges: List[Dict]) -> "CompiledWorkflow":
+        """Validate a ReactFlow nodes/edges pair and compile it into a plan."""
+        node_map: Dict[str, Mapping[str, Any]] = {}
+        for node in nodes:
+            node_id = node.get('id')
+            if node_id is None:
+                raise ValueError("Workflow node is missing an 'id'.")
+            if node_id in node_map:
+                raise ValueError(f"Workflow contains duplicate node id '{node_id}'.")
+            # Plans are shared across executions, so detach them from the canvas once here
+            node_map[node_id] = _freeze_node(node)
+
+        parents: Dict[str, List[str]] = {node_id: [] for node_id in node_map}
+        children: Dict[str, List[str]] = {node_id: [] for node_id in node_map}
+        in_degree = {node_id: 0 for node_id in node_map}
+
+        for edge in edges:
+            source = edge.get('source')
+            target = edge.get('target')
+            for endpoint in (source, target):
+                if endpoint not in node_map:
+                    raise ValueError(f"Edge references unknown node '{endpoint}'.")
+            children[source].append(target)
+            parents[target].append(source)
+            in_degree[target] += 1
+
+        # Kahn's Algorithm for Topological Sort
+        queue = deque([node_id for node_id, degree in in_degree.items() if degree == 0])
+        order = []
+
+        while queue:
+            node_id = queue.popleft()
+            order.append(node_id)
+
+            for neighbor in children[node_id]:
+                in_degree[neighbor] -= 1
+                if in_degree[neighbor] == 0:
+                    queue.append(neighbor)
+
+        if len(order) != len(node_map):
+            raise ValueError("Workflow contains a cycle and cannot be executed.")
+
+        return cls(
+            nodes=MappingProxyType(node_map),
+            order=tuple(order),
+            parents=MappingProxyType({k: tuple(v) for k, v in parents.items()}),
+            children=MappingProxyType({k: tuple(v) for k, v in children.items()}),
+        )
@@ -0,0 +1,127 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.core.plan import CompiledWorkflow
+
+
+class PlanCache:
+    """
+    Process-wide LRU cache of compiled workflow plans.
+    Saved workflows are keyed by (workflow_id, version), e.g. their updated_at, so
+    a hit costs no hashing; unsaved canvases are keyed by a content hash of nodes
+    and edges. Either way a graph is compiled once per version however often it runs.
+    """
+
+    def __init__(self, max_size: int = 256, ttl_seconds: float = 3600):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[CompiledWorkflow, float]]" = OrderedDict()
+        self._workflow_keys: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def content_hash(nodes: List[Dict], edges: List[Dict]) -> str:
+        """Stable hash of a workflow's graph content."""
+        payload = json.dumps(
+            {"nodes": nodes, "edges": edges},
+            sort_keys=True,
+            separators=(",", ":"),
+            default=str
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    @staticmethod
+    def version_key(workflow_id: str, version: Any) -> str:
+        """Key of a saved workflow at a given version (e.g. its updated_at)."""
+        return f"workflow:{workflow_id}@{version}"
+
+    def get_or_compile(
+        self,
+        nodes: List[Dict],
+        edges: List[Dict],
+        workflow_id: Optional[str] = None,
+        version: Any = None
+    ) -> CompiledWorkflow:
+        """
+        Return the cached plan for this graph, compiling and storing it on a miss.
+        Pass `version` with `workflow_id` for saved workflows to skip hashing the canvas.
+        """
+        if workflow_id is not None and version is not None:
+            key = self.version_key(workflow_id, version)
+        else:
+            key = self.content_hash(nodes, edges)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                plan, created_at = entry
+                if now - created_at < self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self._remember(workflow_id, key)
+                    self.hits += 1
+                    return plan
+                del self._entries[key]
+                self.evictions += 1
+            self.misses += 1
+
+        # Compile outside the lock; invalid graphs raise and are never cached
+        plan = CompiledWorkflow.from_canvas(nodes, edges)
+
+        with self._lock:
+            self._entries[key] = (plan, now)
+            self._entries.move_to_end(key)
+            self._remember(workflow_id, key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return plan
+
+    def invalidate(self, workflow_id: str) -> int:
+        """Drop every plan compiled for a workflow. Returns the number removed."""
+        with self._lock:
+            keys = self._workflow_keys.pop(str(workflow_id), set())
+            removed = 0
+            for key in keys:
+                if self._entries.pop(key, None) is not None:
+                    removed += 1
+            return removed
+
+    def clear(self):
+        """Remove all plans and reset counters."""
+        with self._lock:
+            self._entries.clear()
+            self._workflow_keys.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current occupancy."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+    def _remember(self, workflow_id: Optional[str], key: str):
+        if workflow_id is not None:
+            self._workflow_keys.setdefault(str(workflow_id), set()).add(key)
+
+
+# Singleton instance
+plan_cache = PlanCache(
+    max_size=int(os.getenv("PLAN_CACHE_MAX_SIZE", "256")),
+    ttl_seconds=float(os.getenv("PLAN_CACHE_TTL_SECONDS", "3600"))
+)
@@ -1,16 +1,21 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+import asyncio
 import os
 from dotenv import load_dotenv
-from app.api import auth, workflows, settings
-from app.db.database import create_tables
+
+# Load environment variables first: the database engines and services read them at import
+load_dotenv()
+
+from app.api import auth, workflows, settings, executions, metrics
+from app.db.database import create_tables, dispose_async_engines
 # Import models to ensure tables are created
 from app.models.user import User
 from app.models.workflow import Workflow
 from app.models.credential import UserCredential
-
-# Load environment variables
-load_dotenv()
+from app.models.execution_job import ExecutionJob
+from app.services.job_queue import job_queue
+from app.services.tool_service import tool_service
 
 app = FastAPI(
     title="AgentWeave API",
@@ -33,14 +38,29 @@ app.add_middleware(
 # Create database tables on startup
 @app.on_event("startup")
 async def startup_event():
-    """Create database tables on application startup"""
+    """Create database tables, optionally prewarm, and start background execution workers"""
     create_tables()
+    if os.getenv("PREWARM_ON_STARTUP", "false").lower() in ("1", "true", "yes"):
+        # Startup (and so readiness) waits until SDKs, executor and tools are loaded
+        from app.services.providers import prewarm
+        app.state.prewarm = await asyncio.to_thread(prewarm)
+    await job_queue.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background execution workers, tool sandboxes and pooled database connections"""
+    await job_queue.stop()
+    tool_service.shutdown()
+    await dispose_async_engines()
 
 
 # Include routers
 app.include_router(auth.router, prefix="/api")
 app.include_router(workflows.router, prefix="/api")
 app.include_router(settings.router, prefix="/api")
+app.include_router(executions.router, prefix="/api")
+app.include_router(metrics.router, prefix="/api")
 
 
 @app.get("/")
@@ -55,6 +75,7 @@ async def root():
             "health": "/health",
             "auth": "/auth",
             "workflows": "/workflows",
+            "metrics": "/metrics",
             "docs": "/docs",
             "openapi": "/openapi.json"
         }
@@ -0,0 +1,37 @@
+from sqlalchemy import Column, String, Text, Integer, DateTime, ForeignKey, Index
+from sqlalchemy.dialects.sqlite import JSON as SQLiteJSON
+import uuid
+from datetime import datetime
+from app.db.database import Base
+
+# Job lifecycle: queued -> running -> success | error
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCESS = "success"
+JOB_ERROR = "error"
+
+class ExecutionJob(Base):
+    """A workflow execution queued for background workers."""
+    __tablename__ = "execution_jobs"
+
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    workflow_id = Column(String(36), nullable=False, index=True)
+    user_id = Column(String(36), ForeignKey("users.id"), nullable=False)
+    status = Column(String(20), nullable=False, default=JOB_QUEUED)
+    payload = Column(SQLiteJSON, nullable=False, default={})  # nodes, edges, initial_inputs, max_concurrency, timeout_seconds
+    results = Column(SQLiteJSON, nullable=True)
+    logs = Column(SQLiteJSON, nullable=True)
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    worker_id = Column(String(64), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_execution_jobs_status_created", "status", "created_at"),
+    )
+
+    def __repr__(self):
+        return f"<ExecutionJob {self.id} {self.status}>"
@@ -0,0 +1,22 @@
+from pydantic import BaseModel
+from typing import Optional, Dict, Any, List
+from datetime import datetime
+
+class ExecutionJobAccepted(BaseModel):
+    """Schema returned when an execution is queued"""
+    job_id: str
+    workflow_id: str
+    status: str
+
+class ExecutionJobResponse(BaseModel):
+    """Schema for a queued execution's status and results"""
+    job_id: str
+    workflow_id: str
+    status: str
+    results: Optional[Dict[str, Any]] = None
+    logs: Optional[List[Dict[str, Any]]] = None
+    error: Optional[str] = None
+    attempts: int
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
@@ -34,6 +34,9 @@ class WorkflowExecutionRequest(BaseModel):
     initial_inputs: Optional[Dict[str, Any]] = None
     nodes: Optional[List[Dict[str, Any]]] = None
     edges: Optional[List[Dict[str, Any]]] = None
+    max_concurrency: Optional[int] = Field(None, ge=1)
+    # Wall-clock budget for the whole run, in seconds
+    timeout_seconds: Optional[float] = Field(None, gt=0)
 
 class WorkflowExecutionResponse(BaseModel):
     """Schema for execution results"""
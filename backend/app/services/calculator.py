@@ -0,0 +1,223 @@
+import ast
+import json
+import logging
+import math
+import operator
+import os
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Mapping, Union
+
+import numpy as np
+from simpleeval import simple_eval
+
+from app.services.tool_cache import ToolFailure
+
+logger = logging.getLogger(__name__)
+
+# Same exponent guard as simpleeval, so "9**9**9" can't pin a CPU
+MAX_POWER = 4000000
+# Largest number of rows a batch evaluation may produce
+MAX_BATCH_SIZE = int(os.getenv("CALCULATOR_MAX_BATCH_SIZE", "100000"))
+
+Evaluator = Callable[[Mapping[str, Any]], Any]
+
+
+class UnsupportedExpression(ValueError):
+    """The expression uses syntax outside the compiled whitelist."""
+
+
+# int64 results at or beyond this magnitude have wrapped around
+_INT64_LIMIT = float(2 ** 63)
+
+
+def _is_array(*values) -> bool:
+    return any(isinstance(v, np.ndarray) for v in values)
+
+
+def _is_int_array(value) -> bool:
+    return np.asarray(value).dtype.kind in "biu"
+
+
+def _safe_power(base, exponent):
+    if not _is_array(base, exponent):
+        if abs(base) > MAX_POWER or abs(exponent) > MAX_POWER:
+            raise ValueError(f"Sorry! I don't want to evaluate {base} ** {exponent}")
+        return base ** exponent
+    if not (_is_int_array(base) and _is_int_array(exponent)):
+        return np.power(base, exponent)
+    # Python ints never overflow and give floats for negative exponents; int64 does neither
+    as_float = np.power(np.asarray(base, dtype=np.float64), exponent)
+    if np.any(np.asarray(exponent) < 0) or np.any(np.abs(as_float) >= _INT64_LIMIT):
+        return as_float
+    return np.power(base, exponent)
+
+
+def _zero_divisor_safe(op: Callable, array_op: Callable) -> Callable:
+    """Python raises on x // 0 and x % 0; in a batch those rows become NaN (null in the result)."""
+    def apply(left, right):
+        if not _is_array(left, right):
+            return op(left, right)
+        result = array_op(left, right)
+        zero = np.asarray(right) == 0
+        if np.any(zero):
+            result = np.where(zero, np.nan, result)
+        return result
+    return apply
+
+
+def _array_log(x, base=None):
+    if base is None:
+        return np.log(x)
+    # math.log rejects a non-positive base; np.log(0) = -inf would otherwise give -0.0
+    return np.where(np.asarray(base) > 0, np.log(x) / np.log(base), np.nan)
+
+
+def _array_extreme(reduce: Callable) -> Callable:
+    # min(a, b, c) reduces over all arguments, not just the first two
+    return lambda *values: reduce(np.broadcast_arrays(*values))
+
+
+_BINARY_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: _zero_divisor_safe(operator.floordiv, np.floor_divide),
+    ast.Mod: _zero_divisor_safe(operator.mod, np.mod),
+    ast.Pow: _safe_power,
+}
+_UNARY_OPS = {ast.USub: operator.neg, ast.UAdd: operator.pos}
+_COMPARE_OPS = {
+    ast.Lt: operator.lt, ast.LtE: operator.le,
+    ast.Gt: operator.gt, ast.GtE: operator.ge,
+    ast.Eq: operator.eq, ast.NotEq: operator.ne,
+}
+# name -> (scalar implementation, array implementation)
+_FUNCTIONS = {
+    "abs": (abs, np.abs),
+    "round": (round, np.round),
+    "min": (min, _array_extreme(np.minimum.reduce)),
+    "max": (max, _array_extreme(np.maximum.reduce)),
+    "sqrt": (math.sqrt, np.sqrt),
+    "exp": (math.exp, np.exp),
+    "log": (math.log, _array_log),
+    "log10": (math.log10, np.log10),
+    "sin": (math.sin, np.sin),
+    "cos": (math.cos, np.cos),
+    "tan": (math.tan, np.tan),
+    "floor": (math.floor, np.floor),
+    "ceil": (math.ceil, np.ceil),
+    "int": (int, lambda a: np.asarray(a).astype(np.int64)),
+    "float": (float, lambda a: np.asarray(a, dtype=np.float64)),
+}
+_CONSTANTS = {"pi": math.pi, "e": math.e, "True": True, "False": False}
+
+
+def normalize_expression(expression: str) -> str:
+    """Canonical form used as the compile-cache key (whitespace-insensitive)."""
+    return " ".join(expression.split())
+
+
+def _compile_node(node: ast.AST) -> Evaluator:
+    """Turn a whitelisted AST node into a closure over a variables mapping."""
+    if isinstance(node, ast.Expression):
+        return _compile_node(node.body)
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float, bool):
+        value = node.value
+        return lambda env: value
+    if isinstance(node, ast.Name):
+        name = node.id
+        if name in _CONSTANTS:
+            value = _CONSTANTS[name]
+            return lambda env: value
+
+        def lookup(env):
+            if name not in env:
+                raise NameError(f"'{name}' is not defined")
+            return env[name]
+        return lookup
+    if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPS:
+        op, left, right = _BINARY_OPS[type(node.op)], _compile_node(node.left), _compile_node(node.right)
+        return lambda env: op(left(env), right(env))
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPS:
+        op, operand = _UNARY_OPS[type(node.op)], _compile_node(node.operand)
+        return lambda env: op(operand(env))
+    if isinstance(node, ast.Compare) and len(node.ops) == 1 and type(node.ops[0]) in _COMPARE_OPS:
+        op, left, right = _COMPARE_OPS[type(node.ops[0])], _compile_node(node.left), _compile_node(node.comparators[0])
+        return lambda env: op(left(env), right(env))
+    if (
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Name)
+        and node.func.id in _FUNCTIONS
+        and not node.keywords
+    ):
+        scalar_fn, array_fn = _FUNCTIONS[node.func.id]
+        args = [_compile_node(arg) for arg in node.args]
+
+        def call(env):
+            values = [arg(env) for arg in args]
+            if _is_array(*values):
+                return array_fn(*values)
+            return scalar_fn(*values)
+        return call
+    raise UnsupportedExpression(f"Unsupported syntax: {type(node).__name__}")
+
+
+@lru_cache(maxsize=int(os.getenv("CALCULATOR_CACHE_SIZE", "1024")))
+def compile_expression(normalized: str) -> Evaluator:
+    """Parse and validate an expression once; the result is reused for every evaluation."""
+    try:
+        tree = ast.parse(normalized, mode="eval")
+    except SyntaxError as e:
+        raise UnsupportedExpression(str(e)) from e
+    return _compile_node(tree)
+
+
+def evaluate(expression: str, variables: Mapping[str, Any] = None) -> Any:
+    """Evaluate a scalar expression, falling back to simpleeval for syntax we don't compile."""
+    normalized = normalize_expression(expression)
+    try:
+        evaluator = compile_expression(normalized)
+    except UnsupportedExpression:
+        return simple_eval(normalized, names=dict(variables or {}))
+    return evaluator(variables or {})
+
+
+def evaluate_batch(expression: str, variables: Mapping[str, Union[List[Any], Any]]) -> List[Any]:
+    """
+    Evaluate one expression over arrays of variable bindings in a single vectorized
+    pass. Lists are broadcast against each other and against scalar variables.
+    """
+    arrays = {}
+    for name, value in variables.items():
+        array = np.asarray(value)
+        if array.dtype.kind not in "biuf":
+            raise ValueError(f"Variable '{name}' must be numeric")
+        arrays[name] = array
+    size = np.broadcast_shapes(*(a.shape for a in arrays.values())) if arrays else ()
+    if int(np.prod(size)) > MAX_BATCH_SIZE:
+        raise ValueError(f"Batch larger than {MAX_BATCH_SIZE} rows")
+    evaluator = compile_expression(normalize_expression(expression))
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        result = np.broadcast_to(evaluator(arrays), size)
+    if result.dtype.kind == "f":
+        # Rows that divide by zero or overflow come back as null instead of NaN/inf
+        result = np.where(np.isfinite(result), result, None)
+    return result.tolist()
+
+
+def calculator_func(input_str: str) -> str:
+    """
+    Calculates a mathematical expression.
+    A JSON object {"expression": ..., "variables": {name: [values]}} evaluates the
+    expression for every row of the variables and returns a JSON list.
+    """
+    try:
+        text = input_str.strip()
+        if text.startswith("{"):
+            payload: Dict[str, Any] = json.loads(text)
+            return json.dumps(evaluate_batch(payload["expression"], payload.get("variables") or {}))
+        return str(evaluate(text))
+    except Exception as e:
+        logger.error(f"Calculator error for input '{input_str}': {e}")
+        return ToolFailure(f"Error calculating: {str(e)}")
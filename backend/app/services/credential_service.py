@@ -0,0 +1,35 @@
+from typing import Dict, List
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.models.credential import UserCredential
+from app.services.encryption import get_encryption_service
+
+
+def get_user_api_keys(db: Session, user_id: str) -> Dict[str, str]:
+    """Fetch and decrypt a user's active provider keys, keyed by provider."""
+    user_creds = db.query(UserCredential).filter(UserCredential.user_id == str(user_id)).all()
+    return _decrypt_keys(user_creds)
+
+
+async def aget_user_api_keys(db: AsyncSession, user_id: str) -> Dict[str, str]:
+    """Async version of `get_user_api_keys` for request handlers."""
+    user_creds = (await db.scalars(
+        select(UserCredential).where(UserCredential.user_id == str(user_id))
+    )).all()
+    return _decrypt_keys(user_creds)
+
+
+def _decrypt_keys(user_creds: List[UserCredential]) -> Dict[str, str]:
+    encryption_service = get_encryption_service()
+    
+    user_api_keys = {}
+    for cred in user_creds:
+        if cred.is_active:
+            try:
+                decrypted = encryption_service.decrypt(cred.api_key_encrypted)
+                if decrypted:
+                    user_api_keys[cred.provider] = decrypted
+            except Exception:
+                pass
+    return user_api_keys
@@ -0,0 +1,126 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+Attempt = Tuple[str, Callable[[], Awaitable[Any]]]
+
+
+class LatencyTracker:
+    """Sliding window of recent successful call latencies per model."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.window = window
+        self.min_samples = min_samples
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, model_name: str, seconds: float):
+        with self._lock:
+            samples = self._samples.get(model_name)
+            if samples is None:
+                samples = self._samples[model_name] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def percentile(self, model_name: str, q: float) -> Optional[float]:
+        """Latency at quantile `q` (0-1), or None until `min_samples` calls were seen."""
+        with self._lock:
+            samples = sorted(self._samples.get(model_name, ()))
+        if len(samples) < max(self.min_samples, 1):
+            return None
+        return samples[min(int(q * len(samples)), len(samples) - 1)]
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            models = list(self._samples)
+        return {
+            model: {
+                "samples": len(self._samples[model]),
+                "p50": self.percentile(model, 0.5),
+                "p95": self.percentile(model, 0.95),
+                "p99": self.percentile(model, 0.99)
+            }
+            for model in models
+        }
+
+
+class HedgedCaller:
+    """
+    Runs a call against a primary model with ordered backups.
+    A backup starts when the primary errors (failover) or, with hedging on,
+    when it is still running past its observed p95. First success wins and
+    the other in-flight attempts are cancelled. Attempts report their
+    latency by wrapping the provider call in `timed`, so time spent queueing
+    (e.g. for rate limits) stays out of the samples.
+    """
+
+    def __init__(self, tracker: Optional[LatencyTracker] = None, quantile: float = 0.95):
+        self.tracker = tracker or LatencyTracker()
+        self.quantile = quantile
+        self.hedges = 0
+        self.failovers = 0
+        self.backup_wins = 0
+
+    async def call(self, attempts: List[Attempt], hedge: bool = False) -> Tuple[str, Any]:
+        """Return (winning model, result); raises the first error if every attempt fails."""
+        if not attempts:
+            raise ValueError("No models available to call")
+        if len(attempts) == 1:
+            model_name, fn = attempts[0]
+            return model_name, await fn()
+        pending: Dict[asyncio.Future, str] = {}
+        errors: List[BaseException] = []
+        next_index = 0
+
+        def launch():
+            nonlocal next_index
+            model_name, fn = attempts[next_index]
+            next_index += 1
+            pending[asyncio.ensure_future(fn())] = model_name
+
+        launch()
+        try:
+            while pending:
+                timeout = None
+                if hedge and next_index < len(attempts):
+                    timeout = self.tracker.percentile(attempts[next_index - 1][0], self.quantile)
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    self.hedges += 1
+                    logger.info(f"Hedging {attempts[next_index - 1][0]} after {timeout:.2f}s with {attempts[next_index][0]}")
+                    launch()
+                    continue
+                for task in done:
+                    model_name = pending.pop(task)
+                    if task.exception() is None:
+                        if model_name != attempts[0][0]:
+                            self.backup_wins += 1
+                        return model_name, task.result()
+                    errors.append(task.exception())
+                    logger.warning(f"Call to {model_name} failed: {task.exception()}")
+                if not pending and next_index < len(attempts):
+                    self.failovers += 1
+                    launch()
+            raise errors[0]
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def timed(self, model_name: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Await `fn()` and record how long it took as a latency sample for `model_name`."""
+        started = time.monotonic()
+        result = await fn()
+        self.tracker.record(model_name, time.monotonic() - started)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hedges": self.hedges,
+            "failovers": self.failovers,
+            "backup_wins": self.backup_wins,
+            "latency": self.tracker.stats()
+        }
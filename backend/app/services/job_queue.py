@@ -0,0 +1,305 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.db.database import SessionLocal
+from app.models.execution_job import ExecutionJob, JOB_QUEUED, JOB_RUNNING, JOB_SUCCESS, JOB_ERROR
+from app.services.credential_service import get_user_api_keys
+
+logger = logging.getLogger(__name__)
+
+# Databases supporting SELECT ... FOR UPDATE SKIP LOCKED
+ROW_LOCKING_DIALECTS = ("postgresql", "mysql", "mariadb")
+
+
+def _json_safe(value: Any) -> Any:
+    """Round-trip through JSON so arbitrary node outputs fit a JSON column."""
+    return json.loads(json.dumps(value, default=str))
+
+
+class JobQueue:
+    """
+    Durable workflow execution queue backed by the execution_jobs table.
+    Jobs are claimed with a compare-and-set on their status, so any number of
+    workers (in this process or others sharing the database) can drain it.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        num_workers: int = 2,
+        poll_interval: float = 1.0,
+        lease_seconds: float = 300,
+        max_attempts: int = 3
+    ):
+        self.session_factory = session_factory
+        self.num_workers = num_workers
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.worker_prefix = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._workers: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def enqueue(
+        self,
+        db: Session,
+        workflow_id: str,
+        user_id: str,
+        nodes: List[Dict],
+        edges: List[Dict],
+        initial_inputs: Optional[Dict[str, Any]] = None,
+        max_concurrency: Optional[int] = None,
+        timeout_seconds: Optional[float] = None
+    ) -> ExecutionJob:
+        """Persist a new job and wake an idle worker."""
+        job = self._new_job(workflow_id, user_id, nodes, edges, initial_inputs, max_concurrency, timeout_seconds)
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job
+
+    async def aenqueue(
+        self,
+        db: AsyncSession,
+        workflow_id: str,
+        user_id: str,
+        nodes: List[Dict],
+        edges: List[Dict],
+        initial_inputs: Optional[Dict[str, Any]] = None,
+        max_concurrency: Optional[int] = None,
+        timeout_seconds: Optional[float] = None
+    ) -> ExecutionJob:
+        """`enqueue` through an async session, for request handlers."""
+        job = self._new_job(workflow_id, user_id, nodes, edges, initial_inputs, max_concurrency, timeout_seconds)
+        db.add(job)
+        await db.commit()
+        await db.refresh(job)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job
+
+    @staticmethod
+    def _new_job(
+        workflow_id: str,
+        user_id: str,
+        nodes: List[Dict],
+        edges: List[Dict],
+        initial_inputs: Optional[Dict[str, Any]],
+        max_concurrency: Optional[int],
+        timeout_seconds: Optional[float]
+    ) -> ExecutionJob:
+        return ExecutionJob(
+            workflow_id=workflow_id,
+            user_id=str(user_id),
+            status=JOB_QUEUED,
+            payload=_json_safe({
+                "nodes": nodes,
+                "edges": edges,
+                "initial_inputs": initial_inputs,
+                "max_concurrency": max_concurrency,
+                "timeout_seconds": timeout_seconds
+            })
+        )
+
+    def claim_next(self, worker_id: str) -> Optional[str]:
+        """Atomically move the oldest queued job to running. Returns its id, or None."""
+        with self.session_factory() as db:
+            query = db.query(ExecutionJob.id).filter(
+                ExecutionJob.status == JOB_QUEUED
+            ).order_by(ExecutionJob.created_at).limit(5)
+            if db.get_bind().dialect.name in ROW_LOCKING_DIALECTS:
+                # Lock candidate rows so concurrent workers skip them instead of racing
+                query = query.with_for_update(skip_locked=True)
+            candidates = query.all()
+
+            for (job_id,) in candidates:
+                now = datetime.utcnow()
+                # Only one worker can win the queued -> running transition
+                claimed = db.query(ExecutionJob).filter(
+                    ExecutionJob.id == job_id,
+                    ExecutionJob.status == JOB_QUEUED
+                ).update({
+                    ExecutionJob.status: JOB_RUNNING,
+                    ExecutionJob.worker_id: worker_id,
+                    ExecutionJob.started_at: now,
+                    ExecutionJob.heartbeat_at: now,
+                    ExecutionJob.attempts: ExecutionJob.attempts + 1
+                }, synchronize_session=False)
+                db.commit()
+                if claimed:
+                    return job_id
+        return None
+
+    def requeue_stale(self) -> int:
+        """
+        Put back running jobs whose worker stopped heartbeating (e.g. the process died).
+        Jobs that already used `max_attempts` are failed instead, so a job that kills
+        its worker every time is not retried forever. Returns the number requeued.
+        """
+        now = datetime.utcnow()
+        cutoff = now - timedelta(seconds=self.lease_seconds)
+        with self.session_factory() as db:
+            exhausted = db.query(ExecutionJob).filter(
+                ExecutionJob.status == JOB_RUNNING,
+                ExecutionJob.heartbeat_at < cutoff,
+                ExecutionJob.attempts >= self.max_attempts
+            ).update({
+                ExecutionJob.status: JOB_ERROR,
+                ExecutionJob.error: f"Worker stopped responding on each of {self.max_attempts} attempts",
+                ExecutionJob.worker_id: None,
+                ExecutionJob.finished_at: now
+            }, synchronize_session=False)
+            count = db.query(ExecutionJob).filter(
+                ExecutionJob.status == JOB_RUNNING,
+                ExecutionJob.heartbeat_at < cutoff
+            ).update({
+                ExecutionJob.status: JOB_QUEUED,
+                ExecutionJob.worker_id: None
+            }, synchronize_session=False)
+            db.commit()
+        if exhausted:
+            logger.error(f"Failed {exhausted} stale execution job(s) that ran out of attempts")
+        if count:
+            logger.warning(f"Requeued {count} stale execution job(s)")
+        return count
+
+    def _load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self.session_factory() as db:
+            job = db.get(ExecutionJob, job_id)
+            if job is None:
+                return None
+            return {
+                "payload": dict(job.payload or {}),
+                "workflow_id": job.workflow_id,
+                "user_api_keys": get_user_api_keys(db, job.user_id)
+            }
+
+    async def run_job(self, job_id: str):
+        """Execute a claimed job and store its outcome. Any failure marks the job as errored."""
+        from app.core.executor import GraphExecutor
+        from app.core.plan_cache import plan_cache
+
+        heartbeat = None
+        try:
+            # Session work is blocking, so it runs on a thread instead of the event loop
+            loaded = await asyncio.to_thread(self._load, job_id)
+            if loaded is None:
+                return
+            payload, workflow_id = loaded["payload"], loaded["workflow_id"]
+            heartbeat = asyncio.create_task(self._heartbeat(job_id))
+            plan = plan_cache.get_or_compile(payload.get("nodes", []), payload.get("edges", []), workflow_id=workflow_id)
+            result = await GraphExecutor().execute(
+                plan=plan,
+                initial_inputs=payload.get("initial_inputs"),
+                user_api_keys=loaded["user_api_keys"],
+                max_concurrency=payload.get("max_concurrency"),
+                timeout_seconds=payload.get("timeout_seconds"),
+                workflow_id=workflow_id
+            )
+            logs = result.get("logs", [])
+            # The executor stops at a failed node rather than raising, so check the logs
+            errors = [f"{log['node_id']}: {log.get('error')}" for log in logs if log.get("status") == "error"]
+            update = {
+                ExecutionJob.status: JOB_ERROR if errors else JOB_SUCCESS,
+                ExecutionJob.results: _json_safe(result.get("results", {})),
+                ExecutionJob.logs: _json_safe(logs)
+            }
+            if errors:
+                update[ExecutionJob.error] = "; ".join(errors)
+        except asyncio.CancelledError:
+            # Shutting down mid-run: hand the job back to the queue
+            await asyncio.to_thread(self._safe_update, job_id, {ExecutionJob.status: JOB_QUEUED, ExecutionJob.worker_id: None})
+            raise
+        except Exception as e:
+            logger.error(f"Execution job {job_id} failed: {e}")
+            update = {ExecutionJob.status: JOB_ERROR, ExecutionJob.error: str(e)}
+        finally:
+            if heartbeat is not None:
+                heartbeat.cancel()
+
+        update[ExecutionJob.finished_at] = datetime.utcnow()
+        await asyncio.to_thread(self._safe_update, job_id, update)
+
+    async def start(self):
+        """Recover stale jobs and spawn the in-process workers."""
+        if self._workers or self.num_workers < 1:
+            return
+        self._wakeup = asyncio.Event()
+        await asyncio.to_thread(self.requeue_stale)
+        self._workers = [
+            asyncio.create_task(self._worker_loop(f"{self.worker_prefix}:{i}"))
+            for i in range(self.num_workers)
+        ]
+        logger.info(f"Started {self.num_workers} execution worker(s)")
+
+    async def stop(self):
+        """Cancel the workers; any job they were running goes back to the queue."""
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._wakeup = None
+
+    async def _worker_loop(self, worker_id: str):
+        loop = asyncio.get_running_loop()
+        last_recovery = loop.time()
+        while True:
+            self._wakeup.clear()
+            try:
+                # Periodically pick up jobs orphaned by crashed workers
+                if loop.time() - last_recovery > self.lease_seconds / 3:
+                    last_recovery = loop.time()
+                    await asyncio.to_thread(self.requeue_stale)
+                job_id = await asyncio.to_thread(self.claim_next, worker_id)
+            except Exception as e:
+                logger.error(f"Worker {worker_id} failed to claim a job: {e}")
+                job_id = None
+
+            if job_id is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            try:
+                await self.run_job(job_id)
+            except Exception as e:
+                # Keep the worker alive; a stuck job is requeued once its lease expires
+                logger.error(f"Worker {worker_id} failed running job {job_id}: {e}")
+
+    async def _heartbeat(self, job_id: str):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            await asyncio.to_thread(self._safe_update, job_id, {ExecutionJob.heartbeat_at: datetime.utcnow()})
+
+    def _update(self, job_id: str, values: Dict):
+        with self.session_factory() as db:
+            db.query(ExecutionJob).filter(ExecutionJob.id == job_id).update(values, synchronize_session=False)
+            db.commit()
+
+    def _safe_update(self, job_id: str, values: Dict):
+        try:
+            self._update(job_id, values)
+        except Exception as e:
+            logger.error(f"Failed to update execution job {job_id}: {e}")
+
+
+# Singleton instance
+job_queue = JobQueue(
+    num_workers=int(os.getenv("EXECUTION_WORKERS", "2")),
+    poll_interval=float(os.getenv("EXECUTION_POLL_INTERVAL", "1.0")),
+    lease_seconds=float(os.getenv("EXECUTION_LEASE_SECONDS", "300")),
+    max_attempts=int(os.getenv("EXECUTION_MAX_ATTEMPTS", "3"))
+)
@@ -0,0 +1,229 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class CacheBackend(ABC):
+    """Storage interface for cached LLM responses."""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        """The stored value, or None when missing or expired."""
+
+    @abstractmethod
+    def set(self, key: str, value: str, ttl_seconds: Optional[float] = None):
+        """Store a value, expiring after `ttl_seconds` when given."""
+
+    @abstractmethod
+    def clear(self):
+        """Remove every entry."""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """Number of stored entries."""
+
+
+class InMemoryCacheBackend(CacheBackend):
+    """Process-local LRU with per-entry expiry."""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[str, Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, ttl_seconds: Optional[float] = None):
+        expires_at = time.time() + ttl_seconds if ttl_seconds else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """
+    SQLite file store so cached responses survive restarts and are shared between workers.
+    The entry count is tracked in memory so writes don't scan the table; it is
+    recounted every `recount_every` writes to pick up other processes' entries.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = 100000,
+        table: str = "llm_response_cache",
+        recount_every: int = 1000
+    ):
+        # The table name is interpolated into SQL, so only plain identifiers are allowed
+        if not _IDENTIFIER.fullmatch(table):
+            raise ValueError(f"Invalid cache table name '{table}'")
+        self.path = path
+        self.max_entries = max_entries
+        self.table = table
+        self.recount_every = recount_every
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute(
+            f"CREATE INDEX IF NOT EXISTS ix_{table}_last_used ON {table} (last_used)"
+        )
+        self._size = self._count()
+        self._writes = 0
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)  # nosec B608
+            ).fetchone()
+            if row is None:
+                return None
+            value, expires_at = row
+            if expires_at is not None and expires_at <= now:
+                deleted = self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))  # nosec B608
+                self._size -= deleted.rowcount
+                return None
+            self._conn.execute(f"UPDATE {self.table} SET last_used = ? WHERE key = ?", (now, key))  # nosec B608
+            return value
+
+    def set(self, key: str, value: str, ttl_seconds: Optional[float] = None):
+        now = time.time()
+        expires_at = now + ttl_seconds if ttl_seconds else None
+        with self._lock:
+            # Insert and update separately so the count only grows for new keys
+            inserted = self._conn.execute(
+                f"INSERT OR IGNORE INTO {self.table} (key, value, expires_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, value, expires_at, now)
+            ).rowcount
+            if inserted:
+                self._size += 1
+            else:
+                self._conn.execute(
+                    f"UPDATE {self.table} SET value = ?, expires_at = ?, last_used = ? WHERE key = ?",  # nosec B608
+                    (value, expires_at, now, key)
+                )
+            self._writes += 1
+            if self._writes % self.recount_every == 0:
+                self._size = self._count()
+            overflow = self._size - self.max_entries
+            if overflow > 0:
+                deleted = self._conn.execute(
+                    f"DELETE FROM {self.table} WHERE key IN "  # nosec B608
+                    f"(SELECT key FROM {self.table} ORDER BY last_used LIMIT ?)",
+                    (overflow,)
+                )
+                self._size -= deleted.rowcount
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table}")  # nosec B608
+            self._size = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._count()
+
+    def _count(self) -> int:
+        return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]  # nosec B608
+
+
+class ResponseCache:
+    """Exact-match cache of LLM responses with hit-rate accounting."""
+
+    def __init__(self, backend: CacheBackend, ttl_seconds: Optional[float] = 3600):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    @staticmethod
+    def make_key(model_name: str, system_prompt: Optional[str], prompt: str, temperature: float, key_scope: str) -> str:
+        """Hash everything that determines the response."""
+        payload = json.dumps(
+            [model_name, system_prompt or "", prompt, round(float(temperature), 3), key_scope],
+            separators=(",", ":")
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        try:
+            value = self.backend.get(key)
+        except Exception as e:
+            logger.warning(f"LLM cache read failed: {e}")
+            value = None
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value: str):
+        try:
+            self.backend.set(key, value, self.ttl_seconds)
+            self.stores += 1
+        except Exception as e:
+            logger.warning(f"LLM cache write failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "entries": len(self.backend),
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+
+def create_response_cache() -> Optional[ResponseCache]:
+    """Build the response cache configured by LLM_CACHE_* environment variables."""
+    backend_name = (os.getenv("LLM_CACHE_BACKEND") or "memory").lower()
+    ttl_seconds = float(os.getenv("LLM_CACHE_TTL_SECONDS") or "3600") or None
+    max_entries = int(os.getenv("LLM_CACHE_MAX_ENTRIES") or "10000")
+
+    if backend_name in ("off", "none", "disabled"):
+        return None
+    if backend_name == "sqlite":
+        path = os.getenv("LLM_CACHE_PATH") or "./llm_cache.db"
+        return ResponseCache(SQLiteCacheBackend(path, max_entries=max_entries), ttl_seconds=ttl_seconds)
+    if backend_name != "memory":
+        logger.warning(f"Unknown LLM_CACHE_BACKEND '{backend_name}', using memory")
+    return ResponseCache(InMemoryCacheBackend(max_entries=max_entries), ttl_seconds=ttl_seconds)
@@ -0,0 +1,107 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from langchain_core.language_models.chat_models import BaseChatModel
+
+PoolKey = Tuple[str, str, str, float]
+
+
+def key_fingerprint(api_key: Optional[str]) -> str:
+    """Short, non-reversible identifier for an API key ('system' when unset)."""
+    if not api_key:
+        return "system"
+    return hashlib.sha256(api_key.encode()).hexdigest()[:16]
+
+
+class LLMClientPool:
+    """
+    Bounded LRU pool of chat-model clients.
+    Reusing a client keeps its HTTP connection pool (and TLS sessions) warm
+    across nodes, executions and users that share a provider key.
+    """
+
+    def __init__(self, max_size: int = 64, idle_ttl_seconds: float = 900):
+        self.max_size = max_size
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self._clients: "OrderedDict[PoolKey, Tuple[BaseChatModel, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.idle_evictions = 0
+
+    @staticmethod
+    def make_key(provider: str, model_name: str, api_key: Optional[str], temperature: float) -> PoolKey:
+        return (provider, model_name, key_fingerprint(api_key), round(float(temperature), 3))
+
+    def get(
+        self,
+        provider: str,
+        model_name: str,
+        api_key: Optional[str],
+        temperature: float,
+        factory: Callable[[], BaseChatModel]
+    ) -> BaseChatModel:
+        """Return the pooled client for this configuration, building it with `factory` on a miss."""
+        key = self.make_key(provider, model_name, api_key, temperature)
+        now = time.monotonic()
+
+        with self._lock:
+            self._evict_idle(now)
+            entry = self._clients.get(key)
+            if entry is not None:
+                self._clients[key] = (entry[0], now)
+                self._clients.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        # Build outside the lock; if two callers race, the first stored client wins
+        client = factory()
+
+        with self._lock:
+            entry = self._clients.get(key)
+            if entry is not None:
+                return entry[0]
+            self._clients[key] = (client, now)
+            while len(self._clients) > self.max_size:
+                self._clients.popitem(last=False)
+                self.evictions += 1
+        return client
+
+    def evict_idle(self) -> int:
+        """Drop clients unused for longer than idle_ttl_seconds. Returns the number removed."""
+        with self._lock:
+            return self._evict_idle(time.monotonic())
+
+    def clear(self):
+        with self._lock:
+            self._clients.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._clients),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "idle_evictions": self.idle_evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+    def _evict_idle(self, now: float) -> int:
+        # Entries are kept in last-used order, so idle ones sit at the front
+        removed = 0
+        while self._clients:
+            key, (_, last_used) = next(iter(self._clients.items()))
+            if now - last_used <= self.idle_ttl_seconds:
+                break
+            del self._clients[key]
+            removed += 1
+        self.idle_evictions += removed
+        return removed
@@ -1,18 +1,79 @@
+import asyncio
 import os
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, AsyncIterator, List, Tuple, Union
 from functools import lru_cache
 
-from langchain_core.messages import HumanMessage, SystemMessage
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_openai import ChatOpenAI
-from langchain_aws import ChatBedrock
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
 from langchain_core.language_models.chat_models import BaseChatModel
+from app.services.hedging import Attempt, HedgedCaller, LatencyTracker
+from app.services.llm_cache import ResponseCache, create_response_cache
+from app.services.llm_client_pool import LLMClientPool, key_fingerprint
+from app.services.model_router import ModelRouter, model_router
+from app.services.providers import load_chat_model_class
+from app.services.rate_limiter import RateLimitScheduler, create_rate_limiter, estimate_tokens, is_rate_limit_error
+from app.services.singleflight import SingleFlight, request_key
+
+# Provider SDKs are imported on first use through chat_model_class(); these names
+# stay as module attributes so a class can be swapped in (e.g. patched in tests)
+ChatGoogleGenerativeAI = None
+ChatOpenAI = None
+ChatBedrock = None
+ChatAnthropic = None
+
+
+def chat_model_class(class_name: str) -> type:
+    """The provider chat model class, importing its SDK on first use."""
+    return globals().get(class_name) or load_chat_model_class(class_name)
+
+
+def chunk_text(content: Union[str, List[Any]]) -> str:
+    """Extract the text from a message chunk's content (plain string or content blocks)."""
+    if isinstance(content, str):
+        return content
+    parts = []
+    for block in content or []:
+        if isinstance(block, str):
+            parts.append(block)
+        elif isinstance(block, dict) and block.get("type") == "text":
+            parts.append(block.get("text", ""))
+    return "".join(parts)
+
 
 class LLMService:
     def __init__(self):
         self._models: Dict[str, BaseChatModel] = {}
+        # User-key clients are pooled so their HTTP connections are reused
+        self.client_pool = LLMClientPool(
+            max_size=int(os.getenv("LLM_CLIENT_POOL_SIZE", "64")),
+            idle_ttl_seconds=float(os.getenv("LLM_CLIENT_IDLE_TTL_SECONDS", "900"))
+        )
+        # Exact-match response cache (None when LLM_CACHE_BACKEND=off)
+        self.response_cache: Optional[ResponseCache] = create_response_cache()
+        # Coalesce concurrent identical requests unless LLM_SINGLE_FLIGHT=false
+        self.singleflight: Optional[SingleFlight] = None
+        if (os.getenv("LLM_SINGLE_FLIGHT") or "true").lower() in ("1", "true", "yes"):
+            self.singleflight = SingleFlight()
+        # Near-duplicate prompt cache, only when SEMANTIC_CACHE_ENABLED is set
+        self.semantic_cache = self._setup_semantic_cache()
+        # Client-side RPM/TPM/concurrency limits and 429 backoff per provider key
+        self.rate_limiter: RateLimitScheduler = create_rate_limiter()
+        # Model -> provider routing and fallback lists (LLM_MODEL_ROUTES / LLM_FALLBACKS)
+        self.router: ModelRouter = model_router
+        # Latency histograms drive hedging; backups start after the primary's p95
+        self.hedger = HedgedCaller(LatencyTracker(
+            window=int(os.getenv("LLM_LATENCY_WINDOW", "200")),
+            min_samples=int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+        ))
+        # Default cap on concurrent requests inside one generate_text_batch call
+        self.batch_max_concurrency = int(os.getenv("LLM_BATCH_MAX_CONCURRENCY", "8"))
         self._setup_models()
 
+    def _setup_semantic_cache(self):
+        if (os.getenv("SEMANTIC_CACHE_ENABLED") or "false").lower() not in ("1", "true", "yes"):
+            return None
+        from app.services.semantic_cache import create_semantic_cache
+        return create_semantic_cache()
+
     def _setup_models(self):
         """Initialize system-level LLM providers (fallback)."""
         # ... (Existing init code largely same, but maybe simplified) ...
@@ -20,15 +81,17 @@ class LLMService:
         google_api_key = os.getenv("GOOGLE_API_KEY")
         if google_api_key:
             try:
-                self._models["gemini-pro"] = ChatGoogleGenerativeAI(model="gemini-pro", google_api_key=google_api_key)
-                self._models["gemini-1.5-pro"] = ChatGoogleGenerativeAI(model="gemini-1.5-pro", google_api_key=google_api_key)
+                chat_google = chat_model_class("ChatGoogleGenerativeAI")
+                self._models["gemini-pro"] = chat_google(model="gemini-pro", google_api_key=google_api_key)
+                self._models["gemini-1.5-pro"] = chat_google(model="gemini-1.5-pro", google_api_key=google_api_key)
             except Exception: pass
             
         openai_key = os.getenv("OPENAI_API_KEY")
         if openai_key:
             try:
-                self._models["gpt-4"] = ChatOpenAI(model="gpt-4", api_key=openai_key)
-                self._models["gpt-3.5-turbo"] = ChatOpenAI(model="gpt-3.5-turbo", api_key=openai_key)
+                chat_openai = chat_model_class("ChatOpenAI")
+                self._models["gpt-4"] = chat_openai(model="gpt-4", api_key=openai_key)
+                self._models["gpt-3.5-turbo"] = chat_openai(model="gpt-3.5-turbo", api_key=openai_key)
             except Exception: pass
 
     async def generate_text(
@@ -38,10 +101,270 @@ class LLMService:
         model_name: str = "gemini-pro",
         temperature: float = 0.7,
         api_key: Optional[str] = None,
-        provider: Optional[str] = None # e.g., 'openai', 'google'
+        provider: Optional[str] = None, # e.g., 'openai', 'google'
+        cache: Optional[bool] = None,
+        semantic_cache: bool = False,
+        cache_namespace: Optional[str] = None,
+        hedge: bool = False,
+        fallback_models: Optional[List[str]] = None,
+        api_keys: Optional[Dict[str, str]] = None
     ) -> str:
-        """Generate text, optionally using a user-provided API key."""
-        
+        """
+        Generate text, optionally using a user-provided API key.
+        `cache` forces the response cache on or off; by default only
+        deterministic (temperature 0) calls are cached. `semantic_cache` also
+        serves near-duplicate prompts from the `cache_namespace` index.
+        If the model fails, `fallback_models` (default: the router's list) are
+        tried in order with keys from `api_keys`; `hedge` also starts the next
+        one when the current call outlives its observed p95 latency.
+        """
+        candidates = self._candidates(model_name, provider, temperature, api_key, api_keys, fallback_models)
+        messages = self._build_messages(prompt, system_prompt)
+
+        cache_key = self._cache_key(model_name, system_prompt, prompt, temperature, api_key, cache)
+        semantic_scope = self._semantic_scope(model_name, system_prompt, temperature, api_key, semantic_cache, cache_namespace)
+        cached = self._cached_response(cache_key, semantic_scope, prompt)
+        if cached is not None:
+            return cached
+
+        tokens = estimate_tokens(system_prompt, prompt)
+        # Only the provider call is timed; rate-limit waits would inflate the hedge delay
+        attempts: List[Attempt] = [
+            (candidate, lambda candidate=candidate, llm=llm, scope=scope: self.rate_limiter.run(
+                *scope, lambda: self.hedger.timed(candidate, lambda: llm.ainvoke(messages)), estimated_tokens=tokens
+            ))
+            for candidate, llm, scope in candidates
+        ]
+
+        def call():
+            return self.hedger.call(attempts, hedge=hedge)
+
+        try:
+            if self.singleflight:
+                # Identical concurrent requests share one provider call; the fallback
+                # chain (with each model's key) and hedging are part of the request
+                flight_key = request_key(
+                    model_name, [(m.type, m.content) for m in messages], round(float(temperature), 3), key_fingerprint(api_key),
+                    [(candidate, scope) for candidate, _, scope in candidates], hedge
+                )
+                served_by, response = await self.singleflight.do(flight_key, call)
+            else:
+                served_by, response = await call()
+        except Exception as e:
+            # print(f"❌ Error generating text with {model_name}: {e}")
+            raise e
+
+        # Only cache answers from the model that was actually asked for
+        if isinstance(response.content, str) and served_by == model_name:
+            self._store_response(cache_key, semantic_scope, prompt, response.content)
+        return response.content
+
+    async def stream_text(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        model_name: str = "gemini-pro",
+        temperature: float = 0.7,
+        api_key: Optional[str] = None,
+        provider: Optional[str] = None,
+        cache: Optional[bool] = None,
+        semantic_cache: bool = False,
+        cache_namespace: Optional[str] = None,
+        fallback_models: Optional[List[str]] = None,
+        api_keys: Optional[Dict[str, str]] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream generated text, yielding content deltas as the provider sends them.
+        Fails over to the next fallback model only before the first delta.
+        Streams are never hedged: a second stream can't be merged into
+        output that has already been yielded.
+        """
+        candidates = self._candidates(model_name, provider, temperature, api_key, api_keys, fallback_models)
+        messages = self._build_messages(prompt, system_prompt)
+
+        cache_key = self._cache_key(model_name, system_prompt, prompt, temperature, api_key, cache)
+        semantic_scope = self._semantic_scope(model_name, system_prompt, temperature, api_key, semantic_cache, cache_namespace)
+        cached = self._cached_response(cache_key, semantic_scope, prompt)
+        if cached is not None:
+            yield cached
+            return
+
+        chunks = []
+        tokens = estimate_tokens(system_prompt, prompt)
+        for index, (candidate, llm, scope) in enumerate(candidates):
+            try:
+                # Streams hold their slot for the whole response; they aren't retried once output has started
+                async with self.rate_limiter.slot(*scope, estimated_tokens=tokens):
+                    async for chunk in llm.astream(messages):
+                        delta = chunk_text(chunk.content)
+                        if delta:
+                            chunks.append(delta)
+                            yield delta
+                break
+            except Exception:
+                if chunks or index == len(candidates) - 1:
+                    raise
+                self.hedger.failovers += 1
+
+        if candidate == model_name:
+            self._store_response(cache_key, semantic_scope, prompt, "".join(chunks))
+
+    async def generate_text_batch(
+        self,
+        prompts: List[str],
+        system_prompt: Union[str, List[Optional[str]], None] = None,
+        model_name: str = "gemini-pro",
+        temperature: float = 0.7,
+        api_key: Optional[str] = None,
+        provider: Optional[str] = None,
+        cache: Optional[bool] = None,
+        max_concurrency: Optional[int] = None,
+        return_exceptions: bool = False
+    ) -> List[Union[str, Exception]]:
+        """
+        Generate text for several prompts against one model in a single `abatch`
+        dispatch, at most `max_concurrency` requests in flight. `system_prompt` is
+        shared or given per prompt. Cached prompts are answered without a request,
+        and rate-limited items are retried individually with backoff.
+        With `return_exceptions`, failed items hold their exception instead of raising.
+        """
+        system_prompts = system_prompt if isinstance(system_prompt, list) else [system_prompt] * len(prompts)
+        if len(system_prompts) != len(prompts):
+            raise ValueError("system_prompt list must match the number of prompts")
+        if len(prompts) == 1:
+            # Nothing to batch: keep single-flight, failover and retries
+            try:
+                return [await self.generate_text(
+                    prompts[0], system_prompts[0], model_name, temperature, api_key, provider, cache=cache
+                )]
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                return [e]
+
+        llm = self._resolve_model(model_name, temperature, api_key)
+        results: List[Any] = [None] * len(prompts)
+        cache_keys = [
+            self._cache_key(model_name, system_prompts[i], prompts[i], temperature, api_key, cache)
+            for i in range(len(prompts))
+        ]
+        for i, key in enumerate(cache_keys):
+            if key:
+                results[i] = self.response_cache.get(key)
+        misses = [i for i, result in enumerate(results) if result is None]
+
+        if misses:
+            scope = (provider or self.router.provider_for(model_name) or "default", key_fingerprint(api_key))
+            tokens = sum(estimate_tokens(system_prompts[i], prompts[i]) for i in misses)
+            async with self.rate_limiter.slot(*scope, estimated_tokens=tokens, requests=len(misses)):
+                responses = await llm.abatch(
+                    [self._build_messages(prompts[i], system_prompts[i]) for i in misses],
+                    config={"max_concurrency": max_concurrency or self.batch_max_concurrency},
+                    return_exceptions=True
+                )
+            retries = []
+            for i, response in zip(misses, responses):
+                if isinstance(response, Exception):
+                    results[i] = response
+                    if is_rate_limit_error(response):
+                        retries.append(i)
+                    continue
+                results[i] = response.content
+                if cache_keys[i] and isinstance(response.content, str):
+                    self.response_cache.set(cache_keys[i], response.content)
+            if retries:
+                retried = await asyncio.gather(*[
+                    self.generate_text(prompts[i], system_prompts[i], model_name, temperature, api_key, provider, cache=cache)
+                    for i in retries
+                ], return_exceptions=True)
+                for i, result in zip(retries, retried):
+                    results[i] = result
+
+        if not return_exceptions:
+            for result in results:
+                if isinstance(result, Exception):
+                    raise result
+        return results
+
+    def _candidates(
+        self,
+        model_name: str,
+        provider: Optional[str],
+        temperature: float,
+        api_key: Optional[str],
+        api_keys: Optional[Dict[str, str]],
+        fallback_models: Optional[List[str]]
+    ) -> List[Tuple[str, BaseChatModel, Tuple[str, str]]]:
+        """(model, instance, rate-limit scope) for the primary and each usable fallback."""
+        primary_provider = provider or self.router.provider_for(model_name)
+        candidates = []
+        for candidate, candidate_provider in self.router.candidates(model_name, fallback_models):
+            if candidate == model_name:
+                candidate_provider, key = primary_provider, api_key
+            else:
+                key = (api_keys or {}).get(candidate_provider)
+                if key is None and candidate_provider == primary_provider:
+                    key = api_key
+            try:
+                llm = self._resolve_model(candidate, temperature, key)
+            except ValueError:
+                # No system model and no key for this one; the others may still work
+                continue
+            candidates.append((candidate, llm, (candidate_provider or "default", key_fingerprint(key))))
+        if not candidates:
+            raise ValueError(f"Model {model_name} not available (no system key and no user key provided)")
+        return candidates
+
+    def _cache_key(
+        self,
+        model_name: str,
+        system_prompt: Optional[str],
+        prompt: str,
+        temperature: float,
+        api_key: Optional[str],
+        cache: Optional[bool]
+    ) -> Optional[str]:
+        """Response-cache key for a call, or None when the call shouldn't be cached."""
+        if self.response_cache is None or cache is False:
+            return None
+        if cache is None and float(temperature) != 0:
+            return None
+        return ResponseCache.make_key(model_name, system_prompt, prompt, temperature, key_fingerprint(api_key))
+
+    def _semantic_scope(
+        self,
+        model_name: str,
+        system_prompt: Optional[str],
+        temperature: float,
+        api_key: Optional[str],
+        semantic_cache: bool,
+        cache_namespace: Optional[str]
+    ) -> Optional[str]:
+        """Semantic-cache scope for a call, or None when it isn't enabled for it."""
+        if self.semantic_cache is None or not semantic_cache:
+            return None
+        return self.semantic_cache.make_scope(
+            cache_namespace or "default", model_name, system_prompt, temperature, key_fingerprint(api_key)
+        )
+
+    def _cached_response(self, cache_key: Optional[str], semantic_scope: Optional[str], prompt: str) -> Optional[str]:
+        """Exact match first, then nearest neighbour in the semantic index."""
+        if cache_key:
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                return cached
+        if semantic_scope:
+            return self.semantic_cache.lookup(semantic_scope, prompt)
+        return None
+
+    def _store_response(self, cache_key: Optional[str], semantic_scope: Optional[str], prompt: str, response: str):
+        if cache_key:
+            self.response_cache.set(cache_key, response)
+        if semantic_scope:
+            self.semantic_cache.store(semantic_scope, prompt, response)
+
+    def _resolve_model(self, model_name: str, temperature: float, api_key: Optional[str] = None) -> BaseChatModel:
+        """Pick the model instance for a call: user-key instance first, then system models."""
         llm = None
         
         # 1. Try to create user-specific instance if key is provided
@@ -60,44 +383,49 @@ class LLMService:
         
         if not llm:
              raise ValueError(f"Model {model_name} not available (no system key and no user key provided)")
+        return llm
 
+    @staticmethod
+    def _build_messages(prompt: str, system_prompt: Optional[str] = None) -> List[BaseMessage]:
         messages = []
         if system_prompt:
             messages.append(SystemMessage(content=system_prompt))
         messages.append(HumanMessage(content=prompt))
-
-        try:
-            response = await llm.ainvoke(messages)
-            return response.content
-        except Exception as e:
-            # print(f"❌ Error generating text with {model_name}: {e}")
-            raise e
+        return messages
 
     def _create_model_instance(self, model_name: str, api_key: str, temperature: float) -> Optional[BaseChatModel]:
-        """Create an ephemeral model instance with a specific key."""
+        """Get a pooled model instance for a specific key, creating it on first use."""
+        provider = self.router.provider_for(model_name)
+        if provider is None:
+            return None
         try:
-            if "gpt" in model_name:
-                return ChatOpenAI(model=model_name, api_key=api_key, temperature=temperature)
-            elif "gemini" in model_name:
-                return ChatGoogleGenerativeAI(model=model_name, google_api_key=api_key, temperature=temperature)
-            elif "claude" in model_name:
-                from langchain_anthropic import ChatAnthropic
-                return ChatAnthropic(model=model_name, api_key=api_key, temperature=temperature)
+            return self.client_pool.get(
+                provider, model_name, api_key, temperature,
+                factory=lambda: self._build_client(provider, model_name, api_key, temperature)
+            )
         except Exception as e:
             print(f"Failed to create instance for {model_name}: {e}")
             return None
-        return None
+
+    @staticmethod
+    def _build_client(provider: str, model_name: str, api_key: str, temperature: float) -> BaseChatModel:
+        if provider == "openai":
+            return chat_model_class("ChatOpenAI")(model=model_name, api_key=api_key, temperature=temperature)
+        elif provider == "google":
+            return chat_model_class("ChatGoogleGenerativeAI")(model=model_name, google_api_key=api_key, temperature=temperature)
+        elif provider == "anthropic":
+            return chat_model_class("ChatAnthropic")(model=model_name, api_key=api_key, temperature=temperature)
+        raise ValueError(f"Unknown provider {provider}")
 
     async def verify_key(self, provider: str, api_key: str) -> bool:
         """Verify an API key by making a minimal request."""
         try:
             if provider == 'openai':
-                llm = ChatOpenAI(model="gpt-3.5-turbo", api_key=api_key, max_tokens=5)
+                llm = chat_model_class("ChatOpenAI")(model="gpt-3.5-turbo", api_key=api_key, max_tokens=5)
             elif provider == 'google':
-                llm = ChatGoogleGenerativeAI(model="gemini-pro", google_api_key=api_key)
+                llm = chat_model_class("ChatGoogleGenerativeAI")(model="gemini-pro", google_api_key=api_key)
             elif provider == 'anthropic':
-                from langchain_anthropic import ChatAnthropic
-                llm = ChatAnthropic(model="claude-3-sonnet-20240229", api_key=api_key, max_tokens=5)
+                llm = chat_model_class("ChatAnthropic")(model="claude-3-sonnet-20240229", api_key=api_key, max_tokens=5)
             else:
                 return False
                 
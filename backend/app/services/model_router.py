@@ -0,0 +1,91 @@
+import json
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Model-name prefix -> provider. Longest matching prefix wins.
+DEFAULT_PREFIX_ROUTES: Dict[str, str] = {
+    "gpt": "openai",
+    "ft:gpt": "openai",
+    "chatgpt": "openai",
+    "o1": "openai",
+    "o3": "openai",
+    "o4": "openai",
+    "gemini": "google",
+    "claude": "anthropic",
+}
+
+
+class ModelRouter:
+    """
+    Routing table from model names to providers, plus per-model fallback lists.
+    Exact entries take precedence over prefixes; among prefixes the longest wins.
+    """
+
+    def __init__(
+        self,
+        routes: Optional[Dict[str, str]] = None,
+        prefix_routes: Optional[Dict[str, str]] = None,
+        fallbacks: Optional[Dict[str, List[str]]] = None
+    ):
+        self.routes: Dict[str, str] = dict(routes or {})
+        self.prefix_routes: Dict[str, str] = dict(DEFAULT_PREFIX_ROUTES if prefix_routes is None else prefix_routes)
+        self.fallbacks: Dict[str, List[str]] = {model: list(models) for model, models in (fallbacks or {}).items()}
+
+    def add_route(self, pattern: str, provider: str):
+        """Route `pattern` to `provider`; a trailing '*' makes it a prefix route."""
+        if pattern.endswith("*"):
+            self.prefix_routes[pattern[:-1]] = provider
+        else:
+            self.routes[pattern] = provider
+
+    def provider_for(self, model_name: str) -> Optional[str]:
+        if model_name in self.routes:
+            return self.routes[model_name]
+        matches = [prefix for prefix in self.prefix_routes if model_name.startswith(prefix)]
+        if not matches:
+            return None
+        return self.prefix_routes[max(matches, key=len)]
+
+    def fallbacks_for(self, model_name: str) -> List[str]:
+        """Equivalent models to try, in order, when `model_name` is slow or failing."""
+        return list(self.fallbacks.get(model_name, []))
+
+    def candidates(self, model_name: str, fallback_models: Optional[List[str]] = None) -> List[Tuple[str, Optional[str]]]:
+        """(model, provider) pairs to try: the primary first, then its fallbacks."""
+        models = [model_name] + (self.fallbacks_for(model_name) if fallback_models is None else list(fallback_models))
+        seen = set()
+        result = []
+        for model in models:
+            if model not in seen:
+                seen.add(model)
+                result.append((model, self.provider_for(model)))
+        return result
+
+
+def _load_json_env(name: str) -> Dict:
+    raw = os.getenv(name)
+    if not raw:
+        return {}
+    try:
+        value = json.loads(raw)
+    except ValueError:
+        logger.warning(f"Ignoring {name}: not valid JSON")
+        return {}
+    if not isinstance(value, dict):
+        logger.warning(f"Ignoring {name}: expected a JSON object")
+        return {}
+    return value
+
+
+def create_model_router() -> ModelRouter:
+    """Default routing table extended by LLM_MODEL_ROUTES and LLM_FALLBACKS (JSON objects)."""
+    router = ModelRouter(fallbacks=_load_json_env("LLM_FALLBACKS"))
+    for pattern, provider in _load_json_env("LLM_MODEL_ROUTES").items():
+        router.add_route(pattern, provider)
+    return router
+
+
+model_router = create_model_router()
@@ -0,0 +1,73 @@
+import importlib
+import logging
+import os
+import time
+from functools import lru_cache
+from typing import Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Chat model class -> SDK module. The SDKs (and boto3 for Bedrock) are slow to
+# import, so they are loaded the first time a provider is actually used.
+CHAT_MODEL_MODULES = {
+    "ChatOpenAI": "langchain_openai",
+    "ChatGoogleGenerativeAI": "langchain_google_genai",
+    "ChatAnthropic": "langchain_anthropic",
+    "ChatBedrock": "langchain_aws",
+}
+PROVIDER_CHAT_MODELS = {
+    "openai": "ChatOpenAI",
+    "google": "ChatGoogleGenerativeAI",
+    "anthropic": "ChatAnthropic",
+    "bedrock": "ChatBedrock",
+}
+# Imported on the first execution; prewarming moves that cost to startup
+EXECUTION_MODULES = ("app.core.executor",)
+
+
+@lru_cache(maxsize=None)
+def load_chat_model_class(class_name: str) -> type:
+    """Import and return a provider chat model class, e.g. "ChatOpenAI". Raises ImportError if not installed."""
+    module_name = CHAT_MODEL_MODULES.get(class_name)
+    if module_name is None:
+        raise ValueError(f"Unknown chat model class {class_name}")
+    started = time.perf_counter()
+    cls = getattr(importlib.import_module(module_name), class_name)
+    logger.info(f"Imported {module_name} in {(time.perf_counter() - started) * 1000:.0f} ms")
+    return cls
+
+
+def prewarm(providers: Optional[Iterable[str]] = None) -> Dict[str, float]:
+    """
+    Do the first-use work ahead of traffic: import provider SDKs and the executor,
+    build the LLM service and the registered tools. Returns milliseconds per step;
+    failures (e.g. an SDK that is not installed) are logged and skipped.
+    """
+    if providers is None:
+        providers = [p.strip() for p in (os.getenv("PREWARM_PROVIDERS") or "openai,google,anthropic").split(",")]
+    timings: Dict[str, float] = {}
+
+    def timed(name: str, step):
+        started = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            logger.warning(f"Prewarm step {name} failed: {e}")
+            return
+        timings[name] = round((time.perf_counter() - started) * 1000, 2)
+
+    for provider in providers:
+        if provider in PROVIDER_CHAT_MODELS:
+            timed(provider, lambda: load_chat_model_class(PROVIDER_CHAT_MODELS[provider]))
+        elif provider:
+            logger.warning(f"Unknown provider '{provider}' in PREWARM_PROVIDERS")
+    for module_name in EXECUTION_MODULES:
+        timed(module_name, lambda: importlib.import_module(module_name))
+
+    from app.services.llm_service import get_llm_service
+    from app.services.tool_service import tool_service
+    timed("llm_service", get_llm_service)
+    for tool in tool_service.get_available_tools():
+        timed(f"tool:{tool['name']}", lambda: tool_service.get_tool(tool["name"]))
+    logger.info(f"Prewarm finished: {timings}")
+    return timings
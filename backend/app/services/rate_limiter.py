@@ -0,0 +1,223 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PROVIDERS = ("openai", "google", "anthropic")
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at `rate_per_minute`."""
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    async def acquire(self, amount: float = 1.0) -> float:
+        """Wait until `amount` tokens are available and take them. Returns seconds waited."""
+        # A single request larger than the bucket would otherwise never fit
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            self._refill(time.monotonic())
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return waited
+            delay = (amount - self.tokens) / self.rate
+            await asyncio.sleep(delay)
+            waited += delay
+
+    def adjust(self, amount: float):
+        """Charge (positive) or refund (negative) tokens after the fact; may go into debt."""
+        self._refill(time.monotonic())
+        self.tokens = min(self.tokens - amount, self.capacity)
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+class ProviderLimiter:
+    """Requests-per-minute, tokens-per-minute and concurrency limits for one provider key."""
+
+    def __init__(self, rpm: Optional[float] = None, tpm: Optional[float] = None, max_concurrency: int = 32):
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.max_concurrency = max_concurrency
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.blocked_until = 0.0
+
+    def block_for(self, seconds: float):
+        """Hold back every call on this key for `seconds` (e.g. a provider Retry-After)."""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    async def wait_until_unblocked(self):
+        delay = self.blocked_until - time.monotonic()
+        while delay > 0:
+            await asyncio.sleep(delay)
+            delay = self.blocked_until - time.monotonic()
+
+
+def is_rate_limit_error(exc: Exception) -> bool:
+    """Recognise 429 / quota errors across the OpenAI, Google and Anthropic SDKs."""
+    status = getattr(exc, "status_code", None) or getattr(getattr(exc, "response", None), "status_code", None)
+    if status == 429 or getattr(exc, "code", None) == 429:
+        return True
+    name = type(exc).__name__
+    return name in ("RateLimitError", "ResourceExhausted", "TooManyRequests")
+
+
+def retry_after_seconds(exc: Exception) -> Optional[float]:
+    """Read a Retry-After header (seconds or HTTP date) from a provider error, if present."""
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def estimate_tokens(*texts: Optional[str]) -> int:
+    """Rough token count (~4 characters per token) used before the real usage is known."""
+    return max(1, sum(len(t) for t in texts if t) // 4)
+
+
+class RateLimitScheduler:
+    """
+    Client-side throttling for provider calls, per (provider, key).
+    Calls wait for request/token budget and a concurrency slot, and 429s are
+    retried with jittered exponential backoff that honours Retry-After.
+    """
+
+    def __init__(
+        self,
+        limits: Optional[Dict[str, Dict[str, Any]]] = None,
+        max_retries: int = 3,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0
+    ):
+        self.limits = limits or {}
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._limiters: Dict[Tuple[str, str], ProviderLimiter] = {}
+        self.calls = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.queue_wait_seconds = 0.0
+
+    def limiter(self, provider: str, key_scope: str) -> ProviderLimiter:
+        key = (provider, key_scope)
+        limiter = self._limiters.get(key)
+        if limiter is None:
+            config = self.limits.get(provider, {})
+            limiter = ProviderLimiter(
+                rpm=config.get("rpm"),
+                tpm=config.get("tpm"),
+                max_concurrency=config.get("max_concurrency") or 32
+            )
+            self._limiters[key] = limiter
+        return limiter
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        provider: str,
+        key_scope: str,
+        estimated_tokens: int = 1,
+        requests: int = 1
+    ) -> AsyncIterator[ProviderLimiter]:
+        """Hold budget and a concurrency slot for one call or batch (no retries; used for streams and batches)."""
+        limiter = self.limiter(provider, key_scope)
+        started = time.monotonic()
+        await limiter.wait_until_unblocked()
+        if limiter.requests:
+            await limiter.requests.acquire(requests)
+        if limiter.tokens:
+            await limiter.tokens.acquire(estimated_tokens)
+        async with limiter.semaphore:
+            self.queue_wait_seconds += time.monotonic() - started
+            self.calls += requests
+            yield limiter
+
+    async def run(
+        self,
+        provider: str,
+        key_scope: str,
+        fn: Callable[[], Awaitable[Any]],
+        estimated_tokens: int = 1
+    ) -> Any:
+        """Call `fn()` within the provider's limits, retrying rate-limit errors."""
+        attempt = 0
+        while True:
+            try:
+                async with self.slot(provider, key_scope, estimated_tokens) as limiter:
+                    result = await fn()
+                    self._charge_actual_usage(limiter, result, estimated_tokens)
+                    return result
+            except Exception as e:
+                if not is_rate_limit_error(e):
+                    raise
+                self.rate_limited += 1
+                if attempt >= self.max_retries:
+                    raise
+                delay = retry_after_seconds(e)
+                if delay is None:
+                    # Full jitter keeps retrying clients from synchronising
+                    delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+                # Everyone sharing this key backs off, not just this caller
+                self.limiter(provider, key_scope).block_for(delay)
+                attempt += 1
+                self.retries += 1
+                logger.warning(f"{provider} rate limited, retry {attempt}/{self.max_retries} in {delay:.2f}s")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+            "queue_wait_seconds": round(self.queue_wait_seconds, 3),
+            "limiters": len(self._limiters)
+        }
+
+    @staticmethod
+    def _charge_actual_usage(limiter: ProviderLimiter, result: Any, estimated_tokens: int):
+        usage = getattr(result, "usage_metadata", None)
+        if limiter.tokens and isinstance(usage, dict) and usage.get("total_tokens"):
+            limiter.tokens.adjust(usage["total_tokens"] - estimated_tokens)
+
+
+def create_rate_limiter() -> RateLimitScheduler:
+    """Build the scheduler from LLM_<PROVIDER>_RPM / _TPM / _MAX_CONCURRENCY variables."""
+    limits = {}
+    for provider in PROVIDERS:
+        prefix = f"LLM_{provider.upper()}_"
+        limits[provider] = {
+            "rpm": float(os.getenv(prefix + "RPM") or 0) or None,
+            "tpm": float(os.getenv(prefix + "TPM") or 0) or None,
+            "max_concurrency": int(os.getenv(prefix + "MAX_CONCURRENCY") or 0) or None
+        }
+    return RateLimitScheduler(
+        limits=limits,
+        max_retries=int(os.getenv("LLM_MAX_RETRIES") or "3"),
+        base_delay=float(os.getenv("LLM_RETRY_BASE_DELAY") or "1.0"),
+        max_delay=float(os.getenv("LLM_RETRY_MAX_DELAY") or "60")
+    )
@@ -0,0 +1,176 @@
+import hashlib
+import importlib
+import os
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+Embedder = Callable[[str], np.ndarray]
+
+# Tokens that change a prompt's answer while barely moving its embedding, e.g.
+# "12 * 7" vs "12 * 8" or "is" vs "is not"; cached prompts must match them exactly
+_EXACT_TOKENS = re.compile(r"\d+(?:\.\d+)?|\b(?:not|no|never|without)\b|n't", re.IGNORECASE)
+
+
+def exact_tokens(prompt: str) -> Tuple[str, ...]:
+    return tuple(token.lower() for token in _EXACT_TOKENS.findall(prompt))
+
+
+class HashedNgramEmbedder:
+    """
+    Offline embedder: character n-grams hashed into a fixed-size, L2-normalised vector.
+    Deterministic across processes, needs no model download or network access.
+    """
+
+    def __init__(self, dim: int = 512, ngram_range: Tuple[int, int] = (2, 4)):
+        self.dim = dim
+        self.ngram_range = ngram_range
+
+    def __call__(self, text: str) -> np.ndarray:
+        normalized = " " + re.sub(r"\s+", " ", text.lower()).strip() + " "
+        vector = np.zeros(self.dim, dtype=np.float32)
+        low, high = self.ngram_range
+        for n in range(low, high + 1):
+            for i in range(len(normalized) - n + 1):
+                h = zlib.crc32(normalized[i:i + n].encode())
+                # Signed hashing keeps unrelated collisions from only ever adding up
+                vector[h % self.dim] += 1.0 if (h >> 31) & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+class VectorIndex:
+    """Fixed-capacity in-memory vector index with least-recently-used eviction."""
+
+    def __init__(self, dim: int, capacity: int):
+        self.capacity = capacity
+        self._vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self._values: List[Any] = [None] * capacity
+        self._last_used = np.zeros(capacity, dtype=np.int64)
+        self._clock = 0
+        self.size = 0
+
+    def search(self, vector: np.ndarray) -> Tuple[Any, float]:
+        """Return the most similar stored value and its cosine similarity."""
+        if self.size == 0:
+            return None, 0.0
+        scores = self._vectors[:self.size] @ vector
+        slot = int(np.argmax(scores))
+        self._touch(slot)
+        return self._values[slot], float(scores[slot])
+
+    def add(self, vector: np.ndarray, value: Any):
+        if self.size < self.capacity:
+            slot = self.size
+            self.size += 1
+        else:
+            slot = int(np.argmin(self._last_used))
+        self._vectors[slot] = vector
+        self._values[slot] = value
+        self._touch(slot)
+
+    def _touch(self, slot: int):
+        self._clock += 1
+        self._last_used[slot] = self._clock
+
+
+class SemanticCache:
+    """
+    Near-duplicate response cache. Each scope (workflow namespace, model, system
+    prompt, temperature and key) has its own vector index; a prompt hits when its
+    embedding is within `threshold` cosine similarity of a stored prompt and both
+    contain the same numbers and negations.
+    """
+
+    def __init__(
+        self,
+        embedder: Optional[Embedder] = None,
+        threshold: float = 0.95,
+        capacity: int = 1000,
+        max_scopes: int = 256,
+        dim: int = 512
+    ):
+        self.embedder = embedder or HashedNgramEmbedder(dim=dim)
+        self.threshold = threshold
+        self.capacity = capacity
+        self.max_scopes = max_scopes
+        self._indexes: "OrderedDict[str, VectorIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_scope(namespace: str, model_name: str, system_prompt: Optional[str], temperature: float, key_scope: str) -> str:
+        system_hash = hashlib.sha256((system_prompt or "").encode()).hexdigest()[:16]
+        return f"{namespace}|{model_name}|{system_hash}|{round(float(temperature), 3)}|{key_scope}"
+
+    def _embed(self, prompt: str) -> np.ndarray:
+        # Scores are dot products, which are cosines only for unit vectors
+        vector = np.asarray(self.embedder(prompt), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, scope: str, prompt: str) -> Optional[str]:
+        vector = self._embed(prompt)
+        with self._lock:
+            index = self._indexes.get(scope)
+            entry, score = index.search(vector) if index else (None, 0.0)
+            if entry is not None and score >= self.threshold and entry[0] == exact_tokens(prompt):
+                self._indexes.move_to_end(scope)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def store(self, scope: str, prompt: str, response: str):
+        vector = self._embed(prompt)
+        with self._lock:
+            index = self._indexes.get(scope)
+            if index is None:
+                index = VectorIndex(len(vector), self.capacity)
+                self._indexes[scope] = index
+                while len(self._indexes) > self.max_scopes:
+                    self._indexes.popitem(last=False)
+            self._indexes.move_to_end(scope)
+            index.add(vector, (exact_tokens(prompt), response))
+
+    def clear(self):
+        with self._lock:
+            self._indexes.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "scopes": len(self._indexes),
+                "entries": sum(index.size for index in self._indexes.values()),
+                "threshold": self.threshold,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+
+def _load_embedder(path: str) -> Embedder:
+    """Import an embedding callable from 'package.module:attribute'."""
+    module_name, _, attribute = path.partition(":")
+    embedder = getattr(importlib.import_module(module_name), attribute)
+    # Allow pointing at a class/factory that builds the callable
+    return embedder() if isinstance(embedder, type) else embedder
+
+
+def create_semantic_cache() -> Optional[SemanticCache]:
+    """Build the semantic cache configured by SEMANTIC_CACHE_* environment variables."""
+    if (os.getenv("SEMANTIC_CACHE_ENABLED") or "false").lower() not in ("1", "true", "yes"):
+        return None
+    embedder_path = os.getenv("SEMANTIC_CACHE_EMBEDDER")
+    return SemanticCache(
+        embedder=_load_embedder(embedder_path) if embedder_path else None,
+        threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD") or "0.95"),
+        capacity=int(os.getenv("SEMANTIC_CACHE_CAPACITY") or "1000"),
+        dim=int(os.getenv("SEMANTIC_CACHE_DIM") or "512")
+    )
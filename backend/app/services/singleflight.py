@@ -0,0 +1,73 @@
+import asyncio
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls onto one in-flight task.
+    The first caller for a key starts the work; callers arriving before it
+    finishes await the same result instead of issuing their own request.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, Tuple[asyncio.Task, int]] = {}
+        self.calls = 0
+        self.executions = 0
+        self.collapsed = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run `fn()` once per key at a time and share its result (or exception)."""
+        self.calls += 1
+        entry = self._inflight.get(key)
+        if entry is None:
+            self.executions += 1
+            task = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda t, k=key: self._forget(k, t))
+            self._inflight[key] = (task, 1)
+        else:
+            self.collapsed += 1
+            task, waiters = entry
+            self._inflight[key] = (task, waiters + 1)
+
+        try:
+            # Shield so one cancelled caller doesn't cancel the call for everyone
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            self._leave(key, task)
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "collapsed": self.collapsed,
+            "in_flight": len(self._inflight)
+        }
+
+    def _leave(self, key: Hashable, task: asyncio.Task):
+        entry = self._inflight.get(key)
+        if entry is None or entry[0] is not task:
+            return
+        waiters = entry[1] - 1
+        if waiters <= 0:
+            # Nobody is left waiting: stop the underlying request
+            del self._inflight[key]
+            task.cancel()
+        else:
+            self._inflight[key] = (task, waiters)
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        entry = self._inflight.get(key)
+        if entry is not None and entry[0] is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Mark the exception retrieved when every waiter has gone away
+            task.exception()
+
+
+def request_key(*parts: Any) -> str:
+    """Hash the parts that make two provider requests identical."""
+    payload = json.dumps(parts, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
@@ -0,0 +1,146 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from app.services.llm_cache import CacheBackend, SQLiteCacheBackend
+
+logger = logging.getLogger(__name__)
+
+
+class ToolFailure(str):
+    """
+    Tool output reporting a failure (e.g. "Error calculating: ..."). Agents see it
+    like any other text, but it is never cached.
+    """
+
+
+class ToolResultCache:
+    """
+    Cache of tool outputs keyed by tool name and input.
+    A process-local LRU bounded by entry count and total bytes sits in front of
+    an optional shared store (e.g. SQLite) that survives restarts.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        max_bytes: int = 64 * 1024 * 1024,
+        store: Optional[CacheBackend] = None
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.store = store
+        self._entries: "OrderedDict[str, Tuple[str, Optional[float], int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.store_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(tool_name: str, input_data: str) -> str:
+        payload = json.dumps([tool_name, input_data], separators=(",", ":"))
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, tool_name: str, input_data: str, ttl_seconds: Optional[float] = None) -> Optional[str]:
+        """Cached output, or None. `ttl_seconds` applies when promoting a store hit into memory."""
+        key = self.make_key(tool_name, input_data)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at, _ = entry
+                if expires_at is None or expires_at > time.time():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._remove(key)
+
+        value = None
+        if self.store is not None:
+            try:
+                value = self.store.get(key)
+            except Exception as e:
+                logger.warning(f"Tool cache read failed: {e}")
+        if value is None:
+            self.misses += 1
+            return None
+        self.store_hits += 1
+        self._put(key, value, ttl_seconds)
+        return value
+
+    def set(self, tool_name: str, input_data: str, value: str, ttl_seconds: Optional[float] = None):
+        key = self.make_key(tool_name, input_data)
+        self._put(key, value, ttl_seconds)
+        if self.store is not None:
+            try:
+                self.store.set(key, value, ttl_seconds)
+            except Exception as e:
+                logger.warning(f"Tool cache write failed: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        if self.store is not None:
+            self.store.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.store_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "store_hits": self.store_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits + self.store_hits) / lookups if lookups else 0.0
+            }
+
+    def _put(self, key: str, value: str, ttl_seconds: Optional[float]):
+        size = len(key) + len(value.encode())
+        if size > self.max_bytes:
+            return
+        expires_at = time.time() + ttl_seconds if ttl_seconds else None
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (value, expires_at, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+
+def create_tool_cache() -> Optional[ToolResultCache]:
+    """Build the tool result cache configured by TOOL_CACHE_* environment variables."""
+    backend_name = (os.getenv("TOOL_CACHE_BACKEND") or "memory").lower()
+    if backend_name in ("off", "none", "disabled"):
+        return None
+    store = None
+    if backend_name == "sqlite":
+        path = os.getenv("TOOL_CACHE_PATH") or "./tool_cache.db"
+        store = SQLiteCacheBackend(
+            path,
+            max_entries=int(os.getenv("TOOL_CACHE_STORE_MAX_ENTRIES") or "100000"),
+            table="tool_result_cache"
+        )
+    elif backend_name != "memory":
+        logger.warning(f"Unknown TOOL_CACHE_BACKEND '{backend_name}', using memory")
+    return ToolResultCache(
+        max_entries=int(os.getenv("TOOL_CACHE_MAX_ENTRIES") or "10000"),
+        max_bytes=int(os.getenv("TOOL_CACHE_MAX_BYTES") or str(64 * 1024 * 1024)),
+        store=store
+    )
@@ -0,0 +1,205 @@
+import asyncio
+import logging
+import math
+import multiprocessing
+import os
+import pickle
+import signal
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Optional
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; limits are skipped there
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+
+class ToolLimitExceeded(RuntimeError):
+    """A sandboxed tool call went over its CPU-time or memory limit."""
+
+
+# Worker-process state, set once by the pool initializer
+_worker_func: Optional[Callable[[str], str]] = None
+_worker_cpu_seconds: Optional[float] = None
+
+
+def _on_cpu_limit(signum, frame):
+    raise ToolLimitExceeded("Tool exceeded its CPU time limit")
+
+
+def _init_worker(func: Callable[[str], str], cpu_seconds: Optional[float], memory_mb: Optional[int]):
+    global _worker_func, _worker_cpu_seconds
+    _worker_func = func
+    _worker_cpu_seconds = cpu_seconds
+    # The API process handles Ctrl+C / SIGTERM; workers are shut down through the pool
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if resource is None:
+        return
+    if memory_mb:
+        limit = int(memory_mb) * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    if cpu_seconds:
+        signal.signal(signal.SIGXCPU, _on_cpu_limit)
+
+
+def _run_limited(input_data: str) -> str:
+    """
+    Run the call in a forked child of this worker with its own RLIMIT_CPU. The soft
+    limit raises ToolLimitExceeded through SIGXCPU, which only fires between Python
+    bytecodes; the hard limit one second later has the kernel kill the child even
+    inside a long C call. Hard limits cannot be raised again without privileges,
+    so they are set on the per-call child rather than on the long-lived worker.
+    """
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        status = 0
+        try:
+            # A forked child starts with zero CPU time used
+            soft = int(math.ceil(_worker_cpu_seconds))
+            _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+            limit_hard = soft + 1 if hard == resource.RLIM_INFINITY else min(soft + 1, hard)
+            resource.setrlimit(resource.RLIMIT_CPU, (min(soft, limit_hard), limit_hard))
+            try:
+                outcome = (True, _worker_func(input_data))
+            except MemoryError:
+                outcome = (False, ToolLimitExceeded("Tool exceeded its memory limit"))
+            except BaseException as e:
+                outcome = (False, e)
+            try:
+                payload = pickle.dumps(outcome)
+            except Exception:
+                payload = pickle.dumps((False, RuntimeError(repr(outcome[1]))))
+            with os.fdopen(write_fd, "wb") as stream:
+                stream.write(payload)
+        except BaseException:
+            status = 1
+        finally:
+            # Skip interpreter teardown and atexit hooks inherited from the worker
+            os._exit(status)
+
+    os.close(write_fd)
+    with os.fdopen(read_fd, "rb") as stream:
+        payload = stream.read()
+    _, status = os.waitpid(pid, 0)
+    if os.WIFSIGNALED(status) and os.WTERMSIG(status) in (signal.SIGKILL, signal.SIGXCPU):
+        raise ToolLimitExceeded("Tool exceeded its CPU time limit")
+    if not payload:
+        raise ToolLimitExceeded("Tool process died; it may have exceeded its limits")
+    # Written by our own forked child just above, never by the tool's caller
+    ok, value = pickle.loads(payload)  # nosec B301
+    if not ok:
+        raise value
+    return value
+
+
+def _run_in_worker(input_data: str) -> str:
+    if resource is not None and _worker_cpu_seconds:
+        return _run_limited(input_data)
+    try:
+        return _worker_func(input_data)
+    except MemoryError:
+        raise ToolLimitExceeded("Tool exceeded its memory limit")
+
+
+def _noop(_: str = "") -> None:
+    return None
+
+
+class ProcessSandbox:
+    """
+    Pre-started pool of worker processes running one tool function under rlimits.
+    The function is sent to each worker once at start-up; calls only ship their
+    input string and result. Workers are replaced after `max_calls_per_worker`
+    calls, and the pool is rebuilt if a worker dies or an async call is cancelled
+    (e.g. by a timeout). With `cpu_seconds` set, each call runs in a child forked
+    from the warm worker under a hard CPU limit.
+    """
+
+    def __init__(
+        self,
+        func: Callable[[str], str],
+        max_workers: int = 2,
+        cpu_seconds: Optional[float] = None,
+        memory_mb: Optional[int] = None,
+        max_calls_per_worker: int = 100,
+        prewarm: bool = True
+    ):
+        self.func = func
+        self.max_workers = max_workers
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self.max_calls_per_worker = max_calls_per_worker
+        self.prewarm = prewarm
+        self._lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.calls = 0
+        self.restarts = 0
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # Workers are recycled, which needs a non-fork start method
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=context,
+                    initializer=_init_worker,
+                    initargs=(self.func, self.cpu_seconds, self.memory_mb),
+                    max_tasks_per_child=self.max_calls_per_worker
+                )
+                if self.prewarm:
+                    for _ in range(self.max_workers):
+                        self._pool.submit(_noop)
+            return self._pool
+
+    def _reset(self, pool: ProcessPoolExecutor):
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+                self.restarts += 1
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _kill(self, pool: ProcessPoolExecutor):
+        """Replace a pool and kill its workers, which shutdown() alone leaves running."""
+        # The executor exposes no public way to reach its worker processes
+        processes = list((pool._processes or {}).values())
+        self._reset(pool)
+        for process in processes:
+            process.kill()
+
+    async def run(self, input_data: str) -> str:
+        pool = self._get_pool()
+        self.calls += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(pool, _run_in_worker, input_data)
+        except asyncio.CancelledError:
+            # Timed out or abandoned: the worker would keep running the tool, so it is
+            # killed, along with any other call the pool was serving
+            self._kill(pool)
+            raise
+        except BrokenProcessPool as e:
+            # A worker was killed (hard limit, OOM killer, crash): start fresh next time
+            self._reset(pool)
+            raise ToolLimitExceeded("Tool worker process died; it may have exceeded its limits") from e
+
+    def run_sync(self, input_data: str) -> str:
+        pool = self._get_pool()
+        self.calls += 1
+        try:
+            return pool.submit(_run_in_worker, input_data).result()
+        except BrokenProcessPool as e:
+            self._reset(pool)
+            raise ToolLimitExceeded("Tool worker process died; it may have exceeded its limits") from e
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
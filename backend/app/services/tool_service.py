@@ -1,73 +1,331 @@
-from typing import List, Dict, Any, Optional
+from typing import TYPE_CHECKING, Callable, List, Dict, Any, Optional, Tuple
+import asyncio
 import logging
-from langchain_core.tools import Tool
-from langchain_community.tools import WikipediaQueryRun
-from langchain_community.utilities import WikipediaAPIWrapper
-from langchain_core.pydantic_v1 import BaseModel, Field
-from simpleeval import simple_eval
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from importlib.metadata import entry_points
+from app.services.tool_cache import ToolFailure, ToolResultCache, create_tool_cache
+from app.services.tool_sandbox import ProcessSandbox
+
+if TYPE_CHECKING:
+    # LangChain (and langsmith behind it) is imported when the first tool is built
+    from langchain_core.tools import BaseTool, Tool
 
 logger = logging.getLogger(__name__)
 
-def calculator_func(input_str: str) -> str:
-    """
-    Calculates a mathematical expression.
-    WARNING: Uses eval() - strictly for demonstration checks.
-    """
-    try:
-        # Use simpleeval for safe mathematical expression evaluation
-        # This prevents arbitrary code execution (B307)
-        return str(simple_eval(input_str))
-    except Exception as e:
-        logger.error(f"Calculator error for input '{input_str}': {e}")
-        return f"Error calculating: {str(e)}"
+ISOLATION_LEVELS = ("thread", "process")
+# Third-party packages expose tools as entry points in this group
+TOOL_ENTRY_POINT_GROUP = "agentweave.tools"
+CALCULATOR_DESCRIPTION = "Useful for performing mathematical calculations. Input should be a mathematical expression like '2 + 2'."
+WIKIPEDIA_DESCRIPTION = "Useful for querying Wikipedia for information."
+# Argument schema of a single-string Tool, listed for tools that are not built yet
+SINGLE_INPUT_ARGS = {"tool_input": {"type": "string"}}
+
+ToolFactory = Callable[[], "BaseTool"]
+
+
+class ToolPolicy:
+    """How one tool is run: concurrency, timeout, result caching and isolation (times in seconds)."""
+
+    def __init__(
+        self,
+        max_concurrency: Optional[int] = None,
+        timeout: Optional[float] = None,
+        cacheable: bool = False,
+        cache_ttl: Optional[float] = None,
+        isolation: str = "thread",
+        cpu_seconds: Optional[float] = None,
+        memory_mb: Optional[int] = None
+    ):
+        if isolation not in ISOLATION_LEVELS:
+            raise ValueError(f"Unknown isolation '{isolation}', expected one of {ISOLATION_LEVELS}")
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.cacheable = cacheable
+        self.cache_ttl = cache_ttl
+        self.isolation = isolation
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+
+
+class ToolRegistration:
+    """A named tool whose instance is built by `factory` on first use, with its load metrics."""
+
+    def __init__(
+        self,
+        name: str,
+        factory: ToolFactory,
+        description: Optional[str] = None,
+        args: Optional[Dict[str, Any]] = None,
+        source: str = "registered"
+    ):
+        self.name = name
+        self.factory = factory
+        self.description = description
+        self.args = args
+        self.source = source
+        self.startup_ms: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def metrics(self, loaded: bool) -> Dict[str, Any]:
+        return {"source": self.source, "loaded": loaded, "startup_ms": self.startup_ms, "error": self.error}
+
+
+def has_native_async(tool: "BaseTool") -> bool:
+    """True when the tool implements its own coroutine instead of LangChain's thread fallback."""
+    from langchain_core.tools import BaseTool, Tool
+    if isinstance(tool, Tool):
+        return tool.coroutine is not None
+    return type(tool)._arun is not BaseTool._arun
+
+
+def _build_calculator() -> "BaseTool":
+    from langchain_core.tools import Tool
+    from app.services.calculator import calculator_func
+    return Tool(name="Calculator", func=calculator_func, description=CALCULATOR_DESCRIPTION)
+
+
+def _build_wikipedia_index_tool() -> "BaseTool":
+    from langchain_core.tools import Tool
+    from app.services.wikipedia_index import WikipediaIndex
+    wiki_index = WikipediaIndex(os.environ["WIKIPEDIA_INDEX_PATH"])
+    return Tool(name="Wikipedia", func=wiki_index.run, description=WIKIPEDIA_DESCRIPTION)
+
+
+def _build_wikipedia_api_tool() -> "BaseTool":
+    from langchain_core.tools import Tool
+    from langchain_community.tools import WikipediaQueryRun
+    from langchain_community.utilities import WikipediaAPIWrapper
+    from app.services.wikipedia_index import NO_RESULT
+    wikipedia = WikipediaQueryRun(api_wrapper=WikipediaAPIWrapper())
+
+    def run(query: str) -> str:
+        result = wikipedia.run(query)
+        # The API answers "no result" for failed lookups too, so that text is not cached
+        return ToolFailure(result) if result == NO_RESULT else result
+    return Tool(name="Wikipedia", func=run, description=WIKIPEDIA_DESCRIPTION)
+
 
 class ToolService:
-    def __init__(self):
-        self._tools: Dict[str, Tool] = {}
+    def __init__(self, discover_plugins: Optional[bool] = None):
+        self._tools: Dict[str, "BaseTool"] = {}
+        self._registrations: Dict[str, ToolRegistration] = {}
+        self._policies: Dict[str, ToolPolicy] = {}
+        self._agent_tools: Dict[str, "Tool"] = {}
+        self._limiters: Dict[str, Tuple[asyncio.AbstractEventLoop, asyncio.Semaphore]] = {}
+        self._build_lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._sandboxes: Dict[str, ProcessSandbox] = {}
+        self.max_threads = int(os.getenv("TOOL_THREAD_POOL_SIZE", "8"))
+        self.default_timeout = float(os.getenv("TOOL_DEFAULT_TIMEOUT", "30")) or None
+        # Results of tools registered as cacheable (None when TOOL_CACHE_BACKEND=off)
+        self.result_cache: Optional[ToolResultCache] = create_tool_cache()
         self._initialize_default_tools()
+        if discover_plugins is None:
+            discover_plugins = os.getenv("TOOL_PLUGINS_ENABLED", "true").lower() in ("1", "true", "yes")
+        if discover_plugins:
+            self.discover_plugins()
 
     def _initialize_default_tools(self):
-        """Register default tools."""
-        
+        """Register default tools. Nothing is constructed until a tool is first used."""
+
         # 1. Calculator
-        calc_tool = Tool(
-            name="Calculator",
-            func=calculator_func,
-            description="Useful for performing mathematical calculations. Input should be a mathematical expression like '2 + 2'."
+        # Pure function of its input: successes are cached without expiry. Large batches are CPU-bound,
+        # so deployments can move it to the process sandbox with CALCULATOR_ISOLATION=process
+        self.register_factory(
+            "Calculator",
+            _build_calculator,
+            description=CALCULATOR_DESCRIPTION,
+            source="builtin",
+            timeout=5,
+            cacheable=True,
+            isolation=os.getenv("CALCULATOR_ISOLATION", "thread"),
+            cpu_seconds=5,
+            memory_mb=512
         )
-        self.register_tool(calc_tool)
 
-        # 2. Wikipedia (if available)
-        try:
-            wikipedia = WikipediaQueryRun(api_wrapper=WikipediaAPIWrapper())
-            wiki_tool = Tool(
-                name="Wikipedia",
-                func=wikipedia.run,
-                description="Useful for querying Wikipedia for information."
+        # 2. Wikipedia: local full-text index when WIKIPEDIA_INDEX_PATH is built, else the live API
+        index_path = os.getenv("WIKIPEDIA_INDEX_PATH")
+        if index_path and os.path.exists(index_path):
+            # Local and read-only: no concurrency cap; cached results expire so a
+            # re-ingested index is picked up
+            self.register_factory(
+                "Wikipedia", _build_wikipedia_index_tool, description=WIKIPEDIA_DESCRIPTION,
+                source="builtin", timeout=5, cacheable=True,
+                cache_ttl=float(os.getenv("WIKIPEDIA_INDEX_CACHE_TTL", "3600"))
             )
-            self.register_tool(wiki_tool)
-        except Exception as e:
-            logger.warning(f"Failed to initialize Wikipedia tool: {e}")
+        else:
+            if index_path:
+                logger.warning(f"WIKIPEDIA_INDEX_PATH {index_path} not found, using the Wikipedia API")
+            # Network-bound: cap parallel lookups so one slow API can't take every thread
+            self.register_factory(
+                "Wikipedia", _build_wikipedia_api_tool, description=WIKIPEDIA_DESCRIPTION,
+                source="builtin", max_concurrency=4, timeout=15, cacheable=True, cache_ttl=86400
+            )
+
+    def discover_plugins(self, group: str = TOOL_ENTRY_POINT_GROUP) -> List[str]:
+        """
+        Register tools advertised by installed packages under the entry-point group
+        `group`, named after their entry point. Plugin code is only imported when the
+        tool is first used. Returns the names registered.
+        """
+        names = []
+        for entry_point in entry_points(group=group):
+            if entry_point.name in self._registrations:
+                logger.warning(f"Tool plugin {entry_point.value} ignored: '{entry_point.name}' is already registered")
+                continue
+            source = f"plugin:{entry_point.dist.name}" if entry_point.dist else "plugin"
+            self.register_factory(
+                entry_point.name, lambda entry_point=entry_point: self._load_plugin(entry_point), source=source
+            )
+            names.append(entry_point.name)
+        return names
+
+    def _load_plugin(self, entry_point) -> "BaseTool":
+        """
+        Build the tool behind an entry point. The target may be a tool instance or a
+        zero-argument callable returning one; an optional `tool_policy` dict on it
+        sets the run policy (same keys as `register_tool`).
+        """
+        from langchain_core.tools import BaseTool
+        target = entry_point.load()
+        tool = target if isinstance(target, BaseTool) else target()
+        if not isinstance(tool, BaseTool):
+            raise ValueError(f"Entry point {entry_point.value} did not provide a tool")
+        policy = getattr(target, "tool_policy", None)
+        if policy:
+            self._policies[entry_point.name] = ToolPolicy(**policy)
+        return tool
+
+    def register_factory(
+        self,
+        name: str,
+        factory: ToolFactory,
+        description: Optional[str] = None,
+        args: Optional[Dict[str, Any]] = None,
+        source: str = "registered",
+        **policy: Any
+    ):
+        """
+        Register a tool to be built by `factory` the first time it is used. Giving
+        `description` (and `args` when it is not a single-string tool) lets it be
+        listed without being built. `policy` takes the same options as `register_tool`.
+        """
+        tool_policy = ToolPolicy(**policy)
+        self._reset(name)
+        self._tools.pop(name, None)
+        self._registrations[name] = ToolRegistration(
+            name, factory, description, args or (SINGLE_INPUT_ARGS if description else None), source
+        )
+        self._policies[name] = tool_policy
 
-    def register_tool(self, tool: Tool):
-        """Register a new tool."""
+    def register_tool(
+        self,
+        tool: "BaseTool",
+        max_concurrency: Optional[int] = None,
+        timeout: Optional[float] = None,
+        cacheable: bool = False,
+        cache_ttl: Optional[float] = None,
+        isolation: str = "thread",
+        cpu_seconds: Optional[float] = None,
+        memory_mb: Optional[int] = None
+    ):
+        """
+        Register a new tool. `max_concurrency` caps its simultaneous async calls and
+        `timeout` bounds each one (default TOOL_DEFAULT_TIMEOUT). Outputs of
+        `cacheable` tools are reused for identical input for `cache_ttl` seconds
+        (forever when None). With isolation="process" the tool runs in a worker
+        process pool, limited to `cpu_seconds` of CPU and `memory_mb` of memory
+        per call; its function must be picklable.
+        """
+        policy = ToolPolicy(max_concurrency, timeout, cacheable, cache_ttl, isolation, cpu_seconds, memory_mb)
+        self._reset(tool.name)
+        registration = ToolRegistration(tool.name, lambda: tool, tool.description, tool.args)
+        registration.startup_ms = 0.0
+        self._registrations[tool.name] = registration
         self._tools[tool.name] = tool
+        self._policies[tool.name] = policy
         logger.info(f"Registered tool: {tool.name}")
 
-    def get_tool(self, name: str) -> Optional[Tool]:
-        """Get a specific tool by name."""
-        return self._tools.get(name)
+    def _reset(self, name: str):
+        """Drop state derived from a previous registration of `name`."""
+        old_sandbox = self._sandboxes.pop(name, None)
+        if old_sandbox is not None:
+            old_sandbox.shutdown()
+        self._agent_tools.pop(name, None)
+        self._limiters.pop(name, None)
+
+    def get_tool(self, name: str) -> Optional["BaseTool"]:
+        """Get a specific tool by name, building it on first use."""
+        tool = self._tools.get(name)
+        if tool is not None:
+            return tool
+        registration = self._registrations.get(name)
+        if registration is None or registration.error is not None:
+            return None
+        with self._build_lock:
+            tool = self._tools.get(name)
+            if tool is None and registration.error is None:
+                tool = self._build(registration)
+        return tool
+
+    def _build(self, registration: ToolRegistration) -> Optional["BaseTool"]:
+        started = time.perf_counter()
+        try:
+            tool = registration.factory()
+        except Exception as e:
+            # Recorded so a broken tool is reported once instead of on every call
+            registration.error = str(e)
+            logger.warning(f"Failed to initialize {registration.name} tool: {e}")
+            return None
+        finally:
+            registration.startup_ms = round((time.perf_counter() - started) * 1000, 2)
+        self._tools[registration.name] = tool
+        logger.info(f"Loaded tool {registration.name} ({registration.source}) in {registration.startup_ms} ms")
+        return tool
+
+    def tool_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Per-tool source, whether it is built yet, build time in ms and any build error."""
+        return {
+            name: registration.metrics(name in self._tools)
+            for name, registration in self._registrations.items()
+        }
+
+    def get_agent_tool(self, name: str) -> Optional["Tool"]:
+        """
+        The tool as agents should see it: same name and description, but calls go
+        through `aexecute_tool` so agents share its thread pool, limits and timeouts.
+        """
+        tool = self.get_tool(name)
+        if tool is None:
+            return None
+        agent_tool = self._agent_tools.get(name)
+        if agent_tool is None:
+            from langchain_core.tools import Tool
+            agent_tool = Tool(
+                name=tool.name,
+                description=tool.description,
+                func=lambda query: self.execute_tool(name, query),
+                coroutine=lambda query: self.aexecute_tool(name, query)
+            )
+            self._agent_tools[name] = agent_tool
+        return agent_tool
 
     def get_available_tools(self) -> List[Dict[str, Any]]:
         """List all available tools metadata."""
-        return [
-            {
-                "name": name,
-                "description": tool.description,
-                "args": tool.args
-            }
-            for name, tool in self._tools.items()
-        ]
+        tools = []
+        for name, registration in list(self._registrations.items()):
+            tool = self._tools.get(name)
+            if tool is None and (registration.description is None or registration.args is None):
+                # Unknown metadata (e.g. plugins): build it to describe it
+                tool = self.get_tool(name)
+            if tool is not None:
+                tools.append({"name": name, "description": tool.description, "args": tool.args})
+            elif registration.error is None:
+                tools.append({"name": name, "description": registration.description, "args": registration.args})
+        return tools
 
     def execute_tool(self, tool_name: str, input_data: str) -> str:
         """Execute a tool by name."""
@@ -76,11 +334,119 @@ class ToolService:
             logger.error(f"Tool not found: {tool_name}")
             raise ValueError(f"Tool '{tool_name}' not found")
         
+        cached = self._cached_result(tool_name, input_data)
+        if cached is not None:
+            return cached
+
+        try:
+            sandbox = self._sandbox(tool_name)
+            result = sandbox.run_sync(input_data) if sandbox else tool.run(input_data)
+        except Exception as e:
+            logger.error(f"Error executing tool {tool_name}: {e}")
+            return f"Error executing tool {tool_name}: {str(e)}"
+        self._store_result(tool_name, input_data, result)
+        return result
+
+    async def aexecute_tool(self, tool_name: str, input_data: str) -> str:
+        """
+        Execute a tool without blocking the event loop: its own coroutine when it has
+        one, otherwise a call on the bounded tool thread pool. Per-tool concurrency
+        limits and timeouts apply either way.
+        """
+        tool = self.get_tool(tool_name)
+        if not tool:
+            logger.error(f"Tool not found: {tool_name}")
+            raise ValueError(f"Tool '{tool_name}' not found")
+
+        cached = self._cached_result(tool_name, input_data)
+        if cached is not None:
+            return cached
+
+        policy = self._policies.get(tool_name) or ToolPolicy()
+        timeout = policy.timeout or self.default_timeout
+        limiter = self._limiter(tool_name, policy)
         try:
-            return tool.run(input_data)
+            if limiter is None:
+                result = await asyncio.wait_for(self._arun(tool_name, tool, input_data), timeout)
+            else:
+                async with limiter:
+                    result = await asyncio.wait_for(self._arun(tool_name, tool, input_data), timeout)
+            self._store_result(tool_name, input_data, result)
+            return result
+        except asyncio.TimeoutError:
+            logger.error(f"Tool {tool_name} timed out after {timeout}s")
+            return f"Error executing tool {tool_name}: timed out after {timeout}s"
         except Exception as e:
             logger.error(f"Error executing tool {tool_name}: {e}")
             return f"Error executing tool {tool_name}: {str(e)}"
 
+    def _cached_result(self, tool_name: str, input_data: str) -> Optional[str]:
+        policy = self._policies.get(tool_name)
+        if self.result_cache is None or policy is None or not policy.cacheable:
+            return None
+        return self.result_cache.get(tool_name, input_data, policy.cache_ttl)
+
+    def _store_result(self, tool_name: str, input_data: str, result: Any):
+        """Cache a successful output. Exceptions and timeouts never reach here; ToolFailure outputs are skipped."""
+        policy = self._policies.get(tool_name)
+        if self.result_cache is None or policy is None or not policy.cacheable:
+            return
+        if not isinstance(result, str) or isinstance(result, ToolFailure):
+            return
+        self.result_cache.set(tool_name, input_data, result, policy.cache_ttl)
+
+    async def _arun(self, tool_name: str, tool: "BaseTool", input_data: str) -> str:
+        sandbox = self._sandbox(tool_name)
+        if sandbox is not None:
+            return await sandbox.run(input_data)
+        if has_native_async(tool):
+            return await tool.arun(input_data)
+        # A timed-out call keeps its thread until the tool returns; the pool size bounds that
+        return await asyncio.get_running_loop().run_in_executor(self._get_executor(), tool.run, input_data)
+
+    def _sandbox(self, tool_name: str) -> Optional[ProcessSandbox]:
+        """Process pool for a tool registered with isolation="process", started on first use."""
+        policy = self._policies.get(tool_name)
+        if policy is None or policy.isolation != "process":
+            return None
+        sandbox = self._sandboxes.get(tool_name)
+        if sandbox is None:
+            tool = self._tools[tool_name]
+            func = getattr(tool, "func", None) or tool.run
+            sandbox = ProcessSandbox(
+                func,
+                max_workers=int(os.getenv("TOOL_SANDBOX_WORKERS", "2")),
+                cpu_seconds=policy.cpu_seconds,
+                memory_mb=policy.memory_mb,
+                max_calls_per_worker=int(os.getenv("TOOL_SANDBOX_MAX_CALLS", "100"))
+            )
+            self._sandboxes[tool_name] = sandbox
+        return sandbox
+
+    def shutdown(self):
+        """Stop tool worker threads and sandbox processes."""
+        for sandbox in self._sandboxes.values():
+            sandbox.shutdown()
+        self._sandboxes.clear()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_threads, thread_name_prefix="tool")
+        return self._executor
+
+    def _limiter(self, tool_name: str, policy: ToolPolicy) -> Optional[asyncio.Semaphore]:
+        """Per-tool semaphore for the running event loop, or None when unlimited."""
+        if not policy.max_concurrency:
+            return None
+        loop = asyncio.get_running_loop()
+        entry = self._limiters.get(tool_name)
+        if entry is None or entry[0] is not loop:
+            entry = (loop, asyncio.Semaphore(policy.max_concurrency))
+            self._limiters[tool_name] = entry
+        return entry[1]
+
 # Singleton instance
 tool_service = ToolService()
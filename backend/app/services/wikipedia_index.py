@@ -0,0 +1,240 @@
+"""
+Offline Wikipedia search backed by a local SQLite FTS5 index.
+
+Build an index by streaming a MediaWiki XML dump (.xml, .xml.bz2 or .xml.gz) or a
+JSON-lines file of {"title", "text"} articles:
+
+    python -m app.services.wikipedia_index enwiki-latest-pages-articles.xml.bz2 --index ./wikipedia.db
+
+then point WIKIPEDIA_INDEX_PATH at the file to answer the Wikipedia tool from it.
+"""
+import argparse
+import bz2
+import gzip
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import IO, Iterable, Iterator, List, Optional, Tuple
+
+from defusedxml.ElementTree import iterparse
+
+logger = logging.getLogger(__name__)
+
+# Same limits and wording as langchain's WikipediaAPIWrapper, so answers look alike
+MAX_QUERY_LENGTH = 300
+NO_RESULT = "No good Wikipedia Search Result was found"
+
+Article = Tuple[str, str]
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+_TEMPLATE = re.compile(r"\{\{[^{}]*\}\}")
+_TABLE = re.compile(r"\{\|.*?\|\}", re.DOTALL)
+_REF = re.compile(r"<ref[^>/]*/>|<ref[^>]*>.*?</ref>", re.DOTALL | re.IGNORECASE)
+_COMMENT = re.compile(r"<!--.*?-->", re.DOTALL)
+_TAG = re.compile(r"<[^>]+>")
+_FILE_LINK = re.compile(r"\[\[(?:File|Image|Category):[^\[\]]*(?:\[\[[^\]]*\]\][^\[\]]*)*\]\]", re.IGNORECASE)
+_LINK = re.compile(r"\[\[(?:[^|\]]*\|)?([^\]]*)\]\]")
+_EXTERNAL_LINK = re.compile(r"\[https?://[^\s\]]+\s*([^\]]*)\]")
+_EMPHASIS = re.compile(r"'{2,}")
+_HEADING = re.compile(r"^=+\s*(.*?)\s*=+\s*$", re.MULTILINE)
+_BLANK_LINES = re.compile(r"\n{3,}")
+
+
+def clean_wikitext(text: str) -> str:
+    """Reduce wikitext markup to plain prose (templates, tables, refs and files are dropped)."""
+    text = _COMMENT.sub("", text)
+    text = _REF.sub("", text)
+    # Templates nest, so strip innermost first until none are left
+    previous = None
+    while previous != text:
+        previous, text = text, _TEMPLATE.sub("", text)
+    text = _TABLE.sub("", text)
+    text = _FILE_LINK.sub("", text)
+    text = _LINK.sub(r"\1", text)
+    text = _EXTERNAL_LINK.sub(r"\1", text)
+    text = _EMPHASIS.sub("", text)
+    text = _TAG.sub("", text)
+    text = _HEADING.sub(r"\n\1\n", text)
+    return _BLANK_LINES.sub("\n\n", text).strip()
+
+
+def lead_section(text: str) -> str:
+    """Text before the first section heading, the offline stand-in for a page summary."""
+    match = re.search(r"^=+[^=\n]+=+\s*$", text, re.MULTILINE)
+    return text[:match.start()] if match else text
+
+
+def _open(path: str) -> IO[bytes]:
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rb")
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def iter_dump_articles(path: str) -> Iterator[Article]:
+    """Stream (title, plain text) for main-namespace, non-redirect pages of a MediaWiki XML dump."""
+    with _open(path) as stream:
+        # defusedxml refuses entity expansion and external entities in the dump
+        context = iterparse(stream, events=("start", "end"))
+        _, root = next(context)
+        for event, elem in context:
+            if event != "end" or elem.tag.rsplit("}", 1)[-1] != "page":
+                continue
+            title = ns = text = None
+            redirect = False
+            for child in elem.iter():
+                tag = child.tag.rsplit("}", 1)[-1]
+                if tag == "title":
+                    title = child.text
+                elif tag == "ns":
+                    ns = child.text
+                elif tag == "redirect":
+                    redirect = True
+                elif tag == "text":
+                    text = child.text
+            # Drop parsed pages so memory stays flat however large the dump is
+            root.clear()
+            if title and text and ns in (None, "0") and not redirect:
+                yield title, text
+
+
+def iter_jsonl_articles(path: str) -> Iterator[Article]:
+    """Stream (title, text) from JSON lines with "title" and "text" keys (e.g. WikiExtractor --json)."""
+    with _open(path) as stream:
+        for line in stream:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record.get("title") and record.get("text"):
+                yield record["title"], record["text"]
+
+
+class WikipediaIndex:
+    """SQLite FTS5 index of Wikipedia articles, searched with BM25 ranking."""
+
+    def __init__(
+        self,
+        path: str,
+        top_k_results: int = 3,
+        doc_content_chars_max: int = 4000,
+        mmap_bytes: int = 256 * 1024 * 1024
+    ):
+        self.path = path
+        self.top_k_results = top_k_results
+        self.doc_content_chars_max = doc_content_chars_max
+        self.mmap_bytes = mmap_bytes
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        # One read connection per thread: tool calls run on a thread pool
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            conn.execute(f"PRAGMA mmap_size={int(self.mmap_bytes)}")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _create(conn: sqlite3.Connection):
+        conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS articles USING fts5("
+            "title, summary UNINDEXED, body, tokenize='porter unicode61')"
+        )
+
+    def ingest(self, articles: Iterable[Article], batch_size: int = 1000, body_chars_max: int = 20000) -> int:
+        """
+        Add (title, wikitext or plain text) articles in batched transactions and return
+        how many were written. Only the first `body_chars_max` characters are indexed.
+        """
+        conn = sqlite3.connect(self.path, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._create(conn)
+            count = 0
+            batch: List[Tuple[str, str, str]] = []
+            started = time.perf_counter()
+            for title, text in articles:
+                summary = clean_wikitext(lead_section(text))
+                body = clean_wikitext(text[:body_chars_max * 2])[:body_chars_max]
+                batch.append((title, summary or body[:self.doc_content_chars_max], body))
+                if len(batch) >= batch_size:
+                    count += self._write(conn, batch)
+                    batch = []
+                    logger.info(f"Indexed {count} articles ({count / (time.perf_counter() - started):.0f}/s)")
+            count += self._write(conn, batch)
+            # Merge FTS segments once so queries touch as few b-trees as possible
+            conn.execute("INSERT INTO articles(articles) VALUES ('optimize')")
+            return count
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _write(conn: sqlite3.Connection, batch: List[Tuple[str, str, str]]) -> int:
+        if not batch:
+            return 0
+        conn.execute("BEGIN")
+        conn.executemany("INSERT INTO articles (title, summary, body) VALUES (?, ?, ?)", batch)
+        conn.execute("COMMIT")
+        return len(batch)
+
+    @staticmethod
+    def match_expression(query: str) -> Optional[str]:
+        """FTS5 query matching any of the words in `query`, with user syntax neutralised."""
+        tokens = _TOKEN.findall(query[:MAX_QUERY_LENGTH])
+        if not tokens:
+            return None
+        return " OR ".join(f'"{token}"' for token in tokens)
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[Tuple[str, str]]:
+        """Best (title, summary) matches, with title hits weighted above body hits."""
+        expression = self.match_expression(query)
+        if expression is None:
+            return []
+        return self._connection().execute(
+            "SELECT title, summary FROM articles WHERE articles MATCH ? "
+            "ORDER BY bm25(articles, 10.0, 0.0, 1.0) LIMIT ?",
+            (expression, limit or self.top_k_results)
+        ).fetchall()
+
+    def run(self, query: str) -> str:
+        """Search and format results like WikipediaAPIWrapper.run."""
+        summaries = [f"Page: {title}\nSummary: {summary}" for title, summary in self.search(query)]
+        if not summaries:
+            return NO_RESULT
+        return "\n\n".join(summaries)[:self.doc_content_chars_max]
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Build the offline Wikipedia index used by the Wikipedia tool.")
+    parser.add_argument("source", help="MediaWiki XML dump (.xml/.bz2/.gz) or JSON lines of {title, text}")
+    parser.add_argument("--index", default=os.getenv("WIKIPEDIA_INDEX_PATH") or "./wikipedia.db",
+                        help="SQLite index file to create or extend")
+    parser.add_argument("--format", choices=("auto", "xml", "jsonl"), default="auto")
+    parser.add_argument("--limit", type=int, default=0, help="stop after this many articles (0 = all)")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--body-chars", type=int, default=20000, help="characters of each article to index")
+    parser.add_argument("--log-level", default=os.getenv("LOG_LEVEL", "INFO"))
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+    source_format = args.format
+    if source_format == "auto":
+        source_format = "jsonl" if re.search(r"\.jsonl?(\.(bz2|gz))?$", args.source) else "xml"
+    articles: Iterable[Article] = (
+        iter_jsonl_articles(args.source) if source_format == "jsonl" else iter_dump_articles(args.source)
+    )
+    if args.limit:
+        articles = (article for i, article in zip(range(args.limit), articles))
+
+    count = WikipediaIndex(args.index).ingest(articles, batch_size=args.batch_size, body_chars_max=args.body_chars)
+    logger.info(f"Wrote {count} articles to {args.index}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Standalone workflow execution worker.
+
+    python -m app.worker --concurrency 4 --processes 8
+
+Each process claims queued executions from the shared database, runs them and
+writes the results back, independently of the API servers. Start as many as the
+host has cores (or use --processes); set EXECUTION_WORKERS=0 on API pods that
+should only accept requests.
+"""
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+from typing import List, Optional
+
+from dotenv import load_dotenv
+
+logger = logging.getLogger("app.worker")
+
+
+async def run_worker(queue, stop_event: asyncio.Event):
+    """Drain `queue` until `stop_event` is set, then hand back unfinished jobs."""
+    await queue.start()
+    logger.info(f"Worker {queue.worker_prefix} running {queue.num_workers} concurrent execution(s)")
+    try:
+        await stop_event.wait()
+    finally:
+        await queue.stop()
+        logger.info(f"Worker {queue.worker_prefix} stopped")
+
+
+def _import_models():
+    """Register every model so relationships resolve outside the API app."""
+    from app.models import user, workflow, credential, execution_job  # noqa: F401
+
+
+def _configure_logging(level: str):
+    logging.basicConfig(level=level.upper(), format="%(asctime)s %(process)d %(name)s %(levelname)s %(message)s")
+
+
+def _serve(concurrency: int, poll_interval: float, lease_seconds: float, log_level: str):
+    """Entry point of a single worker process."""
+    _configure_logging(log_level)
+
+    # Imported here so each spawned process builds its own engine and services
+    from app.db.database import SessionLocal
+    from app.services.job_queue import JobQueue
+
+    _import_models()
+    if os.getenv("PREWARM_ON_STARTUP", "false").lower() in ("1", "true", "yes"):
+        from app.services.providers import prewarm
+        prewarm()
+
+    queue = JobQueue(
+        session_factory=SessionLocal,
+        num_workers=concurrency,
+        poll_interval=poll_interval,
+        lease_seconds=lease_seconds
+    )
+
+    async def serve():
+        stop_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop_event.set)
+        await run_worker(queue, stop_event)
+
+    asyncio.run(serve())
+
+
+def main(argv: Optional[List[str]] = None):
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Run AgentWeave workflow execution workers.")
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("WORKER_CONCURRENCY", "4")),
+                        help="executions run at once per process")
+    parser.add_argument("--processes", type=int, default=int(os.getenv("WORKER_PROCESSES", "1")),
+                        help="worker processes to start (e.g. one per core)")
+    parser.add_argument("--poll-interval", type=float, default=float(os.getenv("EXECUTION_POLL_INTERVAL", "1.0")),
+                        help="seconds between queue polls when idle")
+    parser.add_argument("--lease-seconds", type=float, default=float(os.getenv("EXECUTION_LEASE_SECONDS", "300")),
+                        help="requeue running jobs whose worker stopped heartbeating for this long")
+    parser.add_argument("--log-level", default=os.getenv("LOG_LEVEL", "INFO"))
+    args = parser.parse_args(argv)
+
+    if args.concurrency < 1 or args.processes < 1:
+        parser.error("--concurrency and --processes must be at least 1")
+
+    _configure_logging(args.log_level)
+    serve_args = (args.concurrency, args.poll_interval, args.lease_seconds, args.log_level)
+
+    # Create tables once, before any worker process touches the database
+    from app.db.database import create_tables
+    _import_models()
+    create_tables()
+
+    if args.processes == 1:
+        _serve(*serve_args)
+        return
+
+    # Spawned (not forked) children so no DB connections or event loops are shared
+    context = multiprocessing.get_context("spawn")
+    children = [context.Process(target=_serve, args=serve_args, daemon=False) for _ in range(args.processes)]
+    for child in children:
+        child.start()
+
+    def forward(signum, frame):
+        for child in children:
+            if child.is_alive():
+                os.kill(child.pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, forward)
+    signal.signal(signal.SIGINT, forward)
+    for child in children:
+        child.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,15 @@
+import asyncio
 import pytest
 import os
 from unittest.mock import MagicMock
 
+@pytest.fixture(scope="session", autouse=True)
+def dispose_pooled_connections():
+    """Close pooled async DB connections so their threads don't keep pytest from exiting."""
+    yield
+    from app.db.database import dispose_async_engines
+    asyncio.run(dispose_async_engines())
+
 @pytest.fixture(autouse=True)
 def mock_env_vars():
     """Set environment variables for all tests."""
@@ -0,0 +1,42 @@
+from types import SimpleNamespace
+import pytest
+from app.core.agent_cache import AgentCache
+
+def _tool(name):
+    return SimpleNamespace(name=name)
+
+def test_key_depends_on_every_part():
+    calc = _tool("Calculator")
+    base = AgentCache.make_key("gemini-pro", [calc], "Be brief.", "system")
+
+    assert AgentCache.make_key("gemini-pro", [calc], "Be brief.", "system") == base
+    assert AgentCache.make_key("gpt-4", [calc], "Be brief.", "system") != base
+    assert AgentCache.make_key("gemini-pro", [], "Be brief.", "system") != base
+    assert AgentCache.make_key("gemini-pro", [calc], "Be verbose.", "system") != base
+    assert AgentCache.make_key("gemini-pro", [calc], "Be brief.", "user-key") != base
+    assert AgentCache.make_key("gemini-pro", [calc], "Be brief.", "system", "google") != base
+    # A re-registered tool with the same name is a different tool
+    assert AgentCache.make_key("gemini-pro", [_tool("Calculator")], "Be brief.", "system") != base
+
+def test_lru_eviction_and_stats():
+    cache = AgentCache(max_size=2)
+    cache.get_or_build("a", lambda: "agent-a")
+    cache.get_or_build("b", lambda: "agent-b")
+    cache.get_or_build("a", lambda: "rebuilt-a")
+    cache.get_or_build("c", lambda: "agent-c")
+
+    assert cache.get_or_build("a", lambda: "rebuilt-a") == "agent-a"
+    assert cache.get_or_build("b", lambda: "rebuilt-b") == "rebuilt-b"
+    stats = cache.stats()
+    assert stats["hits"] == 2
+    assert stats["evictions"] == 2
+
+def test_build_errors_are_not_cached():
+    cache = AgentCache()
+
+    def broken():
+        raise RuntimeError("no key")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_build("a", broken)
+    assert cache.get_or_build("a", lambda: "agent") == "agent"
@@ -1,6 +1,8 @@
+import asyncio
 import pytest
+from app.core.agent_cache import agent_cache
 from app.core.executor import GraphExecutor
-from unittest.mock import AsyncMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 @pytest.mark.asyncio
 async def test_topological_execution():
@@ -104,3 +106,311 @@ async def test_llm_node_integration():
         
         assert result["results"]["2"] == {"generated_text": "AI Response"}
         assert result["results"]["3"] == {"generated_text": "AI Response"}
+
+def _fan_out_graph(branches):
+    # input -> N parallel branches -> output
+    nodes = [{"id": "in", "type": "input", "data": {}}]
+    edges = []
+    for i in range(branches):
+        nodes.append({"id": f"b{i}", "type": "default", "data": {}})
+        edges.append({"source": "in", "target": f"b{i}"})
+        edges.append({"source": f"b{i}", "target": "out"})
+    nodes.append({"id": "out", "type": "output", "data": {}})
+    return nodes, edges
+
+@pytest.mark.asyncio
+async def test_independent_branches_run_concurrently():
+    nodes, edges = _fan_out_graph(4)
+    executor = GraphExecutor()
+    active = 0
+    peak = 0
+
+    async def slow_node(node_type, data, inputs, context, user_api_keys=None):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.05)
+        active -= 1
+        return {"type": node_type}
+
+    executor._process_node = slow_node
+    result = await executor.execute(nodes, edges)
+
+    assert peak == 4
+    assert [log["node_id"] for log in result["logs"]][0] == "in"
+    assert result["logs"][-1]["node_id"] == "out"
+    assert all(log["status"] == "success" for log in result["logs"])
+
+@pytest.mark.asyncio
+async def test_max_concurrency_caps_parallel_nodes():
+    nodes, edges = _fan_out_graph(4)
+    executor = GraphExecutor()
+    active = 0
+    peak = 0
+
+    async def slow_node(node_type, data, inputs, context, user_api_keys=None):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        return {}
+
+    executor._process_node = slow_node
+    result = await executor.execute(nodes, edges, max_concurrency=1)
+
+    assert peak == 1
+    assert [log["node_id"] for log in result["logs"]] == ["in", "b0", "b1", "b2", "b3", "out"]
+
+@pytest.mark.asyncio
+async def test_max_concurrency_must_be_positive():
+    executor = GraphExecutor()
+    with pytest.raises(ValueError, match="max_concurrency"):
+        await executor.execute([{"id": "A", "type": "input"}], [], max_concurrency=0)
+
+@pytest.mark.asyncio
+async def test_error_stops_dispatching_new_nodes():
+    nodes, edges = _fan_out_graph(2)
+    executor = GraphExecutor()
+
+    async def failing_node(node_type, data, inputs, context, user_api_keys=None):
+        if data.get("fail"):
+            raise RuntimeError("boom")
+        await asyncio.sleep(0.01)
+        return {}
+
+    nodes[1]["data"] = {"fail": True}
+    executor._process_node = failing_node
+    result = await executor.execute(nodes, edges)
+
+    statuses = {log["node_id"]: log["status"] for log in result["logs"]}
+    assert statuses["b0"] == "error"
+    # The sibling already in flight still completes, but the join node never starts
+    assert statuses["b1"] == "success"
+    assert "out" not in statuses
+
+@pytest.mark.asyncio
+async def test_stream_emits_node_events_then_summary():
+    nodes = [
+        {"id": "A", "type": "input", "data": {"value": "x"}},
+        {"id": "B", "type": "output", "data": {}}
+    ]
+    edges = [{"source": "A", "target": "B"}]
+
+    events = [event async for event in GraphExecutor().stream(nodes=nodes, edges=edges)]
+
+    assert [(e["event"], e.get("node_id")) for e in events] == [
+        ("node_started", "A"),
+        ("node_completed", "A"),
+        ("node_started", "B"),
+        ("node_completed", "B"),
+        ("execution_completed", None)
+    ]
+    assert events[1]["output"] == {"value": "x"}
+    assert events[1]["duration_ms"] >= 0
+    assert events[-1]["status"] == "success"
+    assert events[-1]["results"]["B"] == {"value": "x"}
+
+@pytest.mark.asyncio
+async def test_stream_reports_failures():
+    executor = GraphExecutor()
+    executor._process_node = AsyncMock(side_effect=RuntimeError("boom"))
+
+    events = [event async for event in executor.stream(nodes=[{"id": "A", "type": "llm"}], edges=[])]
+
+    assert events[1]["event"] == "node_failed"
+    assert events[1]["error"] == "boom"
+    assert events[-1]["event"] == "execution_completed"
+    assert events[-1]["status"] == "error"
+
+@pytest.mark.asyncio
+async def test_stream_reports_invalid_graph():
+    nodes = [{"id": "A"}, {"id": "B"}]
+    edges = [{"source": "A", "target": "B"}, {"source": "B", "target": "A"}]
+
+    events = [event async for event in GraphExecutor().stream(nodes=nodes, edges=edges)]
+
+    assert events == [{"event": "execution_failed", "error": "Workflow contains a cycle and cannot be executed."}]
+
+@pytest.mark.asyncio
+async def test_stream_forwards_llm_tokens():
+    nodes = [
+        {"id": "1", "type": "input", "data": {"prompt": "Hi"}},
+        {"id": "2", "type": "llm", "data": {"model": "gemini-pro"}}
+    ]
+    edges = [{"source": "1", "target": "2"}]
+
+    async def fake_stream_text(**kwargs):
+        for delta in ["AI ", "Response"]:
+            yield delta
+
+    with patch("app.core.executor.get_llm_service") as mock_get_service:
+        mock_service = MagicMock()
+        mock_service.stream_text = fake_stream_text
+        mock_get_service.return_value = mock_service
+
+        events = [e async for e in GraphExecutor().stream(nodes=nodes, edges=edges)]
+
+    tokens = [e["delta"] for e in events if e["event"] == "node_token"]
+    assert tokens == ["AI ", "Response"]
+    assert all(e["node_id"] == "2" for e in events if e["event"] == "node_token")
+    assert events[-1]["results"]["2"] == {"generated_text": "AI Response"}
+
+@pytest.fixture
+def clean_agent_cache():
+    # Agents are cached process-wide; keep mocked ones from leaking between tests
+    agent_cache.clear()
+    yield agent_cache
+    agent_cache.clear()
+
+@pytest.mark.asyncio
+async def test_stream_forwards_agent_steps(clean_agent_cache):
+    nodes = [{"id": "1", "type": "agent", "data": {"model": "gemini-pro", "tools": ["Calculator"]}}]
+
+    async def fake_events(agent_input, version, config=None):
+        chunk = MagicMock()
+        chunk.content = "Thought"
+        yield {"event": "on_chat_model_stream", "name": "llm", "parent_ids": ["root"], "data": {"chunk": chunk}}
+        yield {"event": "on_tool_start", "name": "Calculator", "parent_ids": ["root"], "data": {"input": "2+2"}}
+        yield {"event": "on_tool_end", "name": "Calculator", "parent_ids": ["root"], "data": {"output": "4"}}
+        yield {"event": "on_chain_end", "name": "AgentExecutor", "parent_ids": [], "data": {"output": {"output": "It is 4"}}}
+
+    with patch("app.core.executor.create_react_agent"), \
+         patch("app.core.executor.AgentExecutor") as mock_agent_executor, \
+         patch.object(GraphExecutor, "_initialize_llm"):
+        mock_agent_executor.return_value.model_copy.return_value = mock_agent_executor.return_value
+        mock_agent_executor.return_value.astream_events = fake_events
+        events = [e async for e in GraphExecutor().stream(nodes=nodes, edges=[])]
+
+    kinds = [e["event"] for e in events]
+    assert kinds == ["node_started", "node_token", "agent_action", "agent_step", "node_completed", "execution_completed"]
+    assert events[2]["tool_input"] == "2+2"
+    assert events[3]["observation"] == "4"
+    assert events[-1]["results"]["1"] == {"output": "It is 4", "generated_text": "It is 4"}
+
+def test_agent_backend_follows_sdk_fallback():
+    executor = GraphExecutor()
+    keys = {"openai": "sk-openai", "google": "g-key"}
+    assert executor._resolve_llm_backend("gpt-4o", keys) == ("openai", "gpt-4o", "sk-openai")
+    # Without the OpenAI SDK the agent runs on Gemini with the Google key, and is cached as such
+    with patch("app.core.executor._chat_model_class", return_value=None):
+        assert executor._resolve_llm_backend("gpt-4o", keys) == ("google", "gemini-1.5-pro", "g-key")
+    assert executor._resolve_llm_backend("unknown-model", keys) == ("google", "gemini-1.5-pro", "g-key")
+
+def test_initialize_llm_reuses_pooled_clients():
+    executor = GraphExecutor()
+    with patch("app.core.executor.ChatGoogleGenerativeAI", side_effect=lambda **kwargs: object()) as mock_gemini:
+        first = executor._initialize_llm("gemini-1.5-pro", {"google": "user-key"})
+        second = executor._initialize_llm("gemini-1.5-pro", {"google": "user-key"})
+        other = executor._initialize_llm("gemini-1.5-pro", {"google": "other-key"})
+
+    assert first is second
+    assert other is not first
+    assert mock_gemini.call_count == 2
+
+@pytest.mark.asyncio
+async def test_ready_llm_nodes_sharing_a_model_are_batched():
+    # input -> three LLM nodes; two share a model
+    nodes = [
+        {"id": "in", "type": "input", "data": {}},
+        {"id": "a", "type": "llm", "data": {"model": "gemini-pro", "prompt": "A"}},
+        {"id": "b", "type": "llm", "data": {"model": "gemini-pro", "prompt": "B"}},
+        {"id": "c", "type": "llm", "data": {"model": "gpt-4", "prompt": "C"}}
+    ]
+    edges = [{"source": "in", "target": n} for n in ("a", "b", "c")]
+
+    async def fake_batch(prompts, **kwargs):
+        return [f"{kwargs['model_name']}:{p}" for p in prompts]
+
+    with patch("app.core.executor.get_llm_service") as mock_get_service:
+        mock_service = MagicMock()
+        mock_service.generate_text_batch = AsyncMock(side_effect=fake_batch)
+        mock_get_service.return_value = mock_service
+
+        result = await GraphExecutor().execute(nodes, edges, batch_llm=True)
+
+    assert result["results"]["a"] == {"generated_text": "gemini-pro:A"}
+    assert result["results"]["b"] == {"generated_text": "gemini-pro:B"}
+    assert result["results"]["c"] == {"generated_text": "gpt-4:C"}
+    batched = sorted(len(call.kwargs["prompts"]) for call in mock_service.generate_text_batch.call_args_list)
+    assert batched == [1, 2]
+
+@pytest.mark.asyncio
+async def test_batched_node_failures_are_per_node():
+    nodes = [
+        {"id": "a", "type": "llm", "data": {"model": "gemini-pro", "prompt": "A", "batch": True}},
+        {"id": "b", "type": "llm", "data": {"model": "gemini-pro", "prompt": "B", "batch": True}}
+    ]
+
+    with patch("app.core.executor.get_llm_service") as mock_get_service:
+        mock_service = MagicMock()
+        mock_service.generate_text_batch = AsyncMock(return_value=["ok", RuntimeError("quota")])
+        mock_get_service.return_value = mock_service
+
+        result = await GraphExecutor().execute(nodes, [])
+
+    statuses = {log["node_id"]: log["status"] for log in result["logs"]}
+    assert statuses == {"a": "success", "b": "error"}
+    mock_service.generate_text_batch.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_agent_executors_are_reused_across_executions(clean_agent_cache):
+    nodes = [{"id": "1", "type": "agent", "data": {"model": "gemini-pro", "tools": ["Calculator"]}}]
+
+    with patch("app.core.executor.create_react_agent") as mock_create, \
+         patch("app.core.executor.AgentExecutor") as mock_agent_executor, \
+         patch.object(GraphExecutor, "_initialize_llm"):
+        mock_agent_executor.return_value.model_copy.return_value = mock_agent_executor.return_value
+        mock_agent_executor.return_value.ainvoke = AsyncMock(return_value={"output": "done"})
+        await GraphExecutor().execute(nodes, [], user_api_keys={"google": "key-a"})
+        result = await GraphExecutor().execute(nodes, [], user_api_keys={"google": "key-a"})
+        await GraphExecutor().execute(nodes, [], user_api_keys={"google": "key-b"})
+
+    assert result["results"]["1"]["output"] == "done"
+    # Second run hit the cache; a different key needs its own agent
+    assert mock_create.call_count == 2
+    assert clean_agent_cache.stats()["hits"] == 1
+    # The system prompt is bound into the template instead of passed per call
+    prompt = mock_create.call_args.args[2]
+    assert prompt.partial_variables["system_message"] == "You are a helpful AI assistant."
+    assert mock_agent_executor.call_args.kwargs["verbose"] is False
+
+@pytest.mark.asyncio
+async def test_agent_budget_returns_partial_answer_and_step_timing(clean_agent_cache):
+    import itertools
+    from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+    from langchain_core.messages import AIMessage
+
+    # A confused agent that never reaches a final answer
+    looping = GenericFakeChatModel(messages=itertools.repeat(
+        AIMessage(content="Thought: check again\nAction: Calculator\nAction Input: 6*7")
+    ))
+    nodes = [{"id": "1", "type": "agent", "data": {"model": "gemini-pro", "tools": ["Calculator"], "max_iterations": 2}}]
+
+    with patch.object(GraphExecutor, "_initialize_llm", return_value=looping):
+        result = await GraphExecutor().execute(nodes, [])
+
+    assert result["results"]["1"] == {"output": "42", "generated_text": "42", "partial": True}
+    agent_log = result["logs"][0]["agent"]
+    assert agent_log["budget_exhausted"] is True
+    assert agent_log["iterations"] == 2
+    assert [step["type"] for step in agent_log["steps"]] == ["llm", "tool", "llm", "tool"]
+    assert agent_log["llm_ms"] >= 0 and agent_log["tool_ms"] >= 0
+
+@pytest.mark.asyncio
+async def test_execution_deadline_stops_later_nodes():
+    nodes = [
+        {"id": "A", "type": "default", "data": {}},
+        {"id": "B", "type": "default", "data": {}}
+    ]
+    executor = GraphExecutor()
+
+    async def slow(*args, **kwargs):
+        await asyncio.sleep(0.05)
+        return "done"
+
+    executor._process_node = AsyncMock(side_effect=slow)
+    result = await executor.execute(nodes, [{"source": "A", "target": "B"}], timeout_seconds=0.01)
+
+    assert [log["status"] for log in result["logs"]] == ["success", "error"]
+    assert "deadline" in result["logs"][1]["error"]
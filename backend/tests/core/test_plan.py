@@ -0,0 +1,71 @@
+import pytest
+from app.core.plan import CompiledWorkflow
+from app.core.executor import GraphExecutor
+from unittest.mock import AsyncMock
+
+def test_compile_diamond():
+    # A -> B, A -> C, B -> D, C -> D
+    nodes = [{"id": n, "type": "default", "data": {}} for n in "ABCD"]
+    edges = [
+        {"source": "A", "target": "B"},
+        {"source": "A", "target": "C"},
+        {"source": "B", "target": "D"},
+        {"source": "C", "target": "D"}
+    ]
+
+    plan = CompiledWorkflow.from_canvas(nodes, edges)
+
+    assert plan.order == ("A", "B", "C", "D")
+    assert plan.roots == ("A",)
+    assert plan.parents["D"] == ("B", "C")
+    assert plan.children["A"] == ("B", "C")
+    assert len(plan) == 4
+
+def test_plan_is_immutable_and_detached_from_canvas():
+    nodes = [{"id": "A", "type": "llm", "data": {"model": "gpt-4", "tools": ["Calculator"]}}]
+    plan = CompiledWorkflow.from_canvas(nodes, [])
+
+    nodes[0]["data"]["model"] = "changed"
+    nodes[0]["data"]["tools"].append("Wikipedia")
+    assert plan.nodes["A"]["data"]["model"] == "gpt-4"
+    assert plan.nodes["A"]["data"]["tools"] == ["Calculator"]
+
+    with pytest.raises(TypeError):
+        plan.nodes["A"]["data"]["model"] = "changed"
+    with pytest.raises(TypeError):
+        plan.nodes["A"]["type"] = "agent"
+    with pytest.raises(TypeError):
+        plan.parents["A"] = ("B",)
+    with pytest.raises(AttributeError):
+        plan.order = ()
+
+def test_compile_rejects_cycle():
+    nodes = [{"id": "A"}, {"id": "B"}]
+    edges = [{"source": "A", "target": "B"}, {"source": "B", "target": "A"}]
+    with pytest.raises(ValueError, match="Workflow contains a cycle"):
+        CompiledWorkflow.from_canvas(nodes, edges)
+
+def test_compile_rejects_unknown_edge_endpoint():
+    with pytest.raises(ValueError, match="unknown node 'Z'"):
+        CompiledWorkflow.from_canvas([{"id": "A"}], [{"source": "A", "target": "Z"}])
+
+def test_compile_rejects_duplicate_and_missing_ids():
+    with pytest.raises(ValueError, match="duplicate node id"):
+        CompiledWorkflow.from_canvas([{"id": "A"}, {"id": "A"}], [])
+    with pytest.raises(ValueError, match="missing an 'id'"):
+        CompiledWorkflow.from_canvas([{"type": "input"}], [])
+
+@pytest.mark.asyncio
+async def test_execute_accepts_compiled_plan():
+    nodes = [
+        {"id": "A", "type": "input", "data": {"value": "x"}},
+        {"id": "B", "type": "output", "data": {}}
+    ]
+    plan = CompiledWorkflow.from_canvas(nodes, [{"source": "A", "target": "B"}])
+
+    executor = GraphExecutor()
+    first = await executor.execute(plan=plan)
+    second = await executor.execute(plan=plan, initial_inputs={"extra": 1})
+
+    assert first["results"]["B"] == {"value": "x"}
+    assert second["results"]["B"] == {"value": "x", "extra": 1}
@@ -0,0 +1,65 @@
+import pytest
+from unittest.mock import patch
+from app.core.plan_cache import PlanCache
+
+NODES = [{"id": "A", "type": "input", "data": {}}, {"id": "B", "type": "output", "data": {}}]
+EDGES = [{"source": "A", "target": "B"}]
+
+def test_hit_returns_same_plan():
+    cache = PlanCache()
+    first = cache.get_or_compile(NODES, EDGES, workflow_id="wf-1")
+    second = cache.get_or_compile(NODES, EDGES, workflow_id="wf-1")
+
+    assert first is second
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
+
+def test_content_hash_ignores_key_order():
+    reordered = [{"data": {}, "type": "input", "id": "A"}, {"id": "B", "type": "output", "data": {}}]
+    assert PlanCache.content_hash(NODES, EDGES) == PlanCache.content_hash(reordered, EDGES)
+    assert PlanCache.content_hash(NODES, EDGES) != PlanCache.content_hash(NODES, [])
+
+def test_lru_eviction():
+    cache = PlanCache(max_size=1)
+    first = cache.get_or_compile(NODES, EDGES)
+    cache.get_or_compile(NODES, [])
+    again = cache.get_or_compile(NODES, EDGES)
+
+    assert again is not first
+    assert cache.stats()["size"] == 1
+    assert cache.stats()["evictions"] == 2
+
+def test_ttl_expiry():
+    cache = PlanCache(ttl_seconds=10)
+    with patch("app.core.plan_cache.time.monotonic", return_value=100.0):
+        first = cache.get_or_compile(NODES, EDGES)
+    with patch("app.core.plan_cache.time.monotonic", return_value=111.0):
+        second = cache.get_or_compile(NODES, EDGES)
+
+    assert first is not second
+    assert cache.stats()["misses"] == 2
+
+def test_invalidate_by_workflow():
+    cache = PlanCache()
+    cache.get_or_compile(NODES, EDGES, workflow_id="wf-1")
+
+    assert cache.invalidate("wf-1") == 1
+    assert cache.invalidate("wf-1") == 0
+    assert cache.stats()["size"] == 0
+
+def test_invalid_graph_not_cached():
+    cache = PlanCache()
+    with pytest.raises(ValueError):
+        cache.get_or_compile([{"id": "A"}], [{"source": "A", "target": "A"}])
+    assert cache.stats()["size"] == 0
+
+def test_saved_workflow_hits_skip_hashing():
+    cache = PlanCache()
+    first = cache.get_or_compile(NODES, EDGES, workflow_id="wf-1", version="2024-01-01T00:00:00")
+    with patch.object(PlanCache, "content_hash", side_effect=AssertionError("hashed")):
+        assert cache.get_or_compile(NODES, EDGES, workflow_id="wf-1", version="2024-01-01T00:00:00") is first
+    # A new version (the workflow was saved again) compiles afresh
+    assert cache.get_or_compile(NODES, EDGES, workflow_id="wf-1", version="2024-01-02T00:00:00") is not first
+    assert cache.invalidate("wf-1") == 2
@@ -0,0 +1,60 @@
+import json
+import pytest
+from app.services.calculator import (
+    calculator_func, compile_expression, evaluate, evaluate_batch, normalize_expression
+)
+
+def test_scalar_results_match_previous_behaviour():
+    assert calculator_func("2 + 2") == "4"
+    assert calculator_func("7 / 2") == "3.5"
+    assert calculator_func("2 ** 10") == "1024"
+    assert calculator_func("sqrt(16) + abs(-1)") == "5.0"
+    assert "Error" in calculator_func("1 / 0")
+    assert "Error" in calculator_func("9 ** 9 ** 9")
+
+def test_compiled_expressions_are_cached_by_normalized_text():
+    compile_expression.cache_clear()
+    evaluate("1 +  2 * x", {"x": 3})
+    evaluate(" 1 + 2 *   x ", {"x": 4})
+
+    assert normalize_expression(" 1 + 2 *   x ") == "1 + 2 * x"
+    assert compile_expression.cache_info().hits == 1
+
+def test_batch_evaluates_over_variable_rows():
+    assert evaluate_batch("x * 2 + y", {"x": [1, 2, 3], "y": 1}) == [3, 5, 7]
+    assert evaluate_batch("max(x, y)", {"x": [1, 5], "y": [4, 2]}) == [4, 5]
+    # Division by zero yields null for that row instead of failing the batch
+    assert evaluate_batch("1 / x", {"x": [0, 2]}) == [None, 0.5]
+
+def test_batch_via_tool_input():
+    payload = json.dumps({"expression": "price * qty", "variables": {"price": [2.5, 4], "qty": [2, 3]}})
+    assert json.loads(calculator_func(payload)) == [5.0, 12.0]
+
+@pytest.mark.parametrize("expression", ["__import__('os')", "x.__class__", "(lambda: 1)()", "[1, 2][0]"])
+def test_batch_rejects_unsafe_syntax(expression):
+    with pytest.raises(ValueError):
+        evaluate_batch(expression, {"x": [1]})
+
+def test_batch_rejects_non_numeric_and_oversized_input(monkeypatch):
+    with pytest.raises(ValueError, match="numeric"):
+        evaluate_batch("x + 1", {"x": ["a", "b"]})
+    monkeypatch.setattr("app.services.calculator.MAX_BATCH_SIZE", 2)
+    with pytest.raises(ValueError, match="Batch larger"):
+        evaluate_batch("x + 1", {"x": [1, 2, 3]})
+
+@pytest.mark.parametrize("expression", [
+    "min(x, y, 3)", "max(x, y, -1)", "x // y", "x % y", "x ** y", "log(x, y)", "x / y", "(x // y) + 1",
+])
+def test_batch_rows_match_scalar_evaluation(expression):
+    xs = [7, -7, 2, 10, 8, 0, 5]
+    ys = [2, 3, 0, 20, 2, 4, -1]
+    batch = evaluate_batch(expression, {"x": xs, "y": ys})
+    for x, y, value in zip(xs, ys, batch):
+        try:
+            expected = evaluate(expression, {"x": x, "y": y})
+        except (ArithmeticError, ValueError):
+            expected = None
+        if expected is None:
+            assert value is None, (x, y)
+        else:
+            assert value == pytest.approx(expected), (x, y)
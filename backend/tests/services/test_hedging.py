@@ -0,0 +1,84 @@
+import asyncio
+import pytest
+from app.services.hedging import HedgedCaller, LatencyTracker
+
+def _caller_with_p95(model_name, seconds):
+    tracker = LatencyTracker(min_samples=5)
+    for _ in range(10):
+        tracker.record(model_name, seconds)
+    return HedgedCaller(tracker)
+
+def test_percentile_needs_min_samples():
+    tracker = LatencyTracker(min_samples=3)
+    tracker.record("m", 0.1)
+    assert tracker.percentile("m", 0.95) is None
+
+    for value in (0.2, 0.3, 0.4):
+        tracker.record("m", value)
+    assert tracker.percentile("m", 0.5) == 0.3
+    assert tracker.percentile("m", 0.95) == 0.4
+
+@pytest.mark.asyncio
+async def test_slow_primary_is_hedged_and_cancelled():
+    caller = _caller_with_p95("primary", 0.01)
+    cancelled = asyncio.Event()
+
+    async def slow():
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def fast():
+        return "backup"
+
+    assert await caller.call([("primary", slow), ("backup", fast)], hedge=True) == ("backup", "backup")
+    await asyncio.wait_for(cancelled.wait(), 1)
+    assert caller.stats()["hedges"] == 1
+    assert caller.stats()["backup_wins"] == 1
+
+@pytest.mark.asyncio
+async def test_no_hedge_without_opt_in():
+    caller = _caller_with_p95("primary", 0.001)
+
+    async def primary():
+        await asyncio.sleep(0.02)
+        return "primary"
+
+    async def backup():
+        raise AssertionError("backup should not run")
+
+    assert await caller.call([("primary", primary), ("backup", backup)]) == ("primary", "primary")
+    assert caller.stats()["hedges"] == 0
+
+@pytest.mark.asyncio
+async def test_errors_fail_over_in_order():
+    caller = HedgedCaller()
+
+    async def broken():
+        raise RuntimeError("provider down")
+
+    async def working():
+        return "ok"
+
+    assert await caller.call([("a", broken), ("b", broken), ("c", working)]) == ("c", "ok")
+    assert caller.stats()["failovers"] == 2
+
+    with pytest.raises(RuntimeError):
+        await caller.call([("a", broken), ("b", broken)])
+
+@pytest.mark.asyncio
+async def test_only_timed_calls_are_recorded():
+    caller = HedgedCaller(LatencyTracker(min_samples=1))
+
+    async def provider():
+        return "ok"
+
+    async def queued_then_called():
+        await asyncio.sleep(0.05)
+        return await caller.timed("m", provider)
+
+    assert await caller.call([("m", queued_then_called)]) == ("m", "ok")
+    assert caller.tracker.stats()["m"]["samples"] == 1
+    assert caller.tracker.percentile("m", 0.95) < 0.05
@@ -0,0 +1,200 @@
+import asyncio
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.db.database import Base
+from app.models import user, workflow, credential  # noqa: F401  (register related mappers)
+from app.models.execution_job import ExecutionJob
+from app.services.job_queue import JobQueue
+
+NODES = [
+    {"id": "A", "type": "input", "data": {"value": "x"}},
+    {"id": "B", "type": "output", "data": {}}
+]
+EDGES = [{"source": "A", "target": "B"}]
+
+@pytest.fixture
+def queue(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/jobs.db", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    yield JobQueue(session_factory=session_factory, num_workers=2, poll_interval=0.01, lease_seconds=60)
+    engine.dispose()
+
+def _enqueue(queue, **kwargs):
+    with queue.session_factory() as db:
+        return queue.enqueue(db, workflow_id="wf-1", user_id="user-1", nodes=NODES, edges=EDGES, **kwargs).id
+
+def _get(queue, job_id):
+    with queue.session_factory() as db:
+        return db.get(ExecutionJob, job_id)
+
+def test_claim_is_exclusive_and_fifo(queue):
+    first = _enqueue(queue)
+    second = _enqueue(queue)
+
+    assert queue.claim_next("w1") == first
+    assert queue.claim_next("w2") == second
+    assert queue.claim_next("w3") is None
+
+    job = _get(queue, first)
+    assert job.status == "running"
+    assert job.worker_id == "w1"
+    assert job.attempts == 1
+
+@pytest.mark.asyncio
+async def test_run_job_stores_results(queue):
+    job_id = _enqueue(queue, initial_inputs={"extra": 1})
+    queue.claim_next("w1")
+
+    await queue.run_job(job_id)
+
+    job = _get(queue, job_id)
+    assert job.status == "success"
+    assert job.results["B"] == {"value": "x", "extra": 1}
+    assert [log["node_id"] for log in job.logs] == ["A", "B"]
+    assert job.finished_at is not None
+
+@pytest.mark.asyncio
+async def test_run_job_records_failure(queue):
+    with queue.session_factory() as db:
+        job_id = queue.enqueue(db, workflow_id="wf-2", user_id="user-1", nodes=[{"id": "A"}], edges=[{"source": "A", "target": "A"}]).id
+
+    await queue.run_job(job_id)
+
+    job = _get(queue, job_id)
+    assert job.status == "error"
+    assert "cycle" in job.error
+
+def test_requeue_stale_running_jobs(queue):
+    job_id = _enqueue(queue)
+    queue.claim_next("w1")
+    queue._update(job_id, {ExecutionJob.heartbeat_at: datetime.utcnow() - timedelta(seconds=120)})
+
+    assert queue.requeue_stale() == 1
+    assert _get(queue, job_id).status == "queued"
+    assert queue.claim_next("w2") == job_id
+    assert _get(queue, job_id).attempts == 2
+
+@pytest.mark.asyncio
+async def test_workers_drain_queue(queue):
+    await queue.start()
+    try:
+        job_ids = [_enqueue(queue) for _ in range(3)]
+        for _ in range(200):
+            if all(_get(queue, job_id).status == "success" for job_id in job_ids):
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        await queue.stop()
+
+    assert all(_get(queue, job_id).status == "success" for job_id in job_ids)
+
+def test_concurrent_claims_never_share_a_job(queue):
+    import threading
+    job_ids = {_enqueue(queue) for _ in range(10)}
+    claims = []
+
+    def claim_all(worker_id):
+        while True:
+            try:
+                job_id = queue.claim_next(worker_id)
+            except Exception:
+                continue  # SQLite may report a lock under contention; retry
+            if job_id is None:
+                return
+            claims.append(job_id)
+
+    threads = [threading.Thread(target=claim_all, args=(f"w{i}",)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sorted(claims) == sorted(job_ids)
+
+@pytest.mark.asyncio
+async def test_aenqueue_through_async_session(queue, tmp_path):
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/jobs.db")
+    try:
+        async with async_sessionmaker(async_engine, expire_on_commit=False)() as db:
+            job = await queue.aenqueue(db, workflow_id="wf-3", user_id="user-1", nodes=NODES, edges=EDGES, timeout_seconds=5)
+    finally:
+        await async_engine.dispose()
+    # Visible to the sync workers sharing the database
+    assert queue.claim_next("w") == job.id
+    assert _get(queue, job.id).payload["timeout_seconds"] == 5
+
+@pytest.mark.asyncio
+async def test_worker_survives_failure_before_execution(queue, monkeypatch):
+    def flaky_keys(db, user_id):
+        if user_id == "broken-user":
+            raise RuntimeError("credential store unavailable")
+        return {}
+
+    monkeypatch.setattr("app.services.job_queue.get_user_api_keys", flaky_keys)
+    await queue.start()
+    try:
+        with queue.session_factory() as db:
+            failed = queue.enqueue(db, workflow_id="wf-1", user_id="broken-user", nodes=NODES, edges=EDGES).id
+        succeeded = _enqueue(queue)
+        for _ in range(200):
+            if _get(queue, succeeded).status == "success" and _get(queue, failed).status != "running":
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        await queue.stop()
+
+    assert _get(queue, failed).status == "error"
+    assert "credential store unavailable" in _get(queue, failed).error
+    assert _get(queue, succeeded).status == "success"
+
+@pytest.mark.asyncio
+async def test_workers_query_the_database_off_the_event_loop(queue, monkeypatch):
+    import threading
+    loop_thread = threading.current_thread()
+    threads = []
+    claim_next = queue.claim_next
+
+    def recording_claim(worker_id):
+        threads.append(threading.current_thread())
+        return claim_next(worker_id)
+
+    monkeypatch.setattr(queue, "claim_next", recording_claim)
+    await queue.start()
+    try:
+        for _ in range(100):
+            if threads:
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        await queue.stop()
+
+    assert threads and loop_thread not in threads
+
+def test_stale_job_fails_after_max_attempts(queue):
+    queue.max_attempts = 2
+    job_id = _enqueue(queue)
+    for attempt in range(2):
+        assert queue.claim_next(f"w{attempt}") == job_id
+        queue._update(job_id, {ExecutionJob.heartbeat_at: datetime.utcnow() - timedelta(seconds=120)})
+        queue.requeue_stale()
+
+    job = _get(queue, job_id)
+    assert job.status == "error"
+    assert "2 attempts" in job.error
+    assert queue.claim_next("w3") is None
+
+@pytest.mark.asyncio
+async def test_failed_node_marks_job_as_error(queue):
+    with queue.session_factory() as db:
+        job_id = queue.enqueue(db, workflow_id="wf-4", user_id="user-1", nodes=[{"id": "T", "type": "tool", "data": {}}], edges=[]).id
+
+    await queue.run_job(job_id)
+
+    job = _get(queue, job_id)
+    assert job.status == "error"
+    assert "missing 'tool'" in job.error
+    assert job.logs[0]["status"] == "error"
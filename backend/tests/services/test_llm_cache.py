@@ -0,0 +1,93 @@
+import pytest
+from unittest.mock import patch
+from app.services.llm_cache import (
+    CacheBackend, InMemoryCacheBackend, SQLiteCacheBackend, ResponseCache, create_response_cache
+)
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return InMemoryCacheBackend(max_entries=2)
+    return SQLiteCacheBackend(str(tmp_path / "cache.db"), max_entries=2)
+
+def test_backend_roundtrip_and_lru(backend):
+    backend.set("a", "1")
+    backend.set("b", "2")
+    assert backend.get("a") == "1"  # a becomes most recently used
+    backend.set("c", "3")           # evicts b
+
+    assert backend.get("b") is None
+    assert backend.get("a") == "1"
+    assert backend.get("c") == "3"
+    assert len(backend) == 2
+
+    backend.clear()
+    assert len(backend) == 0
+
+def test_backend_ttl(backend):
+    with patch("app.services.llm_cache.time.time", return_value=1000.0):
+        backend.set("a", "1", ttl_seconds=10)
+    with patch("app.services.llm_cache.time.time", return_value=1005.0):
+        assert backend.get("a") == "1"
+    with patch("app.services.llm_cache.time.time", return_value=1011.0):
+        assert backend.get("a") is None
+
+def test_sqlite_backend_persists(tmp_path):
+    path = str(tmp_path / "cache.db")
+    SQLiteCacheBackend(path).set("k", "v")
+    assert SQLiteCacheBackend(path).get("k") == "v"
+
+def test_cache_backend_is_abstract():
+    with pytest.raises(TypeError):
+        CacheBackend()
+
+def test_sqlite_backend_writes_without_counting(tmp_path):
+    backend = SQLiteCacheBackend(str(tmp_path / "cache.db"), max_entries=3, recount_every=100)
+    with patch.object(SQLiteCacheBackend, "_count", side_effect=AssertionError("counted")):
+        for i in range(10):
+            backend.set(f"k{i}", "v")
+        backend.set("k9", "updated")
+    assert len(backend) == 3
+    assert backend.get("k9") == "updated"
+    assert backend.get("k6") is None
+
+def test_sqlite_backend_recounts_entries_from_other_processes(tmp_path):
+    path = str(tmp_path / "cache.db")
+    backend = SQLiteCacheBackend(path, max_entries=3, recount_every=2)
+    other = SQLiteCacheBackend(path, max_entries=100)
+    for i in range(3):
+        other.set(f"other{i}", "v")
+    backend.set("a", "1")
+    backend.set("b", "2")  # recount finds 5 entries and trims to 3
+    assert len(backend) == 3
+
+def test_sqlite_backend_rejects_unsafe_table_name(tmp_path):
+    with pytest.raises(ValueError, match="table name"):
+        SQLiteCacheBackend(str(tmp_path / "cache.db"), table="cache; DROP TABLE users")
+
+def test_response_cache_stats_and_keys():
+    cache = ResponseCache(InMemoryCacheBackend())
+    key = ResponseCache.make_key("gpt-4", "sys", "hi", 0, "system")
+    assert key != ResponseCache.make_key("gpt-4", "sys", "hi", 0, "user-scope")
+    assert key != ResponseCache.make_key("gpt-4", None, "hi", 0, "system")
+
+    assert cache.get(key) is None
+    cache.set(key, "hello")
+    assert cache.get(key) == "hello"
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["entries"] == 1
+    assert stats["hit_rate"] == 0.5
+
+def test_create_response_cache_from_env(tmp_path, monkeypatch):
+    monkeypatch.setenv("LLM_CACHE_BACKEND", "off")
+    assert create_response_cache() is None
+
+    monkeypatch.setenv("LLM_CACHE_BACKEND", "sqlite")
+    monkeypatch.setenv("LLM_CACHE_PATH", str(tmp_path / "env.db"))
+    assert isinstance(create_response_cache().backend, SQLiteCacheBackend)
+
+    monkeypatch.setenv("LLM_CACHE_BACKEND", "memory")
+    assert isinstance(create_response_cache().backend, InMemoryCacheBackend)
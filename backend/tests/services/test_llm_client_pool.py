@@ -0,0 +1,48 @@
+from unittest.mock import MagicMock, patch
+from app.services.llm_client_pool import LLMClientPool, key_fingerprint
+
+def test_reuses_client_for_same_configuration():
+    pool = LLMClientPool()
+    factory = MagicMock(side_effect=lambda: object())
+
+    first = pool.get("openai", "gpt-4", "sk-1", 0.7, factory)
+    second = pool.get("openai", "gpt-4", "sk-1", 0.7, factory)
+    other_key = pool.get("openai", "gpt-4", "sk-2", 0.7, factory)
+    other_temp = pool.get("openai", "gpt-4", "sk-1", 0.0, factory)
+
+    assert first is second
+    assert other_key is not first
+    assert other_temp is not first
+    assert factory.call_count == 3
+    assert pool.stats()["hits"] == 1
+    assert pool.stats()["misses"] == 3
+
+def test_keys_are_not_stored_in_plain_text():
+    key = LLMClientPool.make_key("openai", "gpt-4", "sk-secret", 0)
+    assert "sk-secret" not in key
+    assert key[2] == key_fingerprint("sk-secret")
+    assert key_fingerprint(None) == "system"
+
+def test_lru_eviction():
+    pool = LLMClientPool(max_size=2)
+    a = pool.get("google", "a", None, 0, object)
+    pool.get("google", "b", None, 0, object)
+    pool.get("google", "a", None, 0, object)  # a becomes most recent
+    pool.get("google", "c", None, 0, object)  # evicts b
+
+    assert pool.get("google", "a", None, 0, object) is a
+    assert pool.stats()["evictions"] == 1
+    assert pool.stats()["size"] == 2
+
+def test_idle_eviction():
+    pool = LLMClientPool(idle_ttl_seconds=10)
+    with patch("app.services.llm_client_pool.time.monotonic", return_value=0.0):
+        first = pool.get("google", "a", None, 0, object)
+    with patch("app.services.llm_client_pool.time.monotonic", return_value=5.0):
+        pool.get("google", "b", None, 0, object)
+    with patch("app.services.llm_client_pool.time.monotonic", return_value=12.0):
+        assert pool.evict_idle() == 1
+        assert pool.get("google", "b", None, 0, object) is not None
+        assert pool.get("google", "a", None, 0, object) is not first
+
+    assert pool.stats()["idle_evictions"] == 1
@@ -1,5 +1,6 @@
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
+from app.services.llm_client_pool import key_fingerprint
 from app.services.llm_service import LLMService
 
 @pytest.fixture
@@ -64,3 +65,229 @@ async def test_generate_text_fallback(mock_llm_service):
     
     with pytest.raises(ValueError, match="Model non-existent-model not available"):
         await service.generate_text(prompt="Hi", model_name="non-existent-model")
+
+@pytest.mark.asyncio
+async def test_stream_text_yields_deltas(mock_llm_service):
+    service, _, _, _ = mock_llm_service
+
+    async def fake_astream(messages):
+        for content in ["Hel", "", "lo", [{"type": "text", "text": "!"}]]:
+            chunk = MagicMock()
+            chunk.content = content
+            yield chunk
+
+    service._models["gemini-pro"].astream = fake_astream
+
+    deltas = [d async for d in service.stream_text(prompt="Hi", system_prompt="Be brief", model_name="gemini-pro")]
+
+    assert deltas == ["Hel", "lo", "!"]
+
+@pytest.mark.asyncio
+async def test_stream_text_unknown_model(mock_llm_service):
+    service, _, _, _ = mock_llm_service
+    with pytest.raises(ValueError, match="not available"):
+        async for _ in service.stream_text(prompt="Hi", model_name="non-existent-model"):
+            pass
+
+@pytest.mark.asyncio
+async def test_user_key_clients_are_pooled(mock_llm_service):
+    service, _, mock_openai, _ = mock_llm_service
+    mock_response = MagicMock()
+    mock_response.content = "pooled"
+    mock_openai.return_value.ainvoke = AsyncMock(return_value=mock_response)
+    mock_openai.reset_mock()
+
+    await service.generate_text(prompt="Hi", model_name="gpt-4o", api_key="sk-user", temperature=0.2)
+    await service.generate_text(prompt="Again", model_name="gpt-4o", api_key="sk-user", temperature=0.2)
+
+    assert mock_openai.call_count == 1
+    assert service.client_pool.stats()["hits"] == 1
+
+@pytest.mark.asyncio
+async def test_deterministic_calls_are_cached(mock_llm_service):
+    service, _, _, _ = mock_llm_service
+    mock_response = MagicMock()
+    mock_response.content = "cached answer"
+    service._models["gemini-pro"].ainvoke = AsyncMock(return_value=mock_response)
+
+    first = await service.generate_text(prompt="Classify", model_name="gemini-pro", temperature=0)
+    second = await service.generate_text(prompt="Classify", model_name="gemini-pro", temperature=0)
+    # Non-zero temperature is not cached unless the node opts in
+    await service.generate_text(prompt="Classify", model_name="gemini-pro", temperature=0.7)
+    await service.generate_text(prompt="Classify", model_name="gemini-pro", temperature=0.7, cache=True)
+    await service.generate_text(prompt="Classify", model_name="gemini-pro", temperature=0.7, cache=True)
+    # Opting out always calls the provider
+    await service.generate_text(prompt="Classify", model_name="gemini-pro", temperature=0, cache=False)
+
+    assert first == second == "cached answer"
+    assert service._models["gemini-pro"].ainvoke.call_count == 4
+    assert service.response_cache.stats()["hits"] == 2
+
+@pytest.mark.asyncio
+async def test_stream_text_uses_response_cache(mock_llm_service):
+    service, _, _, _ = mock_llm_service
+    calls = 0
+
+    async def fake_astream(messages):
+        nonlocal calls
+        calls += 1
+        for content in ["a", "b"]:
+            chunk = MagicMock()
+            chunk.content = content
+            yield chunk
+
+    service._models["gemini-pro"].astream = fake_astream
+
+    first = [d async for d in service.stream_text(prompt="Hi", model_name="gemini-pro", temperature=0)]
+    second = [d async for d in service.stream_text(prompt="Hi", model_name="gemini-pro", temperature=0)]
+
+    assert first == ["a", "b"]
+    assert second == ["ab"]
+    assert calls == 1
+
+@pytest.mark.asyncio
+async def test_semantic_cache_serves_near_duplicates(mock_llm_service):
+    from app.services.semantic_cache import SemanticCache
+    service, _, _, _ = mock_llm_service
+    service.semantic_cache = SemanticCache(threshold=0.9)
+    mock_response = MagicMock()
+    mock_response.content = "Paris"
+    service._models["gemini-pro"].ainvoke = AsyncMock(return_value=mock_response)
+
+    first = await service.generate_text(prompt="What is the capital of France?", model_name="gemini-pro",
+                                        semantic_cache=True, cache_namespace="wf-1")
+    second = await service.generate_text(prompt="What is the capital of France ?", model_name="gemini-pro",
+                                         semantic_cache=True, cache_namespace="wf-1")
+    # Other workflows and callers that didn't opt in go to the provider
+    await service.generate_text(prompt="What is the capital of France?", model_name="gemini-pro",
+                                semantic_cache=True, cache_namespace="wf-2")
+    await service.generate_text(prompt="What is the capital of France?", model_name="gemini-pro")
+
+    assert first == second == "Paris"
+    assert service._models["gemini-pro"].ainvoke.call_count == 3
+    assert service.semantic_cache.stats()["hits"] == 1
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_requests_share_one_call(mock_llm_service):
+    import asyncio
+    service, _, _, _ = mock_llm_service
+    mock_response = MagicMock()
+    mock_response.content = "shared"
+
+    async def slow_invoke(messages):
+        await asyncio.sleep(0.01)
+        return mock_response
+
+    service._models["gemini-pro"].ainvoke = AsyncMock(side_effect=slow_invoke)
+
+    results = await asyncio.gather(*[
+        service.generate_text(prompt="Same prompt", model_name="gemini-pro", temperature=0.7)
+        for _ in range(3)
+    ])
+
+    assert results == ["shared"] * 3
+    assert service._models["gemini-pro"].ainvoke.call_count == 1
+    assert service.singleflight.stats()["collapsed"] == 2
+
+@pytest.mark.asyncio
+async def test_requests_with_different_fallbacks_or_hedging_are_not_shared(mock_llm_service):
+    import asyncio
+    service, _, _, _ = mock_llm_service
+    mock_response = MagicMock()
+    mock_response.content = "from gpt"
+
+    async def failing_invoke(messages):
+        await asyncio.sleep(0.01)
+        raise RuntimeError("gemini down")
+
+    service._models["gemini-pro"].ainvoke = AsyncMock(side_effect=failing_invoke)
+    service._models["gpt-4"].ainvoke = AsyncMock(return_value=mock_response)
+
+    without_fallback, with_fallback, hedged = await asyncio.gather(
+        service.generate_text(prompt="Same prompt", model_name="gemini-pro", fallback_models=[]),
+        service.generate_text(prompt="Same prompt", model_name="gemini-pro", fallback_models=["gpt-4"]),
+        service.generate_text(prompt="Same prompt", model_name="gemini-pro", fallback_models=["gpt-4"], hedge=True),
+        return_exceptions=True
+    )
+
+    assert isinstance(without_fallback, RuntimeError)
+    assert with_fallback == hedged == "from gpt"
+    assert service._models["gemini-pro"].ainvoke.call_count == 3
+    assert service.singleflight.stats()["collapsed"] == 0
+
+@pytest.mark.asyncio
+async def test_rate_limited_calls_are_retried(mock_llm_service):
+    service, _, _, _ = mock_llm_service
+    service.rate_limiter.base_delay = 0.001
+    rate_limited = Exception("429 Too Many Requests")
+    rate_limited.status_code = 429
+    mock_response = MagicMock()
+    mock_response.content = "after retry"
+    service._models["gemini-pro"].ainvoke = AsyncMock(side_effect=[rate_limited, mock_response])
+
+    result = await service.generate_text(prompt="Hi", model_name="gemini-pro")
+
+    assert result == "after retry"
+    assert service.rate_limiter.stats()["retries"] == 1
+
+@pytest.mark.asyncio
+async def test_rate_limit_waits_are_not_recorded_as_latency(mock_llm_service):
+    service, _, _, _ = mock_llm_service
+    mock_response = MagicMock()
+    mock_response.content = "ok"
+    service._models["gemini-pro"].ainvoke = AsyncMock(return_value=mock_response)
+    provider = service.router.provider_for("gemini-pro")
+    service.rate_limiter.limiter(provider, key_fingerprint(None)).block_for(0.1)
+    service.hedger.tracker.min_samples = 1
+
+    assert await service.generate_text(prompt="Hi", model_name="gemini-pro") == "ok"
+
+    assert service.rate_limiter.stats()["queue_wait_seconds"] >= 0.05
+    assert service.hedger.tracker.stats()["gemini-pro"]["samples"] == 1
+    assert service.hedger.tracker.percentile("gemini-pro", 0.5) < 0.05
+
+@pytest.mark.asyncio
+async def test_failover_to_fallback_model(mock_llm_service):
+    service, _, _, _ = mock_llm_service
+    mock_response = MagicMock()
+    mock_response.content = "from gpt"
+    service._models["gemini-pro"].ainvoke = AsyncMock(side_effect=RuntimeError("gemini down"))
+    service._models["gpt-4"].ainvoke = AsyncMock(return_value=mock_response)
+
+    result = await service.generate_text(prompt="Hi", model_name="gemini-pro", temperature=0, fallback_models=["gpt-4"])
+
+    assert result == "from gpt"
+    assert service.hedger.stats()["failovers"] == 1
+    # Answers from a substitute model aren't cached under the requested model
+    assert service.response_cache.stats()["stores"] == 0
+
+@pytest.mark.asyncio
+async def test_generate_text_batch_uses_abatch_and_cache(mock_llm_service):
+    service, _, _, _ = mock_llm_service
+    llm = service._models["gemini-pro"]
+
+    async def fake_abatch(inputs, config=None, return_exceptions=False):
+        return [MagicMock(content=f"echo {messages[-1].content}") for messages in inputs]
+
+    llm.abatch = AsyncMock(side_effect=fake_abatch)
+
+    first = await service.generate_text_batch(["a", "b", "c"], model_name="gemini-pro", temperature=0, max_concurrency=2)
+    second = await service.generate_text_batch(["a", "d"], model_name="gemini-pro", temperature=0)
+
+    assert first == ["echo a", "echo b", "echo c"]
+    assert second == ["echo a", "echo d"]
+    assert llm.abatch.call_args_list[0].kwargs["config"] == {"max_concurrency": 2}
+    # "a" was served from the cache, so the second batch only sent "d"
+    assert len(llm.abatch.call_args_list[1].args[0]) == 1
+
+@pytest.mark.asyncio
+async def test_generate_text_batch_reports_item_errors(mock_llm_service):
+    service, _, _, _ = mock_llm_service
+    service._models["gemini-pro"].abatch = AsyncMock(return_value=[MagicMock(content="ok"), RuntimeError("bad")])
+
+    results = await service.generate_text_batch(["a", "b"], model_name="gemini-pro", return_exceptions=True)
+    assert results[0] == "ok"
+    assert isinstance(results[1], RuntimeError)
+
+    with pytest.raises(RuntimeError):
+        await service.generate_text_batch(["a", "b"], model_name="gemini-pro")
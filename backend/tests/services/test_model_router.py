@@ -0,0 +1,34 @@
+from app.services.model_router import ModelRouter, create_model_router
+
+def test_default_routes():
+    router = ModelRouter()
+
+    assert router.provider_for("gpt-4o") == "openai"
+    assert router.provider_for("o1-mini") == "openai"
+    assert router.provider_for("gemini-1.5-flash") == "google"
+    assert router.provider_for("claude-3-5-sonnet-latest") == "anthropic"
+    assert router.provider_for("llama-3") is None
+
+def test_exact_routes_win_over_prefixes():
+    router = ModelRouter()
+    router.add_route("gpt-oss-proxy", "anthropic")
+    router.add_route("mistral-*", "openai")
+
+    assert router.provider_for("gpt-oss-proxy") == "anthropic"
+    assert router.provider_for("gpt-oss-20b") == "openai"
+    assert router.provider_for("mistral-large") == "openai"
+
+def test_candidates_include_fallbacks_once():
+    router = ModelRouter(fallbacks={"gpt-4o": ["claude-3-5-sonnet-latest", "gpt-4o"]})
+
+    assert router.candidates("gpt-4o") == [("gpt-4o", "openai"), ("claude-3-5-sonnet-latest", "anthropic")]
+    assert router.candidates("gpt-4o", fallback_models=[]) == [("gpt-4o", "openai")]
+
+def test_router_reads_env(monkeypatch):
+    monkeypatch.setenv("LLM_MODEL_ROUTES", '{"my-proxy-*": "openai"}')
+    monkeypatch.setenv("LLM_FALLBACKS", '{"gpt-4o": ["gemini-1.5-pro"]}')
+
+    router = create_model_router()
+
+    assert router.provider_for("my-proxy-large") == "openai"
+    assert router.fallbacks_for("gpt-4o") == ["gemini-1.5-pro"]
@@ -0,0 +1,19 @@
+import pytest
+
+from app.services.providers import load_chat_model_class, prewarm
+
+
+def test_load_chat_model_class():
+    from langchain_openai import ChatOpenAI
+    assert load_chat_model_class("ChatOpenAI") is ChatOpenAI
+    with pytest.raises(ValueError):
+        load_chat_model_class("ChatUnknown")
+
+
+def test_prewarm_reports_each_step():
+    timings = prewarm(providers=["openai", "unknown", ""])
+    assert "unknown" not in timings
+    for step in ("openai", "app.core.executor", "llm_service", "tool:Calculator"):
+        assert timings[step] >= 0
+    from app.services.tool_service import tool_service
+    assert tool_service.tool_metrics()["Calculator"]["loaded"]
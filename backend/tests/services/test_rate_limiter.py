@@ -0,0 +1,89 @@
+import asyncio
+import time
+from types import SimpleNamespace
+import pytest
+from app.services.rate_limiter import (
+    RateLimitScheduler, TokenBucket, create_rate_limiter, is_rate_limit_error, retry_after_seconds
+)
+
+class RateLimitError(Exception):
+    def __init__(self, retry_after=None):
+        super().__init__("429 Too Many Requests")
+        self.status_code = 429
+        self.response = SimpleNamespace(status_code=429, headers={"retry-after": retry_after} if retry_after else {})
+
+@pytest.mark.asyncio
+async def test_token_bucket_waits_when_empty():
+    bucket = TokenBucket(rate_per_minute=600, capacity=1)  # 10 tokens/s
+
+    assert await bucket.acquire() == 0
+    waited = await bucket.acquire()
+    assert 0.05 < waited <= 0.2
+
+@pytest.mark.asyncio
+async def test_concurrency_limit_is_enforced():
+    scheduler = RateLimitScheduler(limits={"openai": {"max_concurrency": 2}})
+    running = peak = 0
+
+    async def call():
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return "ok"
+
+    await asyncio.gather(*[scheduler.run("openai", "k", call) for _ in range(6)])
+    assert peak == 2
+    assert scheduler.stats()["calls"] == 6
+
+@pytest.mark.asyncio
+async def test_rate_limit_errors_are_retried_honouring_retry_after():
+    scheduler = RateLimitScheduler(max_retries=2)
+    attempts = 0
+
+    async def call():
+        nonlocal attempts
+        attempts += 1
+        if attempts == 1:
+            raise RateLimitError(retry_after="0.05")
+        return "ok"
+
+    started = time.monotonic()
+    assert await scheduler.run("openai", "k", call) == "ok"
+    assert time.monotonic() - started >= 0.05
+    assert scheduler.stats()["retries"] == 1
+
+@pytest.mark.asyncio
+async def test_gives_up_after_max_retries_and_skips_other_errors():
+    scheduler = RateLimitScheduler(max_retries=1, base_delay=0.001)
+
+    async def limited():
+        raise RateLimitError()
+
+    async def broken():
+        raise ValueError("bad request")
+
+    with pytest.raises(RateLimitError):
+        await scheduler.run("google", "k", limited)
+    with pytest.raises(ValueError):
+        await scheduler.run("google", "k", broken)
+    assert scheduler.stats()["retries"] == 1
+
+def test_error_classification():
+    assert is_rate_limit_error(RateLimitError())
+    assert not is_rate_limit_error(RuntimeError("boom"))
+    assert retry_after_seconds(RateLimitError(retry_after="3")) == 3.0
+    assert retry_after_seconds(RateLimitError()) is None
+
+def test_limits_are_read_from_env(monkeypatch):
+    monkeypatch.setenv("LLM_OPENAI_RPM", "60")
+    monkeypatch.setenv("LLM_OPENAI_MAX_CONCURRENCY", "4")
+
+    scheduler = create_rate_limiter()
+    limiter = scheduler.limiter("openai", "k")
+
+    assert limiter.requests.capacity == 60
+    assert limiter.tokens is None
+    assert limiter.max_concurrency == 4
+    assert scheduler.limiter("google", "k").requests is None
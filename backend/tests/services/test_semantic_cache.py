@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+from app.services.semantic_cache import HashedNgramEmbedder, SemanticCache, VectorIndex, create_semantic_cache
+
+def test_embedder_is_normalised_and_deterministic():
+    embed = HashedNgramEmbedder(dim=256)
+    a = embed("What is the capital of France?")
+    assert a.shape == (256,)
+    assert np.isclose(np.linalg.norm(a), 1.0)
+    assert np.array_equal(a, embed("what is the   capital of france?"))
+    assert np.isfinite(embed("")).all()
+
+def test_embedder_similarity_orders_near_duplicates():
+    embed = HashedNgramEmbedder()
+    base = embed("Summarize the quarterly sales report for Q3")
+    near = embed("Summarize the quarterly sales report for Q3 please")
+    far = embed("Translate this sentence into German")
+    assert base @ near > 0.9
+    assert base @ far < base @ near
+
+def test_vector_index_evicts_least_recently_used():
+    index = VectorIndex(dim=2, capacity=2)
+    index.add(np.array([1, 0], dtype=np.float32), "x")
+    index.add(np.array([0, 1], dtype=np.float32), "y")
+    assert index.search(np.array([1, 0], dtype=np.float32)) == ("x", 1.0)
+    index.add(np.array([0.6, 0.8], dtype=np.float32), "z")  # replaces y
+
+    value, _ = index.search(np.array([0, 1], dtype=np.float32))
+    assert value == "z"
+    assert index.size == 2
+
+def test_semantic_cache_threshold_and_scopes():
+    cache = SemanticCache(threshold=0.9)
+    scope = SemanticCache.make_scope("wf-1", "gpt-4", "sys", 0, "system")
+    other_scope = SemanticCache.make_scope("wf-2", "gpt-4", "sys", 0, "system")
+
+    cache.store(scope, "Summarize the quarterly sales report for Q3", "Sales grew 4%.")
+
+    assert cache.lookup(scope, "Summarize the quarterly sales report for Q3 please") == "Sales grew 4%."
+    assert cache.lookup(scope, "Write a poem about the sea") is None
+    assert cache.lookup(other_scope, "Summarize the quarterly sales report for Q3") is None
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+    assert stats["scopes"] == 1
+
+def test_semantic_cache_scope_eviction():
+    cache = SemanticCache(max_scopes=1)
+    cache.store("a", "hello world", "1")
+    cache.store("b", "hello world", "2")
+    assert cache.lookup("a", "hello world") is None
+    assert cache.lookup("b", "hello world") == "2"
+
+def test_custom_embedder_from_env(monkeypatch):
+    monkeypatch.setenv("SEMANTIC_CACHE_ENABLED", "true")
+    monkeypatch.setenv("SEMANTIC_CACHE_EMBEDDER", "app.services.semantic_cache:HashedNgramEmbedder")
+    monkeypatch.setenv("SEMANTIC_CACHE_THRESHOLD", "0.8")
+    cache = create_semantic_cache()
+    assert isinstance(cache.embedder, HashedNgramEmbedder)
+    assert cache.threshold == 0.8
+
+    monkeypatch.setenv("SEMANTIC_CACHE_ENABLED", "false")
+    assert create_semantic_cache() is None
+
+def test_near_duplicates_with_different_answers_miss():
+    # Even with a loose threshold, prompts differing in numbers or negation never share an answer
+    cache = SemanticCache(threshold=0.8)
+    cache.store("s", "What is 12 * 7?", "84")
+    cache.store("t", "Is Paris the capital of France?", "Yes")
+
+    assert cache.lookup("s", "What is 12 * 8?") is None
+    assert cache.lookup("s", "what is 12 * 7") == "84"
+    assert cache.lookup("t", "Is Paris not the capital of France?") is None
+    assert SemanticCache().lookup("s", "What is 12 * 7?") is None
+
+def test_unnormalised_embedder_scores_as_cosine():
+    cache = SemanticCache(embedder=lambda text: np.array([len(text), 1.0]) * 100, threshold=0.99)
+    cache.store("s", "abc", "stored")
+    assert cache.lookup("s", "abd") == "stored"
+    assert cache.lookup("s", "a") is None
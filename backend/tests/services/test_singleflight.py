@@ -0,0 +1,83 @@
+import asyncio
+import pytest
+from app.services.singleflight import SingleFlight, request_key
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_calls_are_collapsed():
+    flight = SingleFlight()
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "result"
+
+    results = await asyncio.gather(*[flight.do("k", fetch) for _ in range(5)])
+
+    assert results == ["result"] * 5
+    assert calls == 1
+    assert flight.stats() == {"calls": 5, "executions": 1, "collapsed": 4, "in_flight": 0}
+
+@pytest.mark.asyncio
+async def test_sequential_calls_are_not_collapsed():
+    flight = SingleFlight()
+
+    async def fetch():
+        return object()
+
+    assert await flight.do("k", fetch) is not await flight.do("k", fetch)
+    assert flight.stats()["executions"] == 2
+
+@pytest.mark.asyncio
+async def test_exceptions_are_shared():
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("provider down")
+
+    results = await asyncio.gather(flight.do("k", fail), flight.do("k", fail), return_exceptions=True)
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert flight.stats()["executions"] == 1
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_cancel_others():
+    flight = SingleFlight()
+    started = asyncio.Event()
+
+    async def fetch():
+        started.set()
+        await asyncio.sleep(0.05)
+        return "ok"
+
+    first = asyncio.create_task(flight.do("k", fetch))
+    second = asyncio.create_task(flight.do("k", fetch))
+    await started.wait()
+    first.cancel()
+
+    assert await second == "ok"
+    with pytest.raises(asyncio.CancelledError):
+        await first
+
+@pytest.mark.asyncio
+async def test_underlying_call_cancelled_when_all_waiters_leave():
+    flight = SingleFlight()
+    cancelled = asyncio.Event()
+
+    async def fetch():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    waiter = asyncio.create_task(flight.do("k", fetch))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    await asyncio.wait_for(cancelled.wait(), timeout=1)
+    assert flight.stats()["in_flight"] == 0
+
+def test_request_key():
+    assert request_key("gpt-4", [("human", "hi")], 0) == request_key("gpt-4", [("human", "hi")], 0)
+    assert request_key("gpt-4", [("human", "hi")], 0) != request_key("gpt-4", [("human", "hi")], 0.5)
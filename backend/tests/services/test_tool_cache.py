@@ -0,0 +1,97 @@
+import time
+import pytest
+from langchain_core.tools import Tool
+from app.services.llm_cache import SQLiteCacheBackend
+from app.services.tool_cache import ToolFailure, ToolResultCache, create_tool_cache
+from app.services.tool_service import ToolService
+
+def test_lru_respects_entry_and_byte_limits():
+    cache = ToolResultCache(max_entries=10, max_bytes=300)
+    cache.set("T", "a", "x" * 60)
+    cache.set("T", "b", "y" * 60)
+    cache.get("T", "a")
+    cache.set("T", "c", "z" * 60)
+
+    # Keys count too (64 bytes each): the third entry pushes the total past 300 and evicts "b"
+    assert cache.get("T", "b") is None
+    assert cache.get("T", "a") == "x" * 60
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["bytes"] <= 300
+    assert stats["evictions"] == 1
+
+    # Values that could never fit are not stored
+    cache.set("T", "huge", "h" * 500)
+    assert cache.get("T", "huge") is None
+
+def test_entries_expire():
+    cache = ToolResultCache()
+    cache.set("T", "q", "answer", ttl_seconds=0.01)
+    time.sleep(0.02)
+    assert cache.get("T", "q") is None
+
+def test_sqlite_store_is_shared_and_promoted(tmp_path):
+    path = str(tmp_path / "tools.db")
+    ToolResultCache(store=SQLiteCacheBackend(path, table="tool_result_cache")).set("Wikipedia", "Paris", "Capital of France")
+
+    fresh = ToolResultCache(store=SQLiteCacheBackend(path, table="tool_result_cache"))
+    assert fresh.get("Wikipedia", "Paris") == "Capital of France"
+    assert fresh.get("Wikipedia", "Paris") == "Capital of France"
+    assert fresh.stats()["store_hits"] == 1
+    assert fresh.stats()["hits"] == 1
+
+def test_cache_backend_from_env(monkeypatch, tmp_path):
+    monkeypatch.setenv("TOOL_CACHE_BACKEND", "off")
+    assert create_tool_cache() is None
+
+    monkeypatch.setenv("TOOL_CACHE_BACKEND", "sqlite")
+    monkeypatch.setenv("TOOL_CACHE_PATH", str(tmp_path / "tools.db"))
+    assert isinstance(create_tool_cache().store, SQLiteCacheBackend)
+
+@pytest.mark.asyncio
+async def test_tool_service_caches_only_cacheable_successes():
+    service = ToolService()
+    calls = {"Pure": 0, "Impure": 0, "Flaky": 0}
+
+    def make(name, fail=False):
+        def run(query):
+            calls[name] += 1
+            if fail:
+                raise RuntimeError("down")
+            return f"{name}:{query}"
+        return Tool(name=name, func=run, description=name)
+
+    service.register_tool(make("Pure"), cacheable=True)
+    service.register_tool(make("Impure"))
+    service.register_tool(make("Flaky", fail=True), cacheable=True)
+
+    for _ in range(2):
+        assert service.execute_tool("Pure", "q") == "Pure:q"
+        assert await service.aexecute_tool("Pure", "q") == "Pure:q"
+        service.execute_tool("Impure", "q")
+        await service.aexecute_tool("Flaky", "q")
+
+    assert calls == {"Pure": 1, "Impure": 2, "Flaky": 2}
+
+@pytest.mark.asyncio
+async def test_reported_failures_are_not_cached():
+    service = ToolService()
+    outcomes = [ToolFailure("Error: upstream down"), "ok"]
+    service.register_tool(Tool(name="Lookup", func=lambda query: outcomes.pop(0), description="Lookup"), cacheable=True)
+
+    assert service.execute_tool("Lookup", "q") == "Error: upstream down"
+    assert await service.aexecute_tool("Lookup", "q") == "ok"
+    assert service.execute_tool("Lookup", "q") == "ok"
+
+    # Calculator errors are plain text to agents but flagged as failures
+    assert service.execute_tool("Calculator", "1 / 0").startswith("Error calculating")
+    assert service._cached_result("Calculator", "1 / 0") is None
+    assert service.execute_tool("Calculator", "2 + 2") == "4"
+    assert service._cached_result("Calculator", "2 + 2") == "4"
+
+def test_local_wikipedia_answers_expire(monkeypatch, tmp_path):
+    index_path = tmp_path / "wikipedia.db"
+    index_path.touch()
+    monkeypatch.setenv("WIKIPEDIA_INDEX_PATH", str(index_path))
+    monkeypatch.setenv("WIKIPEDIA_INDEX_CACHE_TTL", "120")
+    assert ToolService(discover_plugins=False)._policies["Wikipedia"].cache_ttl == 120
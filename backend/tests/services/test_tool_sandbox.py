@@ -0,0 +1,270 @@
+import os
+import signal
+import sys
+import time
+
+import pytest
+
+from app.services import tool_sandbox
+from app.services.tool_sandbox import ProcessSandbox, ToolLimitExceeded
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="rlimits are POSIX-only")
+
+
+def report_pid(query):
+    return f"{os.getpid()}:{query}"
+
+
+def burn_cpu(query):
+    while True:
+        pass
+
+
+def burn_cpu_in_c(query):
+    # One long call inside the interpreter's C code, where SIGXCPU handlers never run
+    return str(sum(range(10 ** 13)))
+
+
+def allocate(query):
+    return str(len(bytearray(int(query) * 1024 * 1024)))
+
+
+def hang(pid_path):
+    with open(pid_path, "w") as f:
+        f.write(str(os.getpid()))
+    time.sleep(60)
+
+
+def kill_self(query):
+    os.kill(os.getpid(), signal.SIGKILL)
+
+
+def exit_silently(query):
+    os._exit(3)
+
+
+def fail(query):
+    raise ValueError(f"bad input {query}")
+
+
+def run_out_of_memory(query):
+    raise MemoryError()
+
+
+class UnpicklableError(Exception):
+    def __init__(self, handle):
+        super().__init__("unpicklable")
+        self.handle = handle
+
+
+def fail_unpicklably(query):
+    raise UnpicklableError(lambda: None)
+
+
+def _is_running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except OSError:
+        return True
+
+
+@pytest.fixture
+def limited_worker(monkeypatch):
+    """Make this process look like a CPU-limited worker, so _run_limited forks from here."""
+    def configure(func, cpu_seconds=2):
+        monkeypatch.setattr(tool_sandbox, "_worker_func", func)
+        monkeypatch.setattr(tool_sandbox, "_worker_cpu_seconds", cpu_seconds)
+    return configure
+
+
+def test_runs_in_recycled_worker_processes():
+    sandbox = ProcessSandbox(report_pid, max_workers=1, max_calls_per_worker=2)
+    try:
+        results = [sandbox.run_sync(str(i)) for i in range(4)]
+    finally:
+        sandbox.shutdown()
+    pids = [r.split(":")[0] for r in results]
+    assert [r.split(":")[1] for r in results] == ["0", "1", "2", "3"]
+    assert str(os.getpid()) not in pids
+    # Prewarm counts as one task, so the first worker serves one call before being replaced
+    assert len(set(pids)) >= 2
+
+
+@pytest.mark.asyncio
+async def test_cpu_limit_stops_runaway_tool():
+    sandbox = ProcessSandbox(burn_cpu, max_workers=1, cpu_seconds=1)
+    try:
+        started = time.perf_counter()
+        with pytest.raises(ToolLimitExceeded):
+            await sandbox.run("x")
+        assert time.perf_counter() - started < 10
+    finally:
+        sandbox.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_cpu_limit_stops_runaway_c_loop():
+    sandbox = ProcessSandbox(burn_cpu_in_c, max_workers=1, cpu_seconds=1)
+    try:
+        started = time.perf_counter()
+        with pytest.raises(ToolLimitExceeded):
+            await sandbox.run("x")
+        assert time.perf_counter() - started < 10
+    finally:
+        sandbox.shutdown()
+
+
+def test_cpu_limited_sandbox_keeps_serving():
+    sandbox = ProcessSandbox(report_pid, max_workers=1, cpu_seconds=1)
+    try:
+        assert [sandbox.run_sync(str(i)).split(":")[1] for i in range(3)] == ["0", "1", "2"]
+    finally:
+        sandbox.shutdown()
+    sandbox = ProcessSandbox(burn_cpu_in_c, max_workers=1, cpu_seconds=1)
+    try:
+        for _ in range(2):
+            with pytest.raises(ToolLimitExceeded):
+                sandbox.run_sync("x")
+    finally:
+        sandbox.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_memory_limit_is_enforced():
+    sandbox = ProcessSandbox(allocate, max_workers=1, memory_mb=256)
+    try:
+        assert await sandbox.run("1") == str(1024 * 1024)
+        with pytest.raises(ToolLimitExceeded):
+            await sandbox.run("1024")
+        # The worker survives a MemoryError and keeps serving
+        assert await sandbox.run("2") == str(2 * 1024 * 1024)
+    finally:
+        sandbox.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_tool_service_process_isolation():
+    from langchain_core.tools import Tool
+    from app.services.tool_service import ToolService
+    service = ToolService()
+    with pytest.raises(ValueError, match="Unknown isolation"):
+        service.register_tool(Tool(name="Bad", func=report_pid, description="pid"), isolation="vm")
+
+    service.register_tool(Tool(name="Pid", func=report_pid, description="pid"), isolation="process")
+    service.register_tool(Tool(name="Spin", func=burn_cpu, description="spin"), isolation="process", cpu_seconds=1)
+    try:
+        pid, query = (await service.aexecute_tool("Pid", "q")).split(":")
+        assert query == "q" and pid != str(os.getpid())
+        assert service.execute_tool("Pid", "s").endswith(":s")
+        assert "CPU time limit" in await service.aexecute_tool("Spin", "x")
+    finally:
+        service.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_timed_out_call_kills_its_worker(tmp_path):
+    from langchain_core.tools import Tool
+    from app.services.tool_service import ToolService
+    service = ToolService()
+    service.register_tool(Tool(name="Hang", func=hang, description="hang"), isolation="process", timeout=3)
+    pid_path = tmp_path / "pid"
+    try:
+        assert "timed out" in await service.aexecute_tool("Hang", str(pid_path))
+        worker_pid = int(pid_path.read_text())
+        deadline = time.monotonic() + 5
+        while _is_running(worker_pid) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert not _is_running(worker_pid)
+        sandbox = service._sandboxes["Hang"]
+        assert sandbox.restarts == 1
+    finally:
+        service.shutdown()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("crash", [kill_self, exit_silently])
+async def test_crashed_worker_is_replaced(crash):
+    sandbox = ProcessSandbox(crash, max_workers=1)
+    try:
+        with pytest.raises(ToolLimitExceeded, match="worker process died"):
+            await sandbox.run("x")
+        with pytest.raises(ToolLimitExceeded, match="worker process died"):
+            sandbox.run_sync("x")
+        assert sandbox.restarts == 2
+    finally:
+        sandbox.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_tool_errors_reach_the_caller():
+    sandbox = ProcessSandbox(fail, max_workers=1)
+    try:
+        with pytest.raises(ValueError, match="bad input x"):
+            await sandbox.run("x")
+        assert sandbox.restarts == 0
+    finally:
+        sandbox.shutdown()
+
+
+def test_limited_call_returns_result(limited_worker):
+    limited_worker(report_pid)
+    pid, query = tool_sandbox._run_in_worker("q").split(":")
+    assert query == "q" and pid != str(os.getpid())
+
+
+def test_limited_call_reraises_tool_errors(limited_worker):
+    limited_worker(fail)
+    with pytest.raises(ValueError, match="bad input y"):
+        tool_sandbox._run_limited("y")
+
+    limited_worker(fail_unpicklably)
+    with pytest.raises(RuntimeError, match="UnpicklableError"):
+        tool_sandbox._run_limited("y")
+
+    limited_worker(run_out_of_memory)
+    with pytest.raises(ToolLimitExceeded, match="memory limit"):
+        tool_sandbox._run_limited("y")
+
+
+@pytest.mark.parametrize("crash", [kill_self, exit_silently])
+def test_limited_call_reports_crashed_child(limited_worker, crash):
+    limited_worker(crash)
+    with pytest.raises(ToolLimitExceeded):
+        tool_sandbox._run_limited("x")
+
+
+def test_limited_call_is_killed_at_cpu_limit(limited_worker):
+    # No SIGXCPU handler is installed here, so the soft limit itself ends the child
+    limited_worker(burn_cpu, cpu_seconds=1)
+    started = time.perf_counter()
+    with pytest.raises(ToolLimitExceeded, match="CPU time limit"):
+        tool_sandbox._run_limited("x")
+    assert time.perf_counter() - started < 10
+
+
+def test_unlimited_call_maps_memory_errors(limited_worker):
+    limited_worker(run_out_of_memory, cpu_seconds=None)
+    with pytest.raises(ToolLimitExceeded, match="memory limit"):
+        tool_sandbox._run_in_worker("x")
+
+
+def test_worker_initializer_applies_limits(monkeypatch):
+    limits = []
+    handlers = {}
+    monkeypatch.setattr(tool_sandbox.resource, "setrlimit", lambda which, value: limits.append((which, value)))
+    monkeypatch.setattr(tool_sandbox.signal, "signal", lambda signum, handler: handlers.update({signum: handler}))
+    monkeypatch.setattr(tool_sandbox, "_worker_func", None)
+    monkeypatch.setattr(tool_sandbox, "_worker_cpu_seconds", None)
+
+    tool_sandbox._init_worker(report_pid, 1, 64)
+
+    assert tool_sandbox._worker_func is report_pid
+    assert limits == [(tool_sandbox.resource.RLIMIT_AS, (64 * 1024 * 1024, 64 * 1024 * 1024))]
+    assert handlers[signal.SIGINT] == signal.SIG_IGN
+    with pytest.raises(ToolLimitExceeded, match="CPU time limit"):
+        handlers[signal.SIGXCPU](signal.SIGXCPU, None)
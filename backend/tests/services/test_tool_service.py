@@ -27,3 +27,133 @@ def test_execute_tool_calculator():
 def test_execute_unknown_tool():
     with pytest.raises(ValueError, match="Tool 'unknown' not found"):
         tool_service.execute_tool("unknown", "query")
+
+def _sleepy_tool(name, seconds, counter=None):
+    import threading, time
+    from langchain_core.tools import Tool
+    lock = threading.Lock()
+
+    def run(query):
+        if counter is not None:
+            with lock:
+                counter["running"] += 1
+                counter["peak"] = max(counter["peak"], counter["running"])
+        time.sleep(seconds)
+        if counter is not None:
+            with lock:
+                counter["running"] -= 1
+        return f"{name}:{query}"
+
+    return Tool(name=name, func=run, description="sleeps")
+
+@pytest.mark.asyncio
+async def test_aexecute_tool_does_not_block_event_loop():
+    import asyncio, time
+    from app.services.tool_service import ToolService
+    service = ToolService()
+    service.register_tool(_sleepy_tool("Slow", 0.2))
+
+    started = time.perf_counter()
+    slow = asyncio.create_task(service.aexecute_tool("Slow", "q"))
+    await asyncio.sleep(0.01)
+    # The loop stayed responsive while the tool ran on a worker thread
+    assert time.perf_counter() - started < 0.15
+    assert await slow == "Slow:q"
+
+@pytest.mark.asyncio
+async def test_aexecute_tool_enforces_concurrency_and_timeout():
+    import asyncio
+    from app.services.tool_service import ToolService
+    service = ToolService()
+    counter = {"running": 0, "peak": 0}
+    service.register_tool(_sleepy_tool("Limited", 0.02, counter), max_concurrency=1)
+    service.register_tool(_sleepy_tool("Hangs", 0.3), timeout=0.05)
+
+    results = await asyncio.gather(*[service.aexecute_tool("Limited", str(i)) for i in range(3)])
+    assert results == ["Limited:0", "Limited:1", "Limited:2"]
+    assert counter["peak"] == 1
+
+    assert "timed out" in await service.aexecute_tool("Hangs", "q")
+    with pytest.raises(ValueError):
+        await service.aexecute_tool("unknown", "q")
+
+@pytest.mark.asyncio
+async def test_native_coroutines_and_agent_tools():
+    from langchain_core.tools import Tool
+    from app.services.tool_service import ToolService
+    service = ToolService()
+
+    async def lookup(query):
+        return f"async:{query}"
+
+    def blocking(query):
+        raise AssertionError("sync path should not be used")
+
+    service.register_tool(Tool(name="Lookup", func=blocking, coroutine=lookup, description="async lookup"))
+
+    assert await service.aexecute_tool("Lookup", "x") == "async:x"
+    agent_tool = service.get_agent_tool("Lookup")
+    assert agent_tool is service.get_agent_tool("Lookup")
+    assert agent_tool.description == "async lookup"
+    assert await agent_tool.arun("y") == "async:y"
+    assert service.get_agent_tool("missing") is None
+
+def make_echo_tool():
+    from langchain_core.tools import Tool
+    return Tool(name="Echo", func=lambda query: f"echo:{query}", description="echoes input")
+
+make_echo_tool.tool_policy = {"timeout": 2, "cacheable": True}
+
+def make_broken_tool():
+    raise RuntimeError("missing credentials")
+
+def test_tools_are_built_lazily_with_metrics():
+    from app.services.tool_service import ToolService
+    service = ToolService(discover_plugins=False)
+    builds = []
+
+    def factory():
+        builds.append(1)
+        return make_echo_tool()
+
+    service.register_factory("Echo", factory, description="echoes input", timeout=3)
+    assert service.tool_metrics()["Echo"] == {"source": "registered", "loaded": False, "startup_ms": None, "error": None}
+    # Listing uses the declared metadata without building anything
+    listed = {t["name"]: t for t in service.get_available_tools()}
+    assert listed["Echo"]["args"] == {"tool_input": {"type": "string"}}
+    assert not service.tool_metrics()["Calculator"]["loaded"]
+    assert builds == []
+
+    assert service.execute_tool("Echo", "x") == "echo:x"
+    assert service.get_tool("Echo") is service.get_tool("Echo")
+    assert builds == [1]
+    metrics = service.tool_metrics()["Echo"]
+    assert metrics["loaded"] and metrics["startup_ms"] >= 0
+
+    service.register_factory("Broken", make_broken_tool, description="fails")
+    assert service.get_tool("Broken") is None
+    assert service.tool_metrics()["Broken"]["error"] == "missing credentials"
+    assert "Broken" not in [t["name"] for t in service.get_available_tools()]
+    with pytest.raises(ValueError, match="Tool 'Broken' not found"):
+        service.execute_tool("Broken", "x")
+
+def test_discover_entry_point_plugins(monkeypatch):
+    from importlib.metadata import EntryPoint
+    from app.services import tool_service as module
+    plugins = [
+        EntryPoint("Echo", f"{__name__}:make_echo_tool", module.TOOL_ENTRY_POINT_GROUP),
+        EntryPoint("Calculator", f"{__name__}:make_echo_tool", module.TOOL_ENTRY_POINT_GROUP),
+    ]
+    monkeypatch.setattr(module, "entry_points", lambda group: plugins if group == module.TOOL_ENTRY_POINT_GROUP else [])
+
+    service = module.ToolService()
+    # Built-ins win over plugins with the same name
+    assert service.execute_tool("Calculator", "2 + 2") == "4"
+    assert not service.tool_metrics()["Echo"]["loaded"]
+    # Plugins without declared metadata are built to be listed
+    listed = {t["name"]: t for t in service.get_available_tools()}
+    assert listed["Echo"]["description"] == "echoes input"
+    assert service.tool_metrics()["Echo"]["loaded"]
+    assert service.execute_tool("Echo", "hi") == "echo:hi"
+    assert service.tool_metrics()["Echo"]["source"] == "plugin"
+    assert service._policies["Echo"].cacheable and service._policies["Echo"].timeout == 2
@@ -0,0 +1,64 @@
+import bz2
+import json
+
+import pytest
+
+from app.services.wikipedia_index import (
+    NO_RESULT, WikipediaIndex, clean_wikitext, iter_dump_articles, main
+)
+
+DUMP = """<mediawiki xmlns="http://www.mediawiki.org/xml/export-0.10/">
+  <page><title>Python (programming language)</title><ns>0</ns><revision><text>'''Python''' is a [[high-level programming language|high-level]] language.{{Infobox|a={{nested}}}}&lt;ref&gt;cite&lt;/ref&gt;
+
+== History ==
+Guido van Rossum began working on Python in the late 1980s.</text></revision></page>
+  <page><title>Py</title><ns>0</ns><redirect title="Python (programming language)"/><revision><text>#REDIRECT [[Python]]</text></revision></page>
+  <page><title>Talk:Python</title><ns>1</ns><revision><text>Discussion</text></revision></page>
+  <page><title>Ball python</title><ns>0</ns><revision><text>The '''ball python''' is a snake native to Africa.</text></revision></page>
+</mediawiki>"""
+
+
+@pytest.fixture
+def dump_path(tmp_path):
+    path = tmp_path / "dump.xml.bz2"
+    path.write_bytes(bz2.compress(DUMP.encode()))
+    return str(path)
+
+
+def test_clean_wikitext():
+    text = "'''Bold''' [[Target|shown]] [[Plain]] {{a|{{b}}}}<ref name=x>r</ref> [https://x.org site]"
+    assert clean_wikitext(text) == "Bold shown Plain  site"
+
+
+def test_ingest_dump_and_search(dump_path, tmp_path):
+    assert [title for title, _ in iter_dump_articles(dump_path)] == ["Python (programming language)", "Ball python"]
+
+    index = WikipediaIndex(str(tmp_path / "wiki.db"))
+    assert index.ingest(iter_dump_articles(dump_path), batch_size=1) == 2
+
+    result = index.run("Python programming")
+    first = result.split("\n\n")[0]
+    assert first == "Page: Python (programming language)\nSummary: Python is a high-level language."
+    assert "Page: Ball python" in result
+    # The body is searchable beyond the summary, and FTS syntax in queries is neutralised
+    assert index.search("Rossum")[0][0] == "Python (programming language)"
+    assert index.search('snake" OR NEAR(')[0][0] == "Ball python"
+    assert index.run("zebra") == NO_RESULT
+    assert index.run("?!") == NO_RESULT
+
+
+def test_ingest_command_and_tool_registration(tmp_path, monkeypatch):
+    source = tmp_path / "articles.jsonl"
+    source.write_text("\n".join(json.dumps(a) for a in [
+        {"title": "Alan Turing", "text": "Alan Turing was a mathematician."},
+        {"title": "Ada Lovelace", "text": "Ada Lovelace wrote the first program."},
+    ]))
+    index_path = tmp_path / "wiki.db"
+    main([str(source), "--index", str(index_path), "--limit", "1"])
+    assert WikipediaIndex(str(index_path)).search("Ada") == []
+
+    from app.services.tool_service import ToolService, WIKIPEDIA_DESCRIPTION
+    monkeypatch.setenv("WIKIPEDIA_INDEX_PATH", str(index_path))
+    tool = ToolService().get_tool("Wikipedia")
+    assert tool.description == WIKIPEDIA_DESCRIPTION
+    assert tool.run("Turing") == "Page: Alan Turing\nSummary: Alan Turing was a mathematician."
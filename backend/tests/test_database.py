@@ -44,3 +44,105 @@ def test_create_tables():
         assert True
     except Exception as e:
         pytest.fail(f"create_tables() raised an exception: {e}")
+
+def test_async_database_url():
+    from app.db.database import async_database_url
+    assert async_database_url("sqlite:///./agentweave.db") == "sqlite+aiosqlite:///./agentweave.db"
+    assert async_database_url("postgresql://u:p@db/agentweave") == "postgresql+asyncpg://u:p@db/agentweave"
+    assert async_database_url("postgresql+psycopg2://u:p@db/x") == "postgresql+asyncpg://u:p@db/x"
+    assert async_database_url("sqlite+aiosqlite:///x.db") == "sqlite+aiosqlite:///x.db"
+    assert async_database_url("mysql+aiomysql://u@db/x") == "mysql+aiomysql://u@db/x"
+
+def test_async_database_url_rejects_unsupported_dialect():
+    from app.db.database import async_database_url
+    with pytest.raises(ValueError, match="'mysql' has no async driver"):
+        async_database_url("mysql://u@db/x")
+
+@pytest.mark.asyncio
+async def test_get_async_db_session():
+    """The async dependency yields a working session and closes it afterwards"""
+    from sqlalchemy import text
+    from sqlalchemy.ext.asyncio import AsyncSession
+    from app.db.database import get_async_db
+    db_generator = get_async_db()
+    db = await db_generator.__anext__()
+    assert isinstance(db, AsyncSession)
+    assert (await db.execute(text("SELECT 1"))).scalar() == 1
+    with pytest.raises(StopAsyncIteration):
+        await db_generator.__anext__()
+
+def test_sqlite_pragmas_applied_on_connect(tmp_path, monkeypatch):
+    """File databases run in WAL mode with the configured PRAGMAs"""
+    from app.db.database import build_engine
+    monkeypatch.setenv("SQLITE_BUSY_TIMEOUT_MS", "1234")
+    engine = build_engine(f"sqlite:///{tmp_path}/pragmas.db")
+    try:
+        with engine.connect() as conn:
+            pragma = lambda name: conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+            assert pragma("journal_mode") == "wal"
+            assert pragma("synchronous") == 1  # NORMAL
+            assert pragma("busy_timeout") == 1234
+            assert pragma("cache_size") == -64000
+    finally:
+        engine.dispose()
+
+@pytest.mark.asyncio
+async def test_async_engine_applies_pragmas(tmp_path):
+    from app.db.database import build_async_engine
+    engine = build_async_engine(f"sqlite:///{tmp_path}/async.db")
+    try:
+        async with engine.connect() as conn:
+            assert (await conn.exec_driver_sql("PRAGMA journal_mode")).scalar() == "wal"
+    finally:
+        await engine.dispose()
+
+def test_engine_options_from_environment(monkeypatch):
+    from app.db.database import engine_options
+    monkeypatch.setenv("DATABASE_POOL_SIZE", "20")
+    monkeypatch.setenv("DATABASE_MAX_OVERFLOW", "5")
+    monkeypatch.setenv("DATABASE_POOL_RECYCLE", "600")
+    monkeypatch.setenv("DATABASE_POOL_PRE_PING", "false")
+    assert engine_options("postgresql://u:p@db/agentweave") == {
+        "pool_size": 20, "max_overflow": 5, "pool_recycle": 600, "pool_pre_ping": False
+    }
+    assert "pool_size" not in engine_options("sqlite:///:memory:")
+    assert engine_options("sqlite:///./x.db")["pool_size"] == 20
+
+@pytest.mark.asyncio
+async def test_async_engine_pools_connections(tmp_path, monkeypatch):
+    from app.db.database import build_async_engine
+    monkeypatch.setenv("DATABASE_POOL_SIZE", "3")
+    engine = build_async_engine(f"sqlite:///{tmp_path}/pooled.db")
+    try:
+        async with engine.connect() as conn:
+            first = (await conn.get_raw_connection()).driver_connection
+        async with engine.connect() as conn:
+            assert (await conn.get_raw_connection()).driver_connection is first
+        assert engine.pool.size() == 3
+    finally:
+        await engine.dispose()
+
+@pytest.mark.asyncio
+async def test_read_sessions_query_the_replica(tmp_path, monkeypatch):
+    """With a read URL, read-only sessions see the replica's data (a table the primary lacks)"""
+    import sqlite3
+    from sqlalchemy import text
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+    from app.db import database
+    replica_path = tmp_path / "replica.db"
+    with sqlite3.connect(replica_path) as conn:
+        conn.execute("CREATE TABLE replica_marker (name TEXT)")
+        conn.execute("INSERT INTO replica_marker VALUES ('replica')")
+
+    monkeypatch.delenv("DATABASE_READ_URL", raising=False)
+    assert database.build_read_engine(None, database.async_engine) is database.async_engine
+
+    replica = database.build_read_engine(f"sqlite:///{replica_path}", database.async_engine)
+    monkeypatch.setattr(database, "AsyncReadSessionLocal", async_sessionmaker(replica))
+    try:
+        db_generator = database.get_async_read_db()
+        db = await db_generator.__anext__()
+        assert (await db.execute(text("SELECT name FROM replica_marker"))).scalar() == "replica"
+        await db_generator.aclose()
+    finally:
+        await replica.dispose()
@@ -0,0 +1,65 @@
+import asyncio
+from fastapi.testclient import TestClient
+from app.main import app
+from app.db.database import Base, engine
+from app.services.job_queue import job_queue
+import pytest
+
+client = TestClient(app)
+
+@pytest.fixture(scope="module", autouse=True)
+def setup_database():
+    # Later modules share this database, so tables are left in place
+    Base.metadata.create_all(bind=engine)
+
+@pytest.fixture
+def auth_headers():
+    email = "executions_test@example.com"
+    client.post("/api/auth/register", json={"email": email, "password": "password123"})
+    response = client.post("/api/auth/login", json={"email": email, "password": "password123"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+def test_async_execution_roundtrip(auth_headers):
+    nodes = [
+        {"id": "1", "type": "input", "data": {"value": "queued"}},
+        {"id": "2", "type": "output", "data": {}}
+    ]
+    create_res = client.post("/api/workflows/", json={
+        "name": "Queued Flow",
+        "canvas_state": {"nodes": nodes, "edges": [{"source": "1", "target": "2"}]}
+    }, headers=auth_headers)
+    workflow_id = create_res.json()["id"]
+
+    response = client.post(f"/api/workflows/{workflow_id}/execute?mode=async", json={}, headers=auth_headers)
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+    assert response.json()["status"] == "queued"
+
+    status_res = client.get(f"/api/executions/{job_id}", headers=auth_headers)
+    assert status_res.status_code == 200
+    assert status_res.json()["status"] == "queued"
+
+    # Workers are not started under TestClient; drain the job directly
+    assert job_queue.claim_next("test-worker") == job_id
+    asyncio.run(job_queue.run_job(job_id))
+
+    data = client.get(f"/api/executions/{job_id}", headers=auth_headers).json()
+    assert data["status"] == "success"
+    assert data["workflow_id"] == workflow_id
+    assert data["results"]["2"] == {"value": "queued"}
+    assert data["attempts"] == 1
+
+def test_async_execution_rejects_empty_workflow(auth_headers):
+    create_res = client.post("/api/workflows/", json={"name": "Empty", "canvas_state": {}}, headers=auth_headers)
+    workflow_id = create_res.json()["id"]
+
+    response = client.post(f"/api/workflows/{workflow_id}/execute?mode=async", json={}, headers=auth_headers)
+    assert response.status_code == 400
+
+def test_invalid_mode(auth_headers):
+    response = client.post("/api/workflows/any/execute?mode=later", json={}, headers=auth_headers)
+    assert response.status_code == 422
+
+def test_get_execution_not_found(auth_headers):
+    response = client.get("/api/executions/non-existent-id", headers=auth_headers)
+    assert response.status_code == 404
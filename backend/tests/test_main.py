@@ -40,3 +40,25 @@ def test_cors_headers():
     assert response.status_code == 200
     # CORS headers should be present
     assert "access-control-allow-origin" in response.headers
+
+def test_import_time_budget():
+    """Importing the API must stay cheap: provider SDKs load on first use, not at startup."""
+    import json, os, subprocess, sys
+    script = (
+        "import json, sys, time\n"
+        "started = time.perf_counter()\n"
+        "import app.main\n"
+        "heavy = ['langchain_aws', 'boto3', 'langchain_openai', 'langchain_google_genai',"
+        " 'langchain_anthropic', 'langchain_community', 'app.core.executor']\n"
+        "print(json.dumps({'seconds': time.perf_counter() - started,"
+        " 'loaded': [m for m in heavy if m in sys.modules]}))\n"
+    )
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = {**os.environ, "PYTHONPATH": backend_dir}
+    env.pop("COV_CORE_SOURCE", None)
+    output = subprocess.run(
+        [sys.executable, "-c", script], cwd=backend_dir, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    assert result["loaded"] == []
+    assert result["seconds"] < float(os.getenv("IMPORT_TIME_BUDGET_SECONDS", "3.0"))
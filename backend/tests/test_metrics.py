@@ -0,0 +1,46 @@
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.core.plan_cache import plan_cache
+from app.db.database import Base, engine
+
+client = TestClient(app)
+
+NODES = [{"id": "A", "type": "input", "data": {}}, {"id": "B", "type": "output", "data": {}}]
+EDGES = [{"source": "A", "target": "B"}]
+
+@pytest.fixture(scope="module")
+def auth_headers():
+    """Register a user and return its bearer header"""
+    Base.metadata.create_all(bind=engine)
+    credentials = {"email": "metrics_test@example.com", "password": "password123"}
+    client.post("/api/auth/register", json={**credentials, "full_name": "Metrics Tester"})
+    token = client.post("/api/auth/login", json=credentials).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+def test_metrics_require_authentication():
+    assert client.get("/api/metrics/").status_code == 403
+    assert client.get("/api/metrics/", headers={"Authorization": "Bearer invalid"}).status_code == 401
+
+def test_metrics_aggregates_cache_counters(auth_headers):
+    plan_cache.clear()
+    plan_cache.get_or_compile(NODES, EDGES)
+    plan_cache.get_or_compile(NODES, EDGES)
+
+    response = client.get("/api/metrics/", headers=auth_headers)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["plan_cache"]["hits"] == 1
+    assert data["plan_cache"]["misses"] == 1
+    assert "hits" in data["agent_cache"]
+    assert "Calculator" in data["tools"]
+
+def test_metrics_include_llm_service_once_built(auth_headers):
+    from app.services.llm_service import get_llm_service
+    get_llm_service()
+
+    llm = client.get("/api/metrics/", headers=auth_headers).json()["llm"]
+
+    assert set(llm) >= {"client_pool", "rate_limiter", "hedging", "response_cache", "singleflight"}
+    assert "size" in llm["client_pool"]
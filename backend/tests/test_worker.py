@@ -0,0 +1,37 @@
+import asyncio
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.db.database import Base
+from app.models.execution_job import ExecutionJob
+from app.services.job_queue import JobQueue
+from app.worker import main, run_worker
+
+@pytest.mark.asyncio
+async def test_run_worker_processes_jobs_until_stopped(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/worker.db", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    queue = JobQueue(session_factory=session_factory, num_workers=2, poll_interval=0.01)
+
+    with session_factory() as db:
+        job_id = queue.enqueue(db, workflow_id="wf", user_id="u", nodes=[{"id": "A", "type": "input"}], edges=[]).id
+
+    stop_event = asyncio.Event()
+    worker = asyncio.create_task(run_worker(queue, stop_event))
+    for _ in range(200):
+        with session_factory() as db:
+            if db.get(ExecutionJob, job_id).status == "success":
+                break
+        await asyncio.sleep(0.01)
+    stop_event.set()
+    await worker
+
+    with session_factory() as db:
+        assert db.get(ExecutionJob, job_id).status == "success"
+    assert queue._workers == []
+    engine.dispose()
+
+def test_main_rejects_invalid_concurrency():
+    with pytest.raises(SystemExit):
+        main(["--concurrency", "0"])
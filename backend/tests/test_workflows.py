@@ -4,6 +4,7 @@ from app.db.database import Base, engine, SessionLocal
 from app.models.workflow import Workflow
 from app.models.user import User
 import pytest
+import json
 from unittest.mock import patch, AsyncMock
 
 client = TestClient(app)
@@ -157,3 +158,65 @@ def test_execute_workflow_no_nodes(auth_headers):
     response = client.post(f"/api/workflows/{workflow_id}/execute", json={}, headers=auth_headers)
     assert response.status_code == 400
     assert "no nodes" in response.json()["detail"].lower()
+
+@patch("app.core.executor.GraphExecutor.execute")
+def test_execute_reuses_cached_plan_until_update(mock_execute, auth_headers):
+    from app.core.plan_cache import plan_cache
+    mock_execute.return_value = {"results": {}, "logs": []}
+
+    nodes = [{"id": "1", "type": "input", "data": {}}]
+    create_res = client.post("/api/workflows/", json={
+        "name": "Cached Flow",
+        "canvas_state": {"nodes": nodes, "edges": []}
+    }, headers=auth_headers)
+    workflow_id = create_res.json()["id"]
+
+    client.post(f"/api/workflows/{workflow_id}/execute", json={}, headers=auth_headers)
+    client.post(f"/api/workflows/{workflow_id}/execute", json={}, headers=auth_headers)
+    first_plan = mock_execute.call_args_list[0].kwargs["plan"]
+    assert mock_execute.call_args_list[1].kwargs["plan"] is first_plan
+
+    client.put(f"/api/workflows/{workflow_id}", json={
+        "canvas_state": {"nodes": nodes + [{"id": "2", "type": "output"}], "edges": []}
+    }, headers=auth_headers)
+    client.post(f"/api/workflows/{workflow_id}/execute", json={}, headers=auth_headers)
+    updated_plan = mock_execute.call_args_list[2].kwargs["plan"]
+    assert updated_plan is not first_plan
+    assert len(updated_plan) == 2
+    assert plan_cache.stats()["hits"] >= 1
+
+def test_execute_workflow_stream(auth_headers):
+    nodes = [
+        {"id": "1", "type": "input", "data": {"value": "hi"}},
+        {"id": "2", "type": "output", "data": {}}
+    ]
+    edges = [{"source": "1", "target": "2"}]
+    create_res = client.post("/api/workflows/", json={
+        "name": "Stream Flow",
+        "canvas_state": {"nodes": nodes, "edges": edges}
+    }, headers=auth_headers)
+    workflow_id = create_res.json()["id"]
+
+    response = client.post(f"/api/workflows/{workflow_id}/execute/stream", json={}, headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    messages = [m for m in response.text.split("\n\n") if m]
+    event_names = [m.split("\n")[0].removeprefix("event: ") for m in messages]
+    assert event_names == ["node_started", "node_completed", "node_started", "node_completed", "execution_completed"]
+    summary = json.loads(messages[-1].split("\n")[1].removeprefix("data: "))
+    assert summary["workflow_id"] == workflow_id
+    assert summary["results"]["2"] == {"value": "hi"}
+
+def test_execute_workflow_stream_not_found(auth_headers):
+    response = client.post("/api/workflows/non-existent-id/execute/stream", json={}, headers=auth_headers)
+    assert response.status_code == 404
+
+def test_list_tools_and_metrics():
+    response = client.get("/api/workflows/tools")
+    assert response.status_code == 200
+    assert "Calculator" in [tool["name"] for tool in response.json()]
+
+    response = client.get("/api/workflows/tools/metrics")
+    assert response.status_code == 200
+    assert response.json()["Calculator"]["source"] == "builtin"